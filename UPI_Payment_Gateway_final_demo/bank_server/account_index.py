@@ -0,0 +1,129 @@
+
+import os
+import sqlite3
+import sys
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bank_server.merkle import block_entries
+
+INDEX_FILE = "accounts.db"
+
+# (timestamp, transaction_id, segment, offset)
+Posting = Tuple[float, str, int, int]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS postings (
+    account TEXT NOT NULL,
+    timestamp REAL NOT NULL,
+    transaction_id TEXT NOT NULL,
+    segment INTEGER NOT NULL,
+    offset INTEGER NOT NULL,
+    PRIMARY KEY (account, timestamp, transaction_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL);
+"""
+
+INSERT_POSTING = "INSERT OR IGNORE INTO postings VALUES (?, ?, ?, ?, ?)"
+SET_INDEXED_BLOCKS = "INSERT OR REPLACE INTO meta VALUES ('indexed_blocks', ?)"
+SELECT_POSTINGS = """
+SELECT timestamp, transaction_id, segment, offset FROM postings
+WHERE account = ? AND timestamp >= ? AND timestamp < ?
+ORDER BY timestamp DESC, transaction_id DESC LIMIT ?
+"""
+SELECT_POSTINGS_BEFORE = """
+SELECT timestamp, transaction_id, segment, offset FROM postings
+WHERE account = ? AND timestamp >= ? AND timestamp < ? AND (timestamp, transaction_id) < (?, ?)
+ORDER BY timestamp DESC, transaction_id DESC LIMIT ?
+"""
+
+def postings_for(record: Dict[str, Any], location: Tuple[int, int]) -> List[Tuple[str, float, str, int, int]]:
+    
+    segment, offset = location
+    rows = []
+    for entry in block_entries(record):
+        transaction_data = entry["transaction_data"]
+        timestamp = float(transaction_data.get("timestamp", record["timestamp"]))
+        for field in ("sender_id", "receiver_id"):
+            account_id = transaction_data.get(field)
+            if account_id:
+                rows.append((account_id, timestamp, entry["transaction_id"], segment, offset))
+    return rows
+
+class AccountIndex:
+    
+    def __init__(self, directory: str):
+        self.path = os.path.join(directory, INDEX_FILE)
+        self.indexed_blocks = 0
+        self.current = False
+        
+        self._connection: Optional[sqlite3.Connection] = None
+    
+    def catch_up(self, store) -> None:
+        
+        connection = self._connect()
+        if self.indexed_blocks > store.block_count:
+            # The chain lost a tail the index had already seen; start over.
+            with connection:
+                connection.execute("DELETE FROM postings")
+            self.indexed_blocks = 0
+        
+        block_count = self.indexed_blocks
+        rows = []
+        for location, record in store.scan(self.indexed_blocks):
+            rows.extend(postings_for(record, location))
+            block_count += 1
+        with connection:
+            connection.executemany(INSERT_POSTING, rows)
+            connection.execute(SET_INDEXED_BLOCKS, (block_count,))
+        self.indexed_blocks = block_count
+        self.current = True
+    
+    def add(self, entries: Iterable[Tuple[Dict[str, Any], Tuple[int, int]]], block_count: int) -> None:
+        
+        if not self.current:
+            return
+        rows = []
+        for record, location in entries:
+            rows.extend(postings_for(record, location))
+        with self._connection:
+            self._connection.executemany(INSERT_POSTING, rows)
+            self._connection.execute(SET_INDEXED_BLOCKS, (block_count,))
+        self.indexed_blocks = block_count
+    
+    def query(self, account_id: str, limit: int, before: Optional[Tuple[float, str]] = None,
+              start_time: Optional[float] = None, end_time: Optional[float] = None) -> List[Posting]:
+        
+        # Half-open like Blockchain.transactions_between, so adjacent windows
+        # never report the same posting twice.
+        time_range = (
+            float("-inf") if start_time is None else start_time,
+            float("inf") if end_time is None else end_time
+        )
+        if before is None:
+            cursor = self._connection.execute(SELECT_POSTINGS, (account_id, *time_range, limit))
+        else:
+            cursor = self._connection.execute(SELECT_POSTINGS_BEFORE, (account_id, *time_range, *before, limit))
+        return cursor.fetchall()
+    
+    def close(self) -> None:
+        
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+        self.current = False
+    
+    def _connect(self) -> sqlite3.Connection:
+        
+        if self._connection is None:
+            # Derived data: it is caught up from the segments after a crash,
+            # so commits do not need to be synced.
+            self._connection = sqlite3.connect(self.path, check_same_thread=False)
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute("PRAGMA synchronous=OFF")
+            self._connection.executescript(SCHEMA)
+            row = self._connection.execute("SELECT value FROM meta WHERE key = 'indexed_blocks'").fetchone()
+            self.indexed_blocks = row[0] if row else 0
+        return self._connection
@@ -0,0 +1,253 @@
+
+import json
+import struct
+from typing import Any, Dict, List, Optional, Union
+
+
+# Record kinds, stored in the first byte. A record that starts with "{" is a
+# plain JSON block, so JSON lines from older segments decode unchanged.
+KIND_JSON = ord("{")
+KIND_PAYMENT = 1
+KIND_BATCH = 2
+
+# kind, transaction id, previous hash, hash, timestamp, payment count
+HEADER = struct.Struct("<B32s32s32sdI")
+# transaction id, sender id, receiver id, amount in paise, timestamp, description index
+PAYMENT = struct.Struct("<32s8s8sqdH")
+COUNT = struct.Struct("<H")
+
+PAYMENT_FIELDS = ("transaction_id", "sender_id", "receiver_id", "amount", "description", "timestamp")
+
+Buffer = Union[bytes, bytearray, memoryview]
+
+_decoder = json.JSONDecoder()
+
+def _pack_id(value: Any, size: int) -> Optional[bytes]:
+    
+    # Only ids that come back byte-for-byte from hex are stored as binary.
+    if not isinstance(value, str) or len(value) != size * 2:
+        return None
+    try:
+        packed = bytes.fromhex(value)
+    except ValueError:
+        return None
+    return packed if packed.hex() == value else None
+
+def _pack_payment(transaction_id: str, payment: Dict[str, Any], descriptions: Dict[str, int]) -> Optional[bytes]:
+    
+    if len(payment) != len(PAYMENT_FIELDS) or any(field not in payment for field in PAYMENT_FIELDS):
+        return None
+    if payment["transaction_id"] != transaction_id or not isinstance(payment["description"], str):
+        return None
+    amount, timestamp = payment["amount"], payment["timestamp"]
+    if type(amount) is not float or type(timestamp) is not float or not 0 < amount < 2 ** 53 / 100:
+        return None
+    # The block hash covers the amount as written, so it has to survive the
+    # round trip through paise exactly.
+    paise = round(amount * 100)
+    if paise / 100 != amount:
+        return None
+    
+    ids = (_pack_id(transaction_id, 32), _pack_id(payment["sender_id"], 8), _pack_id(payment["receiver_id"], 8))
+    if None in ids:
+        return None
+    index = descriptions.setdefault(payment["description"], len(descriptions))
+    if index > 0xFFFF:
+        return None
+    return PAYMENT.pack(*ids, paise, timestamp, index)
+
+def encode_record(record: Dict[str, Any]) -> bytes:
+    
+    packed = _encode_compact(record)
+    if packed is not None:
+        return packed
+    return json.dumps(record, separators=(",", ":")).encode("utf-8")
+
+def _encode_compact(record: Dict[str, Any]) -> Optional[bytes]:
+    
+    if set(record) != {"transaction_id", "transaction_data", "previous_hash", "timestamp", "hash"}:
+        return None
+    header_ids = [_pack_id(record[field], 32) for field in ("transaction_id", "previous_hash", "hash")]
+    if None in header_ids or type(record["timestamp"]) is not float:
+        return None
+    
+    transaction_data = record["transaction_data"]
+    if set(transaction_data) == {"merkle_root", "transactions"}:
+        if transaction_data["merkle_root"] != record["transaction_id"] or list(transaction_data) != ["merkle_root", "transactions"]:
+            return None
+        kind = KIND_BATCH
+        entries = transaction_data["transactions"]
+        if any(set(entry) != {"transaction_id", "transaction_data"} for entry in entries):
+            return None
+        pairs = [(entry["transaction_id"], entry["transaction_data"]) for entry in entries]
+    else:
+        kind = KIND_PAYMENT
+        pairs = [(record["transaction_id"], transaction_data)]
+    
+    descriptions: Dict[str, int] = {}
+    payments = [_pack_payment(transaction_id, payment, descriptions) for transaction_id, payment in pairs]
+    if None in payments or len(descriptions) > 0xFFFF:
+        return None
+    # Payments only pack if they were written in the order they decode in.
+    if any(list(payment) != list(PAYMENT_FIELDS) for _, payment in pairs):
+        return None
+    
+    parts = [HEADER.pack(kind, *header_ids, record["timestamp"], len(payments))]
+    parts.extend(payments)
+    parts.append(COUNT.pack(len(descriptions)))
+    for description in descriptions:
+        encoded = description.encode("utf-8")
+        if len(encoded) > 0xFFFF:
+            return None
+        parts.append(COUNT.pack(len(encoded)) + encoded)
+    return b"".join(parts)
+
+def decode_record(buffer: Buffer) -> Dict[str, Any]:
+    
+    return BlockView(buffer).to_dict()
+
+class BlockView:
+    
+    # Reads fields straight out of an encoded record, typically a slice of a
+    # memory-mapped segment, and only decodes what is asked for.
+    __slots__ = ("buffer", "_record")
+    
+    def __init__(self, buffer: Buffer):
+        self.buffer = buffer if isinstance(buffer, memoryview) else memoryview(buffer)
+        self._record: Optional[Dict[str, Any]] = None
+    
+    @property
+    def kind(self) -> int:
+        
+        return self.buffer[0]
+    
+    @property
+    def compact(self) -> bool:
+        
+        return self.buffer[0] != KIND_JSON
+    
+    @property
+    def transaction_id(self) -> str:
+        
+        if not self.compact:
+            return self._json()["transaction_id"]
+        return self.buffer[1:33].hex()
+    
+    @property
+    def previous_hash(self) -> str:
+        
+        if not self.compact:
+            return self._json()["previous_hash"]
+        return self.buffer[33:65].hex()
+    
+    @property
+    def hash(self) -> Optional[str]:
+        
+        if not self.compact:
+            return self._json().get("hash")
+        return self.buffer[65:97].hex()
+    
+    @property
+    def timestamp(self) -> float:
+        
+        if not self.compact:
+            return self._json()["timestamp"]
+        return HEADER.unpack_from(self.buffer)[4]
+    
+    def __len__(self) -> int:
+        
+        if not self.compact:
+            transaction_data = self._json()["transaction_data"]
+            return len(transaction_data.get("transactions", [None]))
+        return HEADER.unpack_from(self.buffer)[5]
+    
+    def amount_paise(self, index: int) -> int:
+        
+        if not self.compact:
+            return round(self.entry(index)["transaction_data"]["amount"] * 100)
+        return PAYMENT.unpack_from(self.buffer, HEADER.size + index * PAYMENT.size)[3]
+    
+    def find(self, transaction_id: str) -> Optional[int]:
+        
+        if not self.compact:
+            for index in range(len(self)):
+                if self.entry(index)["transaction_id"] == transaction_id:
+                    return index
+            return None
+        
+        key = _pack_id(transaction_id, 32)
+        if key is None:
+            return None
+        # Payments are fixed-size, so the ids can be compared in place.
+        for index in range(len(self)):
+            start = HEADER.size + index * PAYMENT.size
+            if self.buffer[start:start + 32] == key:
+                return index
+        return None
+    
+    def entry(self, index: int) -> Dict[str, Any]:
+        
+        if not self.compact:
+            record = self._json()
+            transaction_data = record["transaction_data"]
+            if "transactions" in transaction_data and "merkle_root" in transaction_data:
+                return transaction_data["transactions"][index]
+            if index != 0:
+                raise IndexError(index)
+            return {"transaction_id": record["transaction_id"], "transaction_data": transaction_data}
+        
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        return self._payment(index, self._descriptions())
+    
+    def to_dict(self) -> Dict[str, Any]:
+        
+        if not self.compact:
+            return self._json()
+        
+        descriptions = self._descriptions()
+        entries = [self._payment(index, descriptions) for index in range(len(self))]
+        if self.kind == KIND_BATCH:
+            transaction_data = {"merkle_root": self.transaction_id, "transactions": entries}
+        else:
+            transaction_data = entries[0]["transaction_data"]
+        return {
+            "transaction_id": self.transaction_id,
+            "transaction_data": transaction_data,
+            "previous_hash": self.previous_hash,
+            "timestamp": self.timestamp,
+            "hash": self.hash
+        }
+    
+    def _payment(self, index: int, descriptions: List[str]) -> Dict[str, Any]:
+        
+        transaction_id, sender_id, receiver_id, paise, timestamp, description = PAYMENT.unpack_from(
+            self.buffer, HEADER.size + index * PAYMENT.size)
+        transaction_id = transaction_id.hex()
+        return {"transaction_id": transaction_id, "transaction_data": {
+            "transaction_id": transaction_id,
+            "sender_id": sender_id.hex(),
+            "receiver_id": receiver_id.hex(),
+            "amount": paise / 100,
+            "description": descriptions[description],
+            "timestamp": timestamp
+        }}
+    
+    def _descriptions(self) -> List[str]:
+        
+        offset = HEADER.size + len(self) * PAYMENT.size
+        count = COUNT.unpack_from(self.buffer, offset)[0]
+        offset += COUNT.size
+        descriptions = []
+        for _ in range(count):
+            length = COUNT.unpack_from(self.buffer, offset)[0]
+            offset += COUNT.size
+            descriptions.append(str(self.buffer[offset:offset + length], "utf-8"))
+            offset += length
+        return descriptions
+    
+    def _json(self) -> Dict[str, Any]:
+        
+        if self._record is None:
+            self._record = _decoder.decode(str(self.buffer, "utf-8"))
+        return self._record
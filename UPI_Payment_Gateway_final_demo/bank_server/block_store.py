@@ -0,0 +1,457 @@
+
+import glob
+import json
+import mmap
+import os
+import struct
+import sys
+import threading
+from array import array
+from bisect import bisect_right
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bank_server.block_codec import BlockView, decode_record, encode_record
+from bank_server.chain_archive import ARCHIVE_SUFFIX, ArchiveReader
+from common.constants import BLOCKCHAIN
+
+SEGMENT_PREFIX = "segment-"
+OFFSETS_SUFFIX = ".off"
+INDEX_FILE = "index.json"
+INDEX_VERSION = 1
+
+# (segment number, byte offset of the record inside that segment)
+BlockLocation = Tuple[int, int]
+
+Buffer = Union[bytes, mmap.mmap]
+
+class JsonLinesFormat:
+    
+    name = "json"
+    suffix = ".jsonl"
+    
+    def frame(self, record: Dict[str, Any]) -> bytes:
+        
+        return json.dumps(record, separators=(",", ":")).encode("utf-8") + b"\n"
+    
+    def next_record(self, data: Buffer, offset: int) -> Optional[int]:
+        
+        end = data.find(b"\n", offset)
+        return None if end < 0 else end + 1
+    
+    def payload(self, data: Buffer, offset: int, end: int) -> memoryview:
+        
+        return memoryview(data)[offset:end - 1]
+    
+    def read(self, f) -> bytes:
+        
+        line = f.readline()
+        return line if line.endswith(b"\n") else b""
+
+class BinaryFormat:
+    
+    # Length-prefixed records in the block_codec encoding.
+    name = "binary"
+    suffix = ".blk"
+    length = struct.Struct("<I")
+    
+    def frame(self, record: Dict[str, Any]) -> bytes:
+        
+        encoded = encode_record(record)
+        return self.length.pack(len(encoded)) + encoded
+    
+    def next_record(self, data: Buffer, offset: int) -> Optional[int]:
+        
+        if offset + self.length.size > len(data):
+            return None
+        end = offset + self.length.size + self.length.unpack_from(data, offset)[0]
+        return None if end > len(data) else end
+    
+    def payload(self, data: Buffer, offset: int, end: int) -> memoryview:
+        
+        return memoryview(data)[offset + self.length.size:end]
+    
+    def read(self, f) -> bytes:
+        
+        header = f.read(self.length.size)
+        if len(header) < self.length.size:
+            return b""
+        return header + f.read(self.length.unpack(header)[0])
+
+SEGMENT_FORMATS = {segment_format.name: segment_format for segment_format in (BinaryFormat(), JsonLinesFormat())}
+
+class BlockStore:
+    
+    def __init__(self, directory: str, segment_max_bytes: Optional[int] = None, fsync: Optional[bool] = None,
+                 readonly: bool = False, segment_format: Optional[str] = None):
+        self.directory = directory
+        # Readers in other processes must not repair a segment that the
+        # owning process may be appending to.
+        self.readonly = readonly
+        self.segment_max_bytes = segment_max_bytes or BLOCKCHAIN["SEGMENT_MAX_BYTES"]
+        self.fsync = BLOCKCHAIN["FSYNC"] if fsync is None else fsync
+        # Only used for a new store; an existing one keeps the format its
+        # segments were written in.
+        self.format = SEGMENT_FORMATS[segment_format or BLOCKCHAIN["SEGMENT_FORMAT"]]
+        # One entry per segment: number, first_block, blocks, bytes, and
+        # archived once the segment only exists as a compressed archive.
+        self.segments: List[Dict[str, int]] = []
+        
+        self._file = None
+        self._lock = threading.Lock()
+        # Block offsets of the active segment; sealed segments keep theirs in
+        # a sidecar file that is read the first time one of their blocks is.
+        self._offsets = array("Q")
+        self._sealed_offsets: Dict[int, array] = {}
+        self._first_blocks: List[int] = []
+        # Each mapping with the one buffer export shared by every view sliced
+        # from it.
+        self._maps: Dict[int, Tuple[mmap.mmap, memoryview]] = {}
+        self._archives: Dict[int, ArchiveReader] = {}
+        if not readonly:
+            os.makedirs(directory, exist_ok=True)
+        self._load_index()
+    
+    @property
+    def block_count(self) -> int:
+        
+        if not self.segments:
+            return 0
+        last = self.segments[-1]
+        return last["first_block"] + last["blocks"]
+    
+    def segment_path(self, number: int, suffix: Optional[str] = None) -> str:
+        
+        return os.path.join(self.directory, f"{SEGMENT_PREFIX}{number:06d}{suffix or self.format.suffix}")
+    
+    def append(self, records: List[Dict[str, Any]]) -> List[BlockLocation]:
+        
+        lines = [self.format.frame(record) for record in records]
+        locations = []
+        if self.readonly:
+            raise PermissionError(f"Block store {self.directory} is open read-only")
+        with self._lock:
+            f = self._active_file()
+            active = self.segments[-1]
+            pending = []
+            offsets = []
+            size = active["bytes"]
+            for line in lines:
+                if (active["blocks"] or offsets) and size + len(line) > self.segment_max_bytes:
+                    self._publish(f, active, pending, offsets, size)
+                    f = self._roll_over()
+                    active = self.segments[-1]
+                    pending, offsets, size = [], [], 0
+                
+                locations.append((active["number"], size))
+                offsets.append(size)
+                pending.append(line)
+                size += len(line)
+            self._publish(f, active, pending, offsets, size)
+            if self.fsync:
+                os.fsync(f.fileno())
+        return locations
+    
+    def iter_records(self, start_block: int = 0) -> Iterator[Dict[str, Any]]:
+        
+        for _, record in self.scan(start_block):
+            yield record
+    
+    def scan(self, start_block: int = 0) -> Iterator[Tuple[BlockLocation, Dict[str, Any]]]:
+        
+        for segment in list(self.segments):
+            if segment["first_block"] + segment["blocks"] <= start_block:
+                continue
+            skip = max(0, start_block - segment["first_block"])
+            data = self._segment_data(segment)
+            offset = 0
+            for position in range(segment["blocks"]):
+                end = self.format.next_record(data, offset)
+                if end is None:
+                    break
+                if position >= skip:
+                    yield (segment["number"], offset), decode_record(self.format.payload(data, offset, end))
+                offset = end
+    
+    def location_of(self, position: int) -> BlockLocation:
+        
+        if not 0 <= position < self.block_count:
+            raise IndexError(f"Block {position} is not in the store")
+        segment = self.segments[bisect_right(self._first_blocks, position) - 1]
+        return segment["number"], self._offsets_for(segment)[position - segment["first_block"]]
+    
+    def read_block(self, position: int) -> Dict[str, Any]:
+        
+        return self.read_at(self.location_of(position))
+    
+    def timestamp_at(self, position: int) -> float:
+        
+        view = self.view_at(self.location_of(position))
+        try:
+            return view.timestamp
+        finally:
+            view.buffer.release()
+    
+    def read_at(self, location: BlockLocation) -> Dict[str, Any]:
+        
+        view = self.view_at(location)
+        try:
+            return view.to_dict()
+        finally:
+            view.buffer.release()
+    
+    def view_at(self, location: BlockLocation) -> BlockView:
+        
+        # Sealed segments are served from the mapping without copying; the
+        # caller should release() the view's buffer when done with it.
+        number, offset = location
+        mapping = self._mapped(number)
+        if mapping is not None:
+            mapped, mapped_view = mapping
+            return BlockView(self.format.payload(mapped_view, offset, self.format.next_record(mapped, offset)))
+        segment = self._segment(number)
+        if not segment.get("archived"):
+            try:
+                with open(self.segment_path(number), "rb") as f:
+                    f.seek(offset)
+                    data = self.format.read(f)
+                return BlockView(self.format.payload(data, 0, len(data)))
+            except FileNotFoundError:
+                # Archived since the check above; the archive was written
+                # before the file was removed.
+                if not segment.get("archived"):
+                    raise
+        offsets = self._offsets_for(segment)
+        position = bisect_right(offsets, offset)
+        end = offsets[position] if position < len(offsets) else segment["bytes"]
+        data = self.archive(number).read(offset, end)
+        return BlockView(self.format.payload(data, 0, len(data)))
+    
+    def archive(self, number: int) -> ArchiveReader:
+        
+        archive = self._archives.get(number)
+        if archive is None:
+            with self._lock:
+                archive = self._archives.get(number)
+                if archive is None:
+                    archive = self._archives[number] = ArchiveReader(self.segment_path(number, ARCHIVE_SUFFIX))
+        return archive
+    
+    def mark_archived(self, number: int) -> None:
+        
+        if self.readonly:
+            raise PermissionError(f"Block store {self.directory} is open read-only")
+        segment = self._segment(number)
+        self._offsets_for(segment)
+        with self._lock:
+            if number == self.segments[-1]["number"]:
+                raise ValueError("The active segment cannot be archived")
+            segment["archived"] = True
+            self._write_index()
+            # A scan or view may still be reading the mapping, so it is not
+            # closed here; dropping the store's reference lets the last reader
+            # unmap it. A reader that finds the file gone rereads the flag
+            # and goes to the archive instead.
+            self._maps.pop(number, None)
+        os.remove(self.segment_path(number))
+    
+    def close(self) -> None:
+        
+        with self._lock:
+            if self._file is not None:
+                self._file.flush()
+                os.fsync(self._file.fileno())
+                self._file.close()
+                self._file = None
+            for mapped, mapped_view in self._maps.values():
+                mapped_view.release()
+                try:
+                    mapped.close()
+                except BufferError:
+                    # A view is still held somewhere; the mapping goes with it.
+                    pass
+            self._maps.clear()
+            for archive in self._archives.values():
+                archive.close()
+            self._archives.clear()
+            if not self.readonly:
+                self._write_index()
+    
+    def _publish(self, f, segment: Dict[str, int], pending: List[bytes], offsets: List[int], size: int) -> None:
+        
+        f.write(b"".join(pending))
+        f.flush()
+        # Counts only move once the bytes are in the file, so a reader never
+        # sees a block that is not there yet.
+        self._offsets.extend(offsets)
+        segment["bytes"] = size
+        segment["blocks"] += len(offsets)
+    
+    def _active_file(self):
+        
+        if self._file is None:
+            if not self.segments:
+                self.segments.append({"number": 0, "first_block": 0, "blocks": 0, "bytes": 0})
+                self._first_blocks.append(0)
+                self._write_index()
+            self._file = open(self.segment_path(self.segments[-1]["number"]), "ab")
+        return self._file
+    
+    def _roll_over(self):
+        
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        
+        previous = self.segments[-1]
+        self._write_offsets(previous["number"], self._offsets)
+        self._sealed_offsets[previous["number"]] = self._offsets
+        self._offsets = array("Q")
+        self.segments.append({
+            "number": previous["number"] + 1,
+            "first_block": previous["first_block"] + previous["blocks"],
+            "blocks": 0,
+            "bytes": 0
+        })
+        self._first_blocks.append(self.segments[-1]["first_block"])
+        # The index only has to change when a segment is sealed; the active
+        # segment's counts are recovered by scanning it on open.
+        self._write_index()
+        self._file = open(self.segment_path(self.segments[-1]["number"]), "ab")
+        return self._file
+    
+    def _offsets_for(self, segment: Dict[str, int]) -> array:
+        
+        number = segment["number"]
+        with self._lock:
+            offsets = self._sealed_offsets.get(number)
+            if offsets is None and number == self.segments[-1]["number"]:
+                return self._offsets
+        if offsets is not None:
+            return offsets
+        
+        try:
+            offsets = array("Q")
+            with open(self.segment_path(number, OFFSETS_SUFFIX), "rb") as f:
+                offsets.frombytes(f.read())
+        except OSError:
+            offsets = array("Q")
+        if len(offsets) != segment["blocks"]:
+            # Sealed before offset sidecars were written, or the sidecar was lost.
+            offsets = self._walk(self._segment_data(segment))[0]
+            if not self.readonly:
+                self._write_offsets(number, offsets)
+        with self._lock:
+            return self._sealed_offsets.setdefault(number, offsets)
+    
+    def _mapped(self, number: int) -> Optional[Tuple[mmap.mmap, memoryview]]:
+        
+        # Sealed segments never change, so they are mapped once and read from
+        # the page cache; the active segment is still growing.
+        mapping = self._maps.get(number)
+        if mapping is not None:
+            return mapping
+        with self._lock:
+            if not self.segments or number >= self.segments[-1]["number"] or self._segment(number).get("archived"):
+                return None
+            if number not in self._maps:
+                with open(self.segment_path(number), "rb") as f:
+                    mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                self._maps[number] = (mapped, memoryview(mapped))
+            return self._maps[number]
+    
+    def _segment(self, number: int) -> Dict[str, int]:
+        
+        # Segments are numbered consecutively from the first one.
+        return self.segments[number - self.segments[0]["number"]]
+    
+    def _segment_data(self, segment: Dict[str, int]) -> Buffer:
+        
+        if not segment.get("archived"):
+            mapping = self._mapped(segment["number"])
+            if mapping is not None:
+                return mapping[0]
+            try:
+                with open(self.segment_path(segment["number"]), "rb") as f:
+                    return f.read(segment["bytes"])
+            except FileNotFoundError:
+                # Archived between the check and the open.
+                if not segment.get("archived"):
+                    raise
+        return self.archive(segment["number"]).data()
+    
+    def _write_offsets(self, number: int, offsets: array) -> None:
+        
+        path = self.segment_path(number, OFFSETS_SUFFIX)
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "wb") as f:
+            offsets.tofile(f)
+        os.replace(temp_path, path)
+    
+    def _load_index(self) -> None:
+        
+        index_path = os.path.join(self.directory, INDEX_FILE)
+        try:
+            with open(index_path, "r") as f:
+                self.segments = json.load(f)["segments"]
+        except (OSError, ValueError, KeyError):
+            self.segments = []
+        
+        for segment_format in SEGMENT_FORMATS.values():
+            on_disk = sorted(glob.glob(os.path.join(self.directory, f"{SEGMENT_PREFIX}*{segment_format.suffix}")))
+            if on_disk:
+                self.format = segment_format
+                break
+        on_disk += glob.glob(os.path.join(self.directory, f"{SEGMENT_PREFIX}*{ARCHIVE_SUFFIX}"))
+        if len(on_disk) != len(self.segments):
+            # Missing or stale index: rebuild it from the segments themselves.
+            self.segments = []
+            for path in sorted(on_disk):
+                name, suffix = os.path.splitext(os.path.basename(path))
+                first_block = self.block_count
+                self.segments.append({"number": int(name[len(SEGMENT_PREFIX):]), "first_block": first_block, "blocks": 0, "bytes": 0})
+                if suffix == ARCHIVE_SUFFIX:
+                    summary = self.archive(self.segments[-1]["number"]).summary
+                    self.segments[-1].update(blocks=summary["blocks"], bytes=summary["bytes"], archived=True)
+                else:
+                    self._scan_segment(self.segments[-1])
+            if not self.readonly:
+                self._write_index()
+        if self.segments:
+            self._offsets = self._scan_segment(self.segments[-1])
+        self._first_blocks = [segment["first_block"] for segment in self.segments]
+    
+    def _scan_segment(self, segment: Dict[str, int]) -> array:
+        
+        path = self.segment_path(segment["number"])
+        with open(path, "rb") as f:
+            data = f.read()
+        offsets, valid_bytes = self._walk(data)
+        if len(data) != valid_bytes and not self.readonly:
+            # Drop a record torn by a crash mid-append.
+            with open(path, "r+b") as f:
+                f.truncate(valid_bytes)
+        segment["blocks"] = len(offsets)
+        segment["bytes"] = valid_bytes
+        return offsets
+    
+    def _walk(self, data: Buffer) -> Tuple[array, int]:
+        
+        offsets = array("Q")
+        valid_bytes = 0
+        while True:
+            end = self.format.next_record(data, valid_bytes)
+            if end is None:
+                return offsets, valid_bytes
+            offsets.append(valid_bytes)
+            valid_bytes = end
+    
+    def _write_index(self) -> None:
+        
+        index_path = os.path.join(self.directory, INDEX_FILE)
+        temp_path = f"{index_path}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump({"version": INDEX_VERSION, "segments": self.segments}, f)
+        os.replace(temp_path, index_path)
@@ -1,43 +1,194 @@
 
 import hashlib
+import itertools
+import multiprocessing
+import os
+import sys
+import threading
 import time
 import json
-from typing import List, Dict, Any, Optional
+from bisect import bisect_left
+from collections.abc import Sequence
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, Iterator, List, Dict, Any, Optional, Tuple, Union
+
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bank_server.block_store import BlockLocation, BlockStore
+from bank_server.transaction_index import TransactionIndex
+from bank_server.account_index import AccountIndex
+from bank_server.time_index import TimeIndex
+from bank_server.chain_archive import archive_segments, load_key, verify_archives
+from bank_server.merkle import is_batch, leaf_hash, merkle_proof, merkle_root, verify_merkle_path
+from common.constants import BLOCKCHAIN
+
+CHECKPOINT_FILE = "verified.json"
+PENDING_FILE = "pending.jsonl"
 
 class Block:
     
+    __slots__ = ("transaction_id", "transaction_data", "previous_hash", "timestamp", "hash")
+    
     def __init__(self, transaction_id: str, transaction_data: Dict[str, Any], 
-                 previous_hash: str, timestamp: Optional[float] = None):
+                 previous_hash: str, timestamp: Optional[float] = None, hash: Optional[str] = None):
         self.transaction_id = transaction_id  
         self.transaction_data = transaction_data
         self.previous_hash = previous_hash
         self.timestamp = timestamp if timestamp else time.time()
+        self.hash = hash if hash is not None else self.compute_hash()
+        
         
+    @property
+    def is_batch(self) -> bool:
+        
+        return is_batch(self.transaction_data)
+    
+    def entries(self) -> List[Dict[str, Any]]:
+        
+        if self.is_batch:
+            return self.transaction_data["transactions"]
+        return [{"transaction_id": self.transaction_id, "transaction_data": self.transaction_data}]
+    
+    def compute_hash(self) -> str:
+        
+        # A batch block hashes only its Merkle root, so a transaction can be
+        # proven against the block without shipping the rest of the batch.
+        transaction_data = self.transaction_data
+        if self.is_batch:
+            transaction_data = {"merkle_root": transaction_data["merkle_root"]}
+        canonical = json.dumps({
+            "transaction_id": self.transaction_id,
+            "transaction_data": transaction_data,
+            "previous_hash": self.previous_hash,
+            "timestamp": self.timestamp
+        }, sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+    
+    def digest(self) -> str:
         
+        return self.hash or self.compute_hash()
+    
+    def follows(self, previous_block: Optional['Block']) -> bool:
+        
+        if self.hash is not None and self.hash != self.compute_hash():
+            return False
+        if self.is_batch and merkle_root([leaf_hash(entry) for entry in self.entries()]) != self.transaction_data["merkle_root"]:
+            return False
+        if previous_block is None:
+            return self.previous_hash == "0"
+        if self.hash is None and previous_block.hash is not None:
+            # Every block after the first hashed one carries a hash, so one
+            # without is a rewritten block, not an old one.
+            return False
+        if self.previous_hash == previous_block.digest():
+            return True
+        # Blocks written before content hashing link by transaction id.
+        return self.hash is None and self.previous_hash == previous_block.transaction_id
+    
     def to_dict(self) -> Dict[str, Any]:
         
-        return {
+        block_dict = {
             "transaction_id": self.transaction_id,
             "transaction_data": self.transaction_data,
             "previous_hash": self.previous_hash,
             "timestamp": self.timestamp
         }
+        if self.hash is not None:
+            block_dict["hash"] = self.hash
+        return block_dict
     
     @classmethod
     def from_dict(cls, block_dict: Dict[str, Any]) -> 'Block':
         
-        return cls(
+        block = cls(
             transaction_id=block_dict["transaction_id"],
             transaction_data=block_dict["transaction_data"],
             previous_hash=block_dict["previous_hash"],
-            timestamp=block_dict["timestamp"]
+            timestamp=block_dict["timestamp"],
+            hash=block_dict.get("hash", "")
         )
+        if not block.hash:
+            block.hash = None
+        return block
+
+class StoredChain(Sequence):
+    
+    def __init__(self, store: BlockStore):
+        self.store = store
+        # Only the tail is kept in memory; other blocks are read on demand.
+        self.tail: Optional[Block] = None
+    
+    def __len__(self) -> int:
+        
+        return self.store.block_count
+    
+    def __getitem__(self, index: Union[int, slice]) -> Union[Block, List[Block]]:
+        
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        
+        count = len(self)
+        if index < 0:
+            index += count
+        if index == count - 1 and self.tail is not None:
+            return self.tail
+        block = Block.from_dict(self.store.read_block(index))
+        if index == count - 1:
+            self.tail = block
+        return block
+    
+    def __iter__(self) -> Iterator[Block]:
+        
+        for record in self.store.iter_records():
+            yield Block.from_dict(record)
+    
+    def __reversed__(self) -> Iterator[Block]:
+        
+        for index in range(len(self) - 1, -1, -1):
+            yield self[index]
 
 class Blockchain:
     
-    def __init__(self):
-        self.chain: List[Block] = []
-        self.create_genesis_block()
+    def __init__(self, store: Optional[BlockStore] = None, batch_size: Optional[int] = None,
+                 batch_interval: Optional[float] = None):
+        self.store = store
+        self.batch_size = batch_size or BLOCKCHAIN["BATCH_MAX_TRANSACTIONS"]
+        self.batch_interval = BLOCKCHAIN["BATCH_MAX_AGE"] if batch_interval is None else batch_interval
+        # Transactions waiting to be sealed into the next batch block; stored
+        # chains journal them so a restart does not lose them.
+        self.pending: List[Dict[str, Any]] = []
+        self._pending_since = 0.0
+        self._journal = None
+        # Loaded (or rebuilt from the segments) on the first lookup.
+        self.index = TransactionIndex(store.directory) if store is not None else None
+        self.accounts = AccountIndex(store.directory) if store is not None else None
+        self.times = TimeIndex(store.directory, BLOCKCHAIN["TIME_INDEX_STRIDE"]) if store is not None else None
+        self._index_lock = threading.Lock()
+        # (blocks verified, digest of the last of them)
+        self._checkpoint: Optional[Tuple[int, str]] = None
+        if store is None:
+            self.chain: Union[List[Block], StoredChain] = []
+            self.create_genesis_block()
+        else:
+            self.chain = StoredChain(store)
+            if not store.block_count:
+                self.create_genesis_block()
+            self._load_pending()
+    
+    @classmethod
+    def open(cls, directory: str, legacy_files: Iterable[str] = (), **batching) -> 'Blockchain':
+        
+        store = BlockStore(directory)
+        if not store.block_count:
+            # One-time import of a chain saved by save_to_file; if several
+            # copies exist, keep the longest.
+            legacy = [chain for chain in (cls.load_from_file(f) for f in legacy_files if os.path.isfile(f)) if chain]
+            if legacy:
+                longest = max(legacy, key=lambda chain: len(chain.chain))
+                store.append(longest.to_dict_list())
+                print(f"Migrated {len(longest.chain)} blocks into {directory}")
+        return cls(store, **batching)
         
     def create_genesis_block(self) -> None:
         
@@ -47,7 +198,11 @@ class Blockchain:
             previous_hash="0",
             timestamp=time.time()
         )
-        self.chain.append(genesis_block)
+        if self.store is not None:
+            self.store.append([genesis_block.to_dict()])
+            self.chain.tail = genesis_block
+        else:
+            self.chain.append(genesis_block)
         
     def get_latest_block(self) -> Block:
         
@@ -55,29 +210,355 @@ class Blockchain:
     
     def add_block(self, transaction_id: str, transaction_data: Dict[str, Any]) -> Block:
         
+        return self.add_blocks([(transaction_id, transaction_data)])[0]
+    
+    def add_blocks(self, entries: List[Tuple[str, Dict[str, Any]]]) -> List[Block]:
+        
+        added = []
         previous_block = self.get_latest_block()
-        new_block = Block(
-            transaction_id=transaction_id,  
-            transaction_data=transaction_data,
-            previous_hash=previous_block.transaction_id  
-        )
-        self.chain.append(new_block)
-        return new_block
+        for transaction_id, transaction_data in entries:
+            new_block = Block(
+                transaction_id=transaction_id,  
+                transaction_data=transaction_data,
+                previous_hash=previous_block.digest()
+            )
+            added.append(new_block)
+            previous_block = new_block
+        
+        if self.store is not None:
+            with self._index_lock:
+                records = [block.to_dict() for block in added]
+                locations = self.store.append(records)
+                self.index.add(index_entries(zip(locations, records)), self.store.block_count)
+                self.accounts.add(zip(records, locations), self.store.block_count)
+                self.times.add(self.store.block_count - len(added), (block.timestamp for block in added))
+                self.chain.tail = added[-1]
+        else:
+            self.chain.extend(added)
+        return added
     
-    def is_chain_valid(self) -> bool:
+    def locate(self, transaction_id: str) -> Optional[BlockLocation]:
         
-        for i in range(1, len(self.chain)):
-            current_block = self.chain[i]
-            previous_block = self.chain[i-1]
-            
-            
-            if current_block.previous_hash != previous_block.transaction_id:
+        if self.store is None:
+            return None
+        with self._index_lock:
+            if not self.index.loaded and not self.index.load(self.store.block_count):
+                self.index.rebuild(index_entries(self.store.scan()), self.store.block_count)
+            # A merge swaps the sorted file under the lookup.
+            return self.index.get(transaction_id)
+    
+    def add_transactions(self, entries: List[Tuple[str, Dict[str, Any]]]) -> Optional[Block]:
+        
+        if not self.pending:
+            self._pending_since = time.monotonic()
+        added = [{"transaction_id": transaction_id, "transaction_data": transaction_data}
+                 for transaction_id, transaction_data in entries]
+        if self.store is not None:
+            self._journal = self._journal or open(os.path.join(self.store.directory, PENDING_FILE), "ab")
+            self._journal.write(b"".join(json.dumps(entry).encode("utf-8") + b"\n" for entry in added))
+            self._journal.flush()
+            if self.store.fsync:
+                os.fsync(self._journal.fileno())
+        self.pending = self.pending + added
+        
+        if len(self.pending) >= self.batch_size or self.seal_due():
+            return self.seal()
+        return None
+    
+    def seal_due(self) -> bool:
+        
+        return bool(self.pending) and time.monotonic() - self._pending_since >= self.batch_interval
+    
+    def seal(self) -> Optional[Block]:
+        
+        if not self.pending:
+            return None
+        transactions = self.pending
+        root = merkle_root([leaf_hash(entry) for entry in transactions])
+        block = self.add_blocks([(root, {"merkle_root": root, "transactions": transactions})])[0]
+        # Readers look at pending before the indexes, so the batch is only
+        # dropped from pending once it is findable on the chain.
+        self.pending = []
+        if self.store is not None:
+            self._journal = self._journal or open(os.path.join(self.store.directory, PENDING_FILE), "ab")
+            self._journal.seek(0)
+            self._journal.truncate()
+        return block
+    
+    def find_block(self, transaction_id: str) -> Optional[Block]:
+        
+        if self.store is None:
+            for block in self.chain:
+                if block.transaction_id == transaction_id or any(
+                        entry["transaction_id"] == transaction_id for entry in block.entries()):
+                    return block
+            return None
+        
+        location = self.locate(transaction_id)
+        if location is None:
+            return None
+        block = Block.from_dict(self.store.read_at(location))
+        # Keys are 128-bit digests; guard against a collision anyway.
+        if block.transaction_id == transaction_id or any(entry["transaction_id"] == transaction_id for entry in block.entries()):
+            return block
+        return None
+    
+    def find_transaction(self, transaction_id: str) -> Optional[Dict[str, Any]]:
+        
+        for entry in self.pending:
+            if entry["transaction_id"] == transaction_id:
+                return entry["transaction_data"]
+        if self.store is not None:
+            location = self.locate(transaction_id)
+            entry = None if location is None else self._stored_entry(location, transaction_id)
+            if entry is not None:
+                return entry["transaction_data"]
+        block = self.find_block(transaction_id)
+        if block is None:
+            return None
+        for entry in block.entries():
+            if entry["transaction_id"] == transaction_id:
+                return entry["transaction_data"]
+        return block.transaction_data
+    
+    def transaction_proof(self, transaction_id: str) -> Optional[Dict[str, Any]]:
+        
+        block = self.find_block(transaction_id)
+        if block is None or not block.is_batch:
+            return None
+        entries = block.entries()
+        positions = [i for i, entry in enumerate(entries) if entry["transaction_id"] == transaction_id]
+        if not positions:
+            return None
+        
+        return {
+            "transaction_id": transaction_id,
+            "leaf_index": positions[0],
+            "path": merkle_proof([leaf_hash(entry) for entry in entries], positions[0]),
+            "merkle_root": block.transaction_data["merkle_root"],
+            "block": {
+                "transaction_id": block.transaction_id,
+                "previous_hash": block.previous_hash,
+                "timestamp": block.timestamp,
+                "hash": block.hash
+            }
+        }
+    
+    def account_history(self, account_id: str, limit: int, before: Optional[Tuple[float, str]] = None,
+                        start_time: Optional[float] = None, end_time: Optional[float] = None) -> List[Tuple[float, str, Dict[str, Any]]]:
+        
+        def wanted(timestamp, transaction_id, transaction_data):
+            if account_id not in (transaction_data.get("sender_id"), transaction_data.get("receiver_id")):
                 return False
-                
-        return True
+            if (start_time is not None and timestamp < start_time) or (end_time is not None and timestamp >= end_time):
+                return False
+            return before is None or (timestamp, transaction_id) < before
+        
+        # Unsealed transactions are part of the history too.
+        candidates = list(self.pending)
+        if self.store is None:
+            for block in self.chain[1:]:
+                candidates.extend(
+                    {"transaction_id": entry["transaction_id"], "transaction_data": entry["transaction_data"], "timestamp": block.timestamp}
+                    for entry in block.entries()
+                )
+        
+        matches = []
+        for entry in candidates:
+            transaction_data = entry["transaction_data"]
+            timestamp = float(transaction_data.get("timestamp", entry.get("timestamp", 0.0)))
+            if wanted(timestamp, entry["transaction_id"], transaction_data):
+                matches.append((timestamp, entry["transaction_id"], transaction_data))
+        
+        if self.store is not None:
+            with self._index_lock:
+                if not self.accounts.current:
+                    self.accounts.catch_up(self.store)
+                postings = self.accounts.query(account_id, limit, before, start_time, end_time)
+            for timestamp, transaction_id, segment, offset in postings:
+                entry = self._stored_entry((segment, offset), transaction_id)
+                if entry is not None:
+                    matches.append((timestamp, transaction_id, entry["transaction_data"]))
+        
+        matches.sort(key=lambda match: (match[0], match[1]), reverse=True)
+        return matches[:limit]
     
+    def position_at(self, timestamp: float) -> int:
+        
+        # The first block stamped at or after timestamp; every block before
+        # it is older. Blocks only carry a timestamp, so this is a search.
+        if self.store is None:
+            return bisect_left(self.chain, timestamp, key=lambda block: block.timestamp)
+        with self._index_lock:
+            if not self.times.current:
+                self.times.catch_up(self.store)
+            position = self.times.lower_bound(timestamp)
+        while position < self.store.block_count and self.store.timestamp_at(position) < timestamp:
+            position += 1
+        return position
     
-                
+    def blocks_between(self, start_time: float, end_time: float) -> Iterator[Tuple[int, Block]]:
+        
+        # (position, block) for the blocks stamped in [start_time, end_time).
+        position = self.position_at(start_time)
+        blocks = self.chain[position:] if self.store is None else (
+            Block.from_dict(record) for record in self.store.iter_records(position))
+        for position, block in enumerate(blocks, position):
+            if block.timestamp >= end_time:
+                return
+            if block.timestamp >= start_time:
+                yield position, block
+    
+    def transactions_between(self, start_time: float, end_time: float) -> List[Tuple[float, str, Dict[str, Any]]]:
+        
+        # By transaction time rather than block time: a batch is sealed after
+        # the payments in it, so a cutoff can fall inside one block.
+        matches = []
+        for entry in self.pending:
+            timestamp = float(entry["transaction_data"].get("timestamp", 0.0))
+            if start_time <= timestamp < end_time:
+                matches.append((timestamp, entry["transaction_id"], entry["transaction_data"]))
+        
+        position = max(1, self.position_at(start_time))
+        blocks = self.chain[position:] if self.store is None else (
+            Block.from_dict(record) for record in self.store.iter_records(position))
+        for block in blocks:
+            earliest = block.timestamp
+            for entry in block.entries():
+                transaction_data = entry["transaction_data"]
+                timestamp = float(transaction_data.get("timestamp", block.timestamp))
+                earliest = min(earliest, timestamp)
+                if start_time <= timestamp < end_time:
+                    matches.append((timestamp, entry["transaction_id"], transaction_data))
+            if earliest >= end_time:
+                break
+        
+        matches.sort(key=lambda match: (match[0], match[1]))
+        return matches
+    
+    def archive(self, keep_segments: Optional[int] = None, key: Optional[bytes] = None) -> List[Dict[str, Any]]:
+        
+        if self.store is None:
+            return []
+        keep_segments = BLOCKCHAIN["ARCHIVE_KEEP_SEGMENTS"] if keep_segments is None else keep_segments
+        return archive_segments(self.store, keep_segments, key or load_key(),
+                                lambda record: Block.from_dict(record).digest())
+    
+    def verify_archives(self, key: Optional[bytes] = None) -> bool:
+        
+        if self.store is None or not any(segment.get("archived") for segment in self.store.segments):
+            return True
+        return verify_archives(self.store, key or load_key())
+    
+    def close(self) -> None:
+        
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+        if self.store is not None:
+            self.store.close()
+            self.index.close()
+            self.accounts.close()
+            self.times.close()
+    
+    def is_chain_valid(self) -> bool:
+        
+        return self.verify(since_checkpoint=False)
+    
+    def verify(self, since_checkpoint: bool = True, workers: int = 1) -> bool:
+        
+        end = len(self.chain)
+        start, previous_block = self._load_checkpoint(end) if since_checkpoint else (0, None)
+        
+        if workers > 1 and self.store is not None and end - start > workers:
+            valid = self._verify_parallel(start, end, previous_block, workers)
+            last_block = self.chain[end - 1]
+        else:
+            valid, last_block = verify_blocks(self._blocks(start, end), previous_block)
+        
+        if valid and last_block is not None:
+            self._save_checkpoint(end, last_block)
+        return valid
+    
+    def _blocks(self, start: int, end: int) -> Iterable[Block]:
+        
+        if self.store is None:
+            return self.chain[start:end]
+        records = itertools.islice(self.store.iter_records(start), end - start)
+        return (Block.from_dict(record) for record in records)
+    
+    def _verify_parallel(self, start: int, end: int, previous_block: Optional[Block], workers: int) -> bool:
+        
+        # Each range checks its own first link against the block before it,
+        # so the ranges together cover every link in [start, end).
+        step = -(-(end - start) // workers)
+        jobs = []
+        for first in range(start, end, step):
+            previous = previous_block if first == start else self.chain[first - 1]
+            jobs.append((self.store.directory, first, min(step, end - first), previous.to_dict() if previous else None))
+        
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+            return all(pool.map(verify_range, jobs))
+    
+    def _stored_entry(self, location: BlockLocation, transaction_id: str) -> Optional[Dict[str, Any]]:
+        
+        # Decodes just the one transaction, not the rest of its batch.
+        view = self.store.view_at(location)
+        try:
+            index = view.find(transaction_id)
+            return None if index is None else view.entry(index)
+        finally:
+            view.buffer.release()
+    
+    def _load_pending(self) -> None:
+        
+        path = os.path.join(self.store.directory, PENDING_FILE)
+        try:
+            with open(path, "rb") as f:
+                lines = [line for line in f if line.endswith(b"\n")]
+        except OSError:
+            return
+        
+        # A crash between sealing and clearing the journal leaves entries
+        # that are already in the last block.
+        sealed = {entry["transaction_id"] for entry in self.get_latest_block().entries()}
+        self.pending = [entry for entry in (json.loads(line) for line in lines) if entry["transaction_id"] not in sealed]
+        self._pending_since = time.monotonic()
+        with open(path, "wb") as f:
+            f.write(b"".join(json.dumps(entry).encode("utf-8") + b"\n" for entry in self.pending))
+    
+    def _load_checkpoint(self, end: int) -> Tuple[int, Optional[Block]]:
+        
+        checkpoint = self._checkpoint
+        if checkpoint is None and self.store is not None:
+            try:
+                with open(os.path.join(self.store.directory, CHECKPOINT_FILE), "r") as f:
+                    data = json.load(f)
+                checkpoint = (data["blocks"], data["hash"])
+            except (OSError, ValueError, KeyError):
+                checkpoint = None
+        if checkpoint is None or not 0 < checkpoint[0] <= end:
+            return 0, None
+        
+        blocks, digest = checkpoint
+        anchor = self.chain[blocks - 1]
+        # The last verified block must still hash to what was recorded;
+        # otherwise fall back to a full pass.
+        if anchor.digest() != digest or anchor.compute_hash() != digest:
+            return 0, None
+        return blocks, anchor
+    
+    def _save_checkpoint(self, blocks: int, last_block: Block) -> None:
+        
+        self._checkpoint = (blocks, last_block.digest())
+        if self.store is None or self.store.readonly:
+            return
+        path = os.path.join(self.store.directory, CHECKPOINT_FILE)
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump({"blocks": blocks, "hash": last_block.digest()}, f)
+        os.replace(temp_path, path)
     
     def to_dict_list(self) -> List[Dict[str, Any]]:
         
@@ -103,6 +584,8 @@ class Blockchain:
     @classmethod
     def load_from_file(cls, filename: str) -> Optional['Blockchain']:
         
+        if os.path.isdir(filename):
+            return cls(BlockStore(filename))
         try:
             with open(filename, 'r') as file:
                 blockchain_data = json.load(file)
@@ -110,6 +593,50 @@ class Blockchain:
         except (FileNotFoundError, json.JSONDecodeError):
             return None
 
+def index_entries(scan: Iterable[Tuple[BlockLocation, Dict[str, Any]]]) -> Iterator[Tuple[str, BlockLocation]]:
+    
+    # Every transaction in a batch block points at the block's location.
+    for location, record in scan:
+        yield record["transaction_id"], location
+        if is_batch(record["transaction_data"]):
+            for entry in record["transaction_data"]["transactions"]:
+                yield entry["transaction_id"], location
+
+def verify_transaction_proof(transaction_id: str, transaction_data: Dict[str, Any], proof: Dict[str, Any]) -> bool:
+    
+    leaf = leaf_hash({"transaction_id": transaction_id, "transaction_data": transaction_data})
+    if not verify_merkle_path(leaf, proof["path"], proof["merkle_root"]):
+        return False
+    header = proof["block"]
+    block = Block(
+        transaction_id=header["transaction_id"],
+        transaction_data={"merkle_root": proof["merkle_root"], "transactions": []},
+        previous_hash=header["previous_hash"],
+        timestamp=header["timestamp"],
+        hash=header["hash"]
+    )
+    return block.compute_hash() == header["hash"]
+
+def verify_blocks(blocks: Iterable[Block], previous_block: Optional[Block]) -> Tuple[bool, Optional[Block]]:
+    
+    for block in blocks:
+        if not block.follows(previous_block):
+            return False, previous_block
+        previous_block = block
+    return True, previous_block
+
+def verify_range(job: Tuple[str, int, int, Optional[Dict[str, Any]]]) -> bool:
+    
+    # Runs in a worker process, against a read-only view of the segments.
+    directory, start, count, previous_dict = job
+    store = BlockStore(directory, readonly=True)
+    try:
+        records = itertools.islice(store.iter_records(start), count)
+        previous_block = Block.from_dict(previous_dict) if previous_dict else None
+        return verify_blocks((Block.from_dict(record) for record in records), previous_block)[0]
+    finally:
+        store.close()
+
 def generate_transaction_id(uid: str, mid: str, amount: float, timestamp: float) -> str:
     
     transaction_string = f"{uid}{mid}{amount}{timestamp}".encode()
@@ -0,0 +1,259 @@
+
+import argparse
+import hashlib
+import hmac
+import itertools
+import json
+import os
+import random
+import struct
+import sys
+import time
+import zlib
+from typing import Any, Callable, Dict, List, Optional
+
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bank_server.merkle import block_entries
+from common.constants import BLOCKCHAIN
+
+ARCHIVE_SUFFIX = ".arc"
+ARCHIVE_MAGIC = b"UPIARC1\n"
+ARCHIVE_VERSION = 1
+SUMMARY_LENGTH = struct.Struct("<I")
+
+def load_key(path: Optional[str] = None) -> bytes:
+    
+    # Created on first use; anyone who can rewrite an archive without this
+    # key cannot produce a summary that verifies.
+    path = path or os.path.join(BLOCKCHAIN["DATA_DIR"], BLOCKCHAIN["ARCHIVE_KEY_FILE"])
+    try:
+        with open(path, "rb") as f:
+            return f.read()
+    except FileNotFoundError:
+        pass
+    
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    key = os.urandom(32)
+    try:
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    except FileExistsError:
+        with open(path, "rb") as f:
+            return f.read()
+    with os.fdopen(fd, "wb") as f:
+        f.write(key)
+    return key
+
+def sign_summary(summary: Dict[str, Any], key: bytes) -> str:
+    
+    unsigned = {field: value for field, value in summary.items() if field != "signature"}
+    canonical = json.dumps(unsigned, sort_keys=True, separators=(",", ":")).encode("utf-8")
+    return hmac.new(key, canonical, hashlib.sha256).hexdigest()
+
+def write_archive(path: str, data: bytes, summary: Dict[str, Any], key: bytes, chunk_bytes: int) -> Dict[str, Any]:
+    
+    # Chunks are compressed separately so a point read only inflates one.
+    chunks = []
+    compressed = []
+    position = 0
+    for start in range(0, len(data), chunk_bytes):
+        chunk = zlib.compress(data[start:start + chunk_bytes], BLOCKCHAIN["ARCHIVE_COMPRESSION_LEVEL"])
+        chunks.append([position, len(chunk)])
+        compressed.append(chunk)
+        position += len(chunk)
+    
+    summary = dict(summary, version=ARCHIVE_VERSION, chunk_bytes=chunk_bytes, chunks=chunks,
+                   archive_bytes=position, sha256=hashlib.sha256(data).hexdigest())
+    summary["signature"] = sign_summary(summary, key)
+    encoded = json.dumps(summary, separators=(",", ":")).encode("utf-8")
+    
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "wb") as f:
+        f.write(ARCHIVE_MAGIC + SUMMARY_LENGTH.pack(len(encoded)) + encoded)
+        f.write(b"".join(compressed))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+    return summary
+
+class ArchiveReader:
+    
+    def __init__(self, path: str):
+        self.path = path
+        self._fd = os.open(path, os.O_RDONLY)
+        header = os.pread(self._fd, len(ARCHIVE_MAGIC) + SUMMARY_LENGTH.size, 0)
+        if not header.startswith(ARCHIVE_MAGIC):
+            os.close(self._fd)
+            raise ValueError(f"{path} is not a chain archive")
+        length = SUMMARY_LENGTH.unpack_from(header, len(ARCHIVE_MAGIC))[0]
+        self.summary: Dict[str, Any] = json.loads(os.pread(self._fd, length, len(header)))
+        self._data_start = len(header) + length
+        # The most recently inflated chunk; consecutive reads usually share it.
+        self._cached = (-1, b"")
+    
+    def read(self, start: int, end: int) -> bytes:
+        
+        chunk_bytes = self.summary["chunk_bytes"]
+        first, last = start // chunk_bytes, (end - 1) // chunk_bytes
+        data = b"".join(self._chunk(index) for index in range(first, last + 1))
+        base = first * chunk_bytes
+        return data[start - base:end - base]
+    
+    def data(self) -> bytes:
+        
+        return b"".join(self._chunk(index) for index in range(len(self.summary["chunks"])))
+    
+    def verify(self, key: bytes) -> bool:
+        
+        if not hmac.compare_digest(self.summary.get("signature", ""), sign_summary(self.summary, key)):
+            return False
+        try:
+            return hashlib.sha256(self.data()).hexdigest() == self.summary["sha256"]
+        except zlib.error:
+            return False
+    
+    def close(self) -> None:
+        
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+    
+    def _chunk(self, index: int) -> bytes:
+        
+        cached_index, cached = self._cached
+        if cached_index == index:
+            return cached
+        offset, length = self.summary["chunks"][index]
+        chunk = zlib.decompress(os.pread(self._fd, length, self._data_start + offset))
+        self._cached = (index, chunk)
+        return chunk
+
+def summarize_segment(records: List[Dict[str, Any]], previous_balances: Dict[str, int],
+                      digest: Callable[[Dict[str, Any]], str]) -> Dict[str, Any]:
+    
+    # Net flow per account from the genesis block up to the end of this
+    # segment, in paise, carried forward from the previous archive.
+    balances = dict(previous_balances)
+    transactions = 0
+    for record in records:
+        for entry in block_entries(record):
+            transaction_data = entry["transaction_data"]
+            amount = transaction_data.get("amount")
+            if not isinstance(amount, (int, float)):
+                continue
+            paise = round(amount * 100)
+            sender_id, receiver_id = transaction_data.get("sender_id"), transaction_data.get("receiver_id")
+            if sender_id:
+                balances[sender_id] = balances.get(sender_id, 0) - paise
+            if receiver_id:
+                balances[receiver_id] = balances.get(receiver_id, 0) + paise
+            transactions += 1
+    
+    return {
+        "previous_hash": records[0]["previous_hash"],
+        "last_hash": digest(records[-1]),
+        "first_timestamp": records[0]["timestamp"],
+        "last_timestamp": records[-1]["timestamp"],
+        "transactions": transactions,
+        "balances": balances
+    }
+
+def archive_segments(store, keep_segments: int, key: bytes, digest: Callable[[Dict[str, Any]], str]) -> List[Dict[str, Any]]:
+    
+    # Always oldest first, so every summary can carry its balances forward.
+    archived = []
+    candidates = store.segments[:-1][:max(0, len(store.segments) - 1 - keep_segments)]
+    previous_balances: Dict[str, int] = {}
+    for segment in candidates:
+        if segment.get("archived"):
+            previous_balances = store.archive(segment["number"]).summary["balances"]
+            continue
+        records = list(itertools.islice(store.iter_records(segment["first_block"]), segment["blocks"]))
+        if not records:
+            continue
+        summary = summarize_segment(records, previous_balances, digest)
+        summary.update(segment=segment["number"], first_block=segment["first_block"], blocks=segment["blocks"],
+                       bytes=segment["bytes"], format=store.format.name, created=time.time())
+        with open(store.segment_path(segment["number"]), "rb") as f:
+            data = f.read(segment["bytes"])
+        summary = write_archive(store.segment_path(segment["number"], ARCHIVE_SUFFIX), data, summary, key,
+                                BLOCKCHAIN["ARCHIVE_CHUNK_BYTES"])
+        store.mark_archived(segment["number"])
+        previous_balances = summary["balances"]
+        archived.append(summary)
+    return archived
+
+def verify_archives(store, key: bytes) -> bool:
+    
+    previous_hash = "0"
+    for segment in store.segments:
+        if not segment.get("archived"):
+            break
+        archive = store.archive(segment["number"])
+        summary = archive.summary
+        if not archive.verify(key) or summary["blocks"] != segment["blocks"]:
+            return False
+        # Each archive links to the one before it, the first to genesis.
+        if summary["previous_hash"] != previous_hash:
+            return False
+        previous_hash = summary["last_hash"]
+    
+    # The hot part of the chain has to pick up where the archives end.
+    first_hot = sum(segment["blocks"] for segment in store.segments if segment.get("archived"))
+    if previous_hash == "0" or first_hot >= store.block_count:
+        return True
+    return store.read_block(first_hot)["previous_hash"] == previous_hash
+
+def main():
+    
+    from bank_server.blockchain import Blockchain
+    
+    parser = argparse.ArgumentParser(description="Archive old segments of a bank's blockchain")
+    parser.add_argument("bank", help="Bank name, e.g. 'State Bank of India'")
+    parser.add_argument("--data-dir", default=BLOCKCHAIN["DATA_DIR"])
+    parser.add_argument("--keep-segments", type=int, default=BLOCKCHAIN["ARCHIVE_KEEP_SEGMENTS"],
+                        help="Sealed segments to leave uncompressed")
+    parser.add_argument("--samples", type=int, default=200, help="Lookups used to measure query latency")
+    args = parser.parse_args()
+    
+    directory = os.path.join(args.data_dir, f"blockchain_{args.bank.replace(' ', '_')}")
+    if not os.path.isdir(directory):
+        print(f"No blockchain found at {directory}")
+        return 1
+    key = load_key(os.path.join(args.data_dir, BLOCKCHAIN["ARCHIVE_KEY_FILE"]))
+    blockchain = Blockchain.open(directory)
+    try:
+        summaries = blockchain.archive(args.keep_segments, key)
+        raw = sum(summary["bytes"] for summary in summaries)
+        compressed = sum(summary["archive_bytes"] for summary in summaries)
+        print(f"Archived {len(summaries)} segments ({sum(summary['blocks'] for summary in summaries)} blocks)")
+        if compressed:
+            print(f"  {raw / 1e6:.1f} MB -> {compressed / 1e6:.1f} MB, compression ratio {raw / compressed:.2f}x")
+        
+        archived = [segment for segment in blockchain.store.segments if segment.get("archived")]
+        hot = [segment for segment in blockchain.store.segments if not segment.get("archived") and segment["blocks"]]
+        rng = random.Random(0)
+        # The first lookup builds the transaction index; keep it out of the timings.
+        blockchain.find_transaction("")
+        for label, segments in (("archived", archived), ("hot", hot)):
+            if not segments:
+                continue
+            transaction_ids = []
+            for _ in range(args.samples):
+                segment = rng.choice(segments)
+                entries = blockchain.chain[segment["first_block"] + rng.randrange(segment["blocks"])].entries()
+                transaction_ids.append(rng.choice(entries)["transaction_id"])
+            start = time.perf_counter()
+            for transaction_id in transaction_ids:
+                blockchain.find_transaction(transaction_id)
+            latency = (time.perf_counter() - start) / len(transaction_ids) * 1e6
+            print(f"  {label} lookup latency: {latency:.0f}us")
+        
+        print(f"  archives verify: {blockchain.verify_archives(key)}")
+    finally:
+        blockchain.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
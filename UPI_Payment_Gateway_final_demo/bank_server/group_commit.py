@@ -0,0 +1,104 @@
+
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, List, Optional
+
+class GroupCommitWriter:
+    
+    def __init__(self, write_batch: Callable[[List[bytes]], None], max_batch: int = 256, max_wait: float = 0.0):
+        if max_batch < 1:
+            raise ValueError("max_batch must be at least 1")
+        
+        self.write_batch = write_batch
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.stats = {"batches": 0, "records": 0, "largest_batch": 0}
+        
+        self._queue: Deque[bytes] = deque()
+        self._condition = threading.Condition()
+        self._submitted = 0
+        self._durable = 0
+        # The first failed write and its ticket; every later ticket fails
+        # with it, since records after a lost one must not become durable.
+        self._error: Optional[Exception] = None
+        self._failed_from = 0
+        self._closed = False
+        self._writer = threading.Thread(target=self._run, name="group-commit", daemon=True)
+        self._writer.start()
+    
+    def submit(self, record: bytes) -> int:
+        
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("Group commit writer is closed")
+            self._queue.append(record)
+            self._submitted += 1
+            self._condition.notify_all()
+            return self._submitted
+    
+    def wait(self, ticket: int, timeout: Optional[float] = None) -> None:
+        
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            while self._durable < ticket:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise TimeoutError(f"Record {ticket} was not made durable within {timeout}s")
+                self._condition.wait(remaining)
+            
+            if self._error is not None and ticket >= self._failed_from:
+                raise self._error
+    
+    def flush(self, timeout: Optional[float] = None) -> None:
+        
+        with self._condition:
+            ticket = self._submitted
+        self.wait(ticket, timeout)
+    
+    def close(self) -> None:
+        
+        with self._condition:
+            if self._closed:
+                return
+            self._closed = True
+            self._condition.notify_all()
+        self._writer.join()
+    
+    def _run(self) -> None:
+        
+        while True:
+            with self._condition:
+                while not self._queue and not self._closed:
+                    self._condition.wait()
+                if not self._queue:
+                    return
+                
+                # Give concurrent committers up to max_wait to join this batch.
+                deadline = time.monotonic() + self.max_wait
+                while len(self._queue) < self.max_batch and not self._closed:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._condition.wait(remaining)
+                
+                batch = [self._queue.popleft() for _ in range(min(len(self._queue), self.max_batch))]
+                first = self._durable + 1
+                last = self._durable + len(batch)
+            
+            error = self._error
+            if error is None:
+                try:
+                    self.write_batch(batch)
+                except Exception as e:
+                    error = e
+            
+            with self._condition:
+                if error is not None and self._error is None:
+                    self._error = error
+                    self._failed_from = first
+                self._durable = last
+                self.stats["batches"] += 1
+                self.stats["records"] += len(batch)
+                self.stats["largest_batch"] = max(self.stats["largest_batch"], len(batch))
+                self._condition.notify_all()
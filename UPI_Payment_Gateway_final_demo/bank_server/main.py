@@ -4,6 +4,7 @@ import os
 import threading
 import time
 import hashlib
+import uuid
 from quantum_crypto import demonstrate_pin_vulnerability, crack_pin
 from crypto import generate_sha256_hash
 import random
@@ -15,19 +16,25 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from bank_server.bank_manager import BankManager
 from bank_server.network import BankServerNetwork
 from common.network_protocol import Message
-from common.constants import NETWORK
+from common.constants import BLOCKCHAIN, MERCHANT_CACHE, NETWORK, STORAGE
 
 class BankServer:
-    def __init__(self):
-        self.bank_manager = BankManager()
-        self.network = BankServerNetwork()
+    def __init__(self, server_mode=None, backlog=None, storage_backend=None):
+        self.bank_manager = BankManager(storage_backend=storage_backend)
+        self.network = BankServerNetwork(mode=server_mode, backlog=backlog)
         
         
         self.network.register_handler("REGISTER_USER", self.handle_register_user)
         self.network.register_handler("REGISTER_MERCHANT", self.handle_register_merchant)
         self.network.register_handler("AUTHENTICATE_USER", self.handle_authenticate_user)
         self.network.register_handler("PROCESS_TRANSACTION", self.handle_process_transaction)
-        self.network.register_handler("GET_MERCHANT_INFO", self.handle_get_merchant_info)
+        self.network.register_handler("PROCESS_TRANSACTION_BATCH", self.handle_process_transaction_batch)
+        # A dict lookup can run on the event loop; a SQLite query must not.
+        self.network.register_handler("GET_MERCHANT_INFO", self.handle_get_merchant_info,
+                                      blocking=not self.bank_manager.storage.in_memory)
+        self.network.register_handler("GET_MERCHANTS", self.handle_get_merchants)
+        self.network.register_handler("GET_TRANSACTION_HISTORY", self.handle_get_transaction_history)
+        self.network.register_handler("GET_TRANSACTION_PROOF", self.handle_get_transaction_proof)
         self.network.register_handler("VERIFY_PIN", self.handle_verify_pin)
         
     def start(self):
@@ -59,10 +66,12 @@ class BankServer:
                     self.list_users()
                 elif command == "list merchants":
                     self.list_merchants()
-                # elif command == "verify blockchain":
-                #     self.verify_blockchain_command()
+                elif command == "verify blockchain":
+                    self.verify_blockchain_command()
                 elif command == "show blockchain":
                     self.show_blockchain_command()
+                elif command == "archive blockchain":
+                    self.archive_blockchain_command()
                 # elif command == "audit":
                 #     self.run_security_audit()
                 elif command == "register_bank":
@@ -76,6 +85,7 @@ class BankServer:
             print("\nShutting down Bank Server...")
         finally:
             self.network.stop()
+            self.bank_manager.close()
 
     def generate_sha256_hash(input_str: str) -> str:
         
@@ -90,8 +100,9 @@ class BankServer:
         print("  register merchant - Register a new merchant")
         print("  list users        - Display all registered users")
         print("  list merchants    - Display all registered merchants")
-        # print("  verify blockchain - Verify blockchain integrity")
+        print("  verify blockchain - Verify blockchain integrity")
         print("  show blockchain   - Display blockchain for a bank")
+        print("  archive blockchain - Compress old blocks of a bank's chain")
         # print("  Vulnerability test- Run PIN vulnerability test")
         print("  exit              - Shutdown the server")
         print("  help              - Display this help message")
@@ -288,6 +299,8 @@ class BankServer:
             initial_balance=float(merchant_data.get("initial_balance", 0.0))
         )
         
+        if success:
+            self.publish_merchant_update(merchant_id)
         response_data = {
             "success": success,
             "merchant_id": merchant_id if success else None,
@@ -374,6 +387,33 @@ class BankServer:
             data=response_data,
             message_id=message.message_id
         )
+
+    def handle_process_transaction_batch(self, message):
+        
+        transfers = message.data.get("transactions", [])
+        print(f"Processing transaction batch of {len(transfers)}")
+        outcomes = self.bank_manager.process_transaction_batch(transfers)
+        
+        results = []
+        for success, transaction_id_or_error in outcomes:
+            results.append({
+                "success": success,
+                "transaction_id": transaction_id_or_error if success else None,
+                "error": None if success else transaction_id_or_error or "Transaction failed"
+            })
+        
+        response_data = {
+            "success": all(result["success"] for result in results),
+            "results": results
+        }
+        
+        return Message(
+            message_type="PROCESS_TRANSACTION_BATCH_RESPONSE",
+            sender="BANK_SERVER",
+            receiver=message.sender,
+            data=response_data,
+            message_id=message.message_id
+        )
     def run_security_audit(self):
         
         print("\nRunning security audit...")
@@ -421,6 +461,101 @@ class BankServer:
             message_id=message.message_id
         )
 
+    def handle_get_merchants(self, message):
+        
+        # Bulk variant of GET_MERCHANT_INFO for the UPI machine's cache: the
+        # named ids, every id with a prefix, or the whole directory.
+        merchant_ids = message.data.get("merchant_ids")
+        if merchant_ids is None:
+            merchant_ids = self.bank_manager.find_merchants_by_prefix(message.data.get("prefix") or "")
+        
+        merchants = {}
+        missing = []
+        for merchant_id in merchant_ids:
+            merchant = self.bank_manager.merchants.get(merchant_id)
+            if merchant:
+                merchants[merchant_id] = {"merchant_name": merchant.name, "bank_code": merchant.bank_code}
+            else:
+                missing.append(merchant_id)
+        
+        return Message(
+            message_type="GET_MERCHANTS_RESPONSE",
+            sender="BANK_SERVER",
+            receiver=message.sender,
+            data={"success": True, "merchants": merchants, "missing": missing},
+            message_id=message.message_id
+        )
+
+    def publish_merchant_update(self, merchant_id):
+        
+        # Best effort, off the request path: tells the UPI machine to drop
+        # its cached entry, which may be a negative one for this id.
+        if not MERCHANT_CACHE["PUSH_UPDATES"]:
+            return
+        message = Message(
+            message_type="MERCHANT_UPDATED",
+            sender="BANK_SERVER",
+            receiver="UPI_MACHINE",
+            data={"merchant_id": merchant_id},
+            message_id=str(uuid.uuid4())
+        )
+        threading.Thread(
+            target=self.network.send_message,
+            args=(NETWORK["UPI_MACHINE_HOST"], NETWORK["UPI_MACHINE_PORT"], message),
+            daemon=True
+        ).start()
+
+    def handle_get_transaction_history(self, message):
+        
+        try:
+            transactions, next_cursor = self.bank_manager.get_account_transactions(
+                message.data.get("account_id"),
+                limit=message.data.get("limit"),
+                cursor=message.data.get("cursor"),
+                start_time=message.data.get("start_time"),
+                end_time=message.data.get("end_time")
+            )
+            response_data = {
+                "success": True,
+                "transactions": transactions,
+                "next_cursor": next_cursor
+            }
+        except ValueError:
+            response_data = {
+                "success": False,
+                "error": "Invalid cursor"
+            }
+        
+        return Message(
+            message_type="GET_TRANSACTION_HISTORY_RESPONSE",
+            sender="BANK_SERVER",
+            receiver=message.sender,
+            data=response_data,
+            message_id=message.message_id
+        )
+
+    def handle_get_transaction_proof(self, message):
+        
+        proof = self.bank_manager.get_transaction_proof(message.data.get("transaction_id"))
+        if proof:
+            response_data = {
+                "success": True,
+                "proof": proof
+            }
+        else:
+            response_data = {
+                "success": False,
+                "error": "Transaction not found in a sealed block"
+            }
+        
+        return Message(
+            message_type="GET_TRANSACTION_PROOF_RESPONSE",
+            sender="BANK_SERVER",
+            receiver=message.sender,
+            data=response_data,
+            message_id=message.message_id
+        )
+
     def handle_verify_pin(self, message):
         
         user_id = message.data.get("user_id")
@@ -478,12 +613,36 @@ class BankServer:
             print(f"No blockchain found for {bank_name}.")
             return
         
-        is_valid = self.bank_manager.blockchains[bank_name].is_chain_valid()
+        full = input("Re-verify the whole chain instead of new blocks only? (y/N): ").strip().lower() == "y"
+        is_valid = self.bank_manager.verify_blockchain_integrity(bank_name, full=full)
         if is_valid:
             print(f"Blockchain for {bank_name} is valid and secure.")
         else:
             print(f"WARNING: Blockchain for {bank_name} has been tampered with!")
 
+    def archive_blockchain_command(self):
+        
+        print("\nAvailable Banks:")
+        bank_names = sorted(self.bank_manager.blockchains)
+        for i, bank_name in enumerate(bank_names, 1):
+            print(f"  {i}. {bank_name}")
+        
+        bank_choice = input("\nEnter bank number to archive: ")
+        try:
+            bank_name = bank_names[int(bank_choice) - 1]
+        except (ValueError, IndexError):
+            print("Invalid selection.")
+            return
+        
+        summaries = self.bank_manager.archive_blockchain(bank_name)
+        if not summaries:
+            print(f"Nothing to archive for {bank_name}.")
+            return
+        raw = sum(summary["bytes"] for summary in summaries)
+        compressed = sum(summary["archive_bytes"] for summary in summaries)
+        print(f"Archived {len(summaries)} segments ({sum(summary['blocks'] for summary in summaries)} blocks) of {bank_name}")
+        print(f"  {raw / 1e6:.1f} MB -> {compressed / 1e6:.1f} MB, compression ratio {raw / compressed:.2f}x")
+
     def show_blockchain_command(self):
         
         print("\nAvailable Banks:")
@@ -507,20 +666,51 @@ class BankServer:
             return
         
         blockchain = self.bank_manager.blockchains[bank_name]
+        start_input = input("Show blocks from (YYYY-MM-DD HH:MM, blank for the latest): ").strip()
+        page_size = BLOCKCHAIN["SHOW_PAGE_SIZE"]
+        if start_input:
+            try:
+                start = blockchain.position_at(time.mktime(time.strptime(start_input, "%Y-%m-%d %H:%M")))
+            except ValueError:
+                print("Invalid time. Use YYYY-MM-DD HH:MM.")
+                return
+            if start >= len(blockchain.chain):
+                print("No blocks after that time.")
+                return
+        else:
+            start = max(0, len(blockchain.chain) - page_size)
+        
         print(f"\n==== Blockchain for {bank_name} ====")
-        for i, block in enumerate(blockchain.chain):
-            if i == 0:
-                print(f"Genesis Block:")
+        while True:
+            end = min(start + page_size, len(blockchain.chain))
+            print(f"Blocks {start}-{end - 1} of {len(blockchain.chain)}\n")
+            for i in range(start, end):
+                self.print_block(i, blockchain.chain[i])
+            choice = input("n - next page, p - previous page, Enter - done: ").strip().lower()
+            if choice == "n" and end < len(blockchain.chain):
+                start = end
+            elif choice == "p" and start > 0:
+                start = max(0, start - page_size)
             else:
-                print(f"Block {i}:")
-            print(f"  Transaction ID: {block.transaction_id}")
-            print(f"  Timestamp: {time.ctime(block.timestamp)}")
-            print(f"  Previous Hash: {block.previous_hash}")
-            if i > 0:  
-                print(f"  Sender: {block.transaction_data.get('sender_id', 'N/A')}")
-                print(f"  Receiver: {block.transaction_data.get('receiver_id', 'N/A')}")
-                print(f"  Amount: {block.transaction_data.get('amount', 'N/A')}")
-            print()
+                break
+    
+    def print_block(self, i, block):
+        
+        if i == 0:
+            print(f"Genesis Block:")
+        else:
+            print(f"Block {i}:")
+        print(f"  Transaction ID: {block.transaction_id}")
+        print(f"  Timestamp: {time.ctime(block.timestamp)}")
+        print(f"  Previous Hash: {block.previous_hash}")
+        if block.is_batch:
+            print(f"  Merkle Root: {block.transaction_data['merkle_root']}")
+            print(f"  Transactions: {len(block.entries())}")
+        elif i > 0:  
+            print(f"  Sender: {block.transaction_data.get('sender_id', 'N/A')}")
+            print(f"  Receiver: {block.transaction_data.get('receiver_id', 'N/A')}")
+            print(f"  Amount: {block.transaction_data.get('amount', 'N/A')}")
+        print()
 
     def register_bank_command(self):
         
@@ -558,5 +748,15 @@ class BankServer:
 
 
 if __name__ == "__main__":
-    bank_server = BankServer()
+    import argparse
+    parser = argparse.ArgumentParser(description="UPI Bank Server")
+    parser.add_argument("--mode", choices=["threaded", "asyncio"], default=NETWORK["BANK_SERVER_MODE"],
+                        help="Connection handling model")
+    parser.add_argument("--backlog", type=int, default=NETWORK["BANK_SERVER_BACKLOG"],
+                        help="Listen backlog for the server socket")
+    parser.add_argument("--storage", choices=["json", "sqlite"], default=STORAGE["BACKEND"],
+                        help="Account storage backend; sqlite migrates existing JSON files on first start")
+    args = parser.parse_args()
+    
+    bank_server = BankServer(server_mode=args.mode, backlog=args.backlog, storage_backend=args.storage)
     bank_server.start()
@@ -0,0 +1,105 @@
+
+import json
+import os
+import sys
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common.models import Merchant
+
+DEFAULT_REFRESH_INTERVAL = 1.0
+
+def merchant_from_record(mid: str, merchant_data: Dict[str, Any]) -> Merchant:
+    
+    return Merchant(
+        mid=mid,
+        name=merchant_data.get('name', ''),
+        account_number=merchant_data.get('account_number', ''),
+        bank_code=merchant_data.get('bank_code', ''),
+        balance=float(merchant_data.get('balance', 0.0))
+    )
+
+class MerchantDirectory:
+    
+    def __init__(self, path: str, merchants: Dict[str, Merchant], lock, refresh_interval: float = DEFAULT_REFRESH_INTERVAL):
+        self.path = path
+        self.merchants = merchants
+        self.lock = lock
+        self.refresh_interval = refresh_interval
+        self.stats = {"checks": 0, "reloads": 0, "added": 0}
+        
+        self._signature: Optional[Tuple[int, int]] = None
+        self._refresh_lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._watcher: Optional[threading.Thread] = None
+    
+    def start(self) -> None:
+        
+        if self._watcher is not None:
+            return
+        self._stopped.clear()
+        self._watcher = threading.Thread(target=self._watch, daemon=True)
+        self._watcher.start()
+    
+    def stop(self) -> None:
+        
+        self._stopped.set()
+        if self._watcher is not None:
+            self._watcher.join(timeout=self.refresh_interval + 1)
+            self._watcher = None
+    
+    def refresh(self, force: bool = False) -> int:
+        
+        with self._refresh_lock:
+            self.stats["checks"] += 1
+            signature = self._file_signature()
+            if signature is None or (signature == self._signature and not force):
+                return 0
+            
+            try:
+                with open(self.path, 'r') as f:
+                    merchants_data = json.load(f)
+            except (OSError, ValueError) as e:
+                # Leave the signature alone so the next check retries.
+                print(f"Error refreshing merchants from file: {e}")
+                return 0
+            self._signature = signature
+            self.stats["reloads"] += 1
+            
+            added = 0
+            with self.lock:
+                for mid, merchant_data in merchants_data.items():
+                    # Balances of known merchants are owned by this process.
+                    if mid not in self.merchants:
+                        self.merchants[mid] = merchant_from_record(mid, merchant_data)
+                        added += 1
+            self.stats["added"] += added
+        
+        if added:
+            print(f"Picked up {added} new merchants from file")
+        return added
+    
+    def mark_current(self) -> None:
+        
+        # Called with the ledger lock held after our own writes, so it must not
+        # take the refresh lock (refresh takes the ledger lock while holding it).
+        self._signature = self._file_signature()
+    
+    def _file_signature(self) -> Optional[Tuple[int, int]]:
+        
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+    
+    def _watch(self) -> None:
+        
+        while not self._stopped.wait(self.refresh_interval):
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"Merchant directory refresh failed: {e}")
@@ -0,0 +1,36 @@
+from bisect import bisect_left, insort
+from typing import Iterable, List, Optional
+
+
+class MerchantPrefixIndex:
+    
+    def __init__(self, mids: Iterable[str] = ()):
+        # Kept sorted, so every id sharing a prefix sits in one run.
+        self._mids: List[str] = sorted(set(mids))
+    
+    def __len__(self) -> int:
+        
+        return len(self._mids)
+    
+    def __contains__(self, mid) -> bool:
+        
+        i = bisect_left(self._mids, mid)
+        return i < len(self._mids) and self._mids[i] == mid
+    
+    def add(self, mid: str) -> None:
+        
+        if mid not in self:
+            insort(self._mids, mid)
+    
+    def rebuild(self, mids: Iterable[str]) -> None:
+        
+        self._mids = sorted(set(mids))
+    
+    def candidates(self, prefix: str, limit: Optional[int] = None) -> List[str]:
+        
+        # Two binary searches bound the run; only the k matches are copied.
+        start = bisect_left(self._mids, prefix)
+        end = len(self._mids) if not prefix else bisect_left(self._mids, prefix[:-1] + chr(ord(prefix[-1]) + 1), start)
+        if limit is not None:
+            end = min(end, start + limit)
+        return self._mids[start:end]
@@ -0,0 +1,74 @@
+
+import hashlib
+import json
+from typing import Any, Dict, List, Tuple
+
+
+# Domain-separated hashing (as in RFC 6962), so an inner node can never be
+# passed off as a leaf.
+LEAF_PREFIX = b"\x00"
+NODE_PREFIX = b"\x01"
+
+# One proof step: which side the sibling is on ("L" or "R") and its hash.
+ProofStep = Tuple[str, str]
+
+def is_batch(transaction_data: Dict[str, Any]) -> bool:
+    
+    return "merkle_root" in transaction_data and "transactions" in transaction_data
+
+def block_entries(block_dict: Dict[str, Any]) -> List[Dict[str, Any]]:
+    
+    # The transactions a stored block carries, each as
+    # {"transaction_id": ..., "transaction_data": ...}.
+    transaction_data = block_dict["transaction_data"]
+    if is_batch(transaction_data):
+        return transaction_data["transactions"]
+    return [block_dict]
+
+def leaf_hash(entry: Dict[str, Any]) -> bytes:
+    
+    canonical = json.dumps({
+        "transaction_id": entry["transaction_id"],
+        "transaction_data": entry["transaction_data"]
+    }, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(LEAF_PREFIX + canonical.encode("utf-8")).digest()
+
+def node_hash(left: bytes, right: bytes) -> bytes:
+    
+    return hashlib.sha256(NODE_PREFIX + left + right).digest()
+
+def merkle_levels(leaves: List[bytes]) -> List[List[bytes]]:
+    
+    levels = [leaves]
+    while len(levels[-1]) > 1:
+        level = levels[-1]
+        parents = [node_hash(level[i], level[i + 1]) for i in range(0, len(level) - 1, 2)]
+        if len(level) % 2:
+            # An odd node is carried up unchanged rather than paired with itself.
+            parents.append(level[-1])
+        levels.append(parents)
+    return levels
+
+def merkle_root(leaves: List[bytes]) -> str:
+    
+    if not leaves:
+        return hashlib.sha256(b"").hexdigest()
+    return merkle_levels(leaves)[-1][0].hex()
+
+def merkle_proof(leaves: List[bytes], index: int) -> List[ProofStep]:
+    
+    path = []
+    for level in merkle_levels(leaves)[:-1]:
+        sibling = index ^ 1
+        if sibling < len(level):
+            path.append(("L" if sibling < index else "R", level[sibling].hex()))
+        index //= 2
+    return path
+
+def verify_merkle_path(leaf: bytes, path: List[ProofStep], root: str) -> bool:
+    
+    node = leaf
+    for side, sibling in path:
+        sibling_hash = bytes.fromhex(sibling)
+        node = node_hash(sibling_hash, node) if side == "L" else node_hash(node, sibling_hash)
+    return node.hex() == root
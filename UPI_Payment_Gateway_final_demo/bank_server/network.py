@@ -2,28 +2,59 @@
 import socket
 import json
 import threading
+import asyncio
 import sys
 import os
+from concurrent.futures import ThreadPoolExecutor
 
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from common.network_protocol import Message
+from common.network_protocol import (
+    FramingError, CodecError, CODEC_NEGOTIATION, JSON_CODEC,
+    negotiation_response, read_message, write_message,
+    read_message_async, write_message_async
+)
+from common.connection_pool import ConnectionPool
 from common.constants import NETWORK
 
+SERVER_MODES = ("threaded", "asyncio")
+MAX_IN_FLIGHT_PER_CONNECTION = 32
+
 class BankServerNetwork:
-    def __init__(self):
-        self.host = NETWORK["BANK_SERVER_HOST"]
-        self.port = NETWORK["BANK_SERVER_PORT"]
+    def __init__(self, mode=None, backlog=None, host=None, port=None, executor_workers=None, max_in_flight=None):
+        self.host = host if host is not None else NETWORK["BANK_SERVER_HOST"]
+        self.port = port if port is not None else NETWORK["BANK_SERVER_PORT"]
+        self.mode = mode or NETWORK["BANK_SERVER_MODE"]
+        self.backlog = backlog if backlog is not None else NETWORK["BANK_SERVER_BACKLOG"]
+        self.executor_workers = executor_workers
+        self.max_in_flight = max_in_flight or MAX_IN_FLIGHT_PER_CONNECTION
         self.socket = None
         self.connected = False
         self.message_handlers = {}
+        self.connection_pool = ConnectionPool()
+        self.inline_message_types = set()
+        
+        self.loop = None
+        self.executor = None
+        self._async_server = None
+        self._loop_thread = None
+        
+        if self.mode not in SERVER_MODES:
+            raise ValueError(f"Unknown server mode: {self.mode}")
     
     def start_server(self):
         
+        self.executor = ThreadPoolExecutor(max_workers=self.executor_workers,
+                                           thread_name_prefix="bank-handler")
+        if self.mode == "asyncio":
+            self._start_async_server()
+            return
+        
         self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
         self.socket.bind((self.host, self.port))
-        self.socket.listen(5)
+        self.socket.listen(self.backlog)
+        self.port = self.socket.getsockname()[1]
         self.connected = True
         print(f"Bank Server started on {self.host}:{self.port}")
         
@@ -45,37 +76,152 @@ class BankServerNetwork:
     
     def _handle_client(self, client_socket):
         
+        send_lock = threading.Lock()
+        slots = threading.BoundedSemaphore(self.max_in_flight)
+        codec = JSON_CODEC
         try:
-            
-            data = b""
             while self.connected:
-                chunk = client_socket.recv(4096)
-                if not chunk:
+                message = read_message(client_socket)
+                if message is None:
                     break
-                data += chunk
                 
-                try:
-                    
-                    message = Message.from_json(data.decode())
-                    
-                    
-                    response = self._process_message(message)
-                    
-                    
-                    if response:
-                        client_socket.sendall(response.to_json().encode())
-                    
-                    
-                    data = b""
-                except (json.JSONDecodeError, UnicodeDecodeError):
-                    
+                if message.message_type == CODEC_NEGOTIATION:
+                    response, codec = negotiation_response(message)
+                    with send_lock:
+                        write_message(client_socket, response)
                     continue
                 
+                slots.acquire()
+                try:
+                    self.executor.submit(self._respond, client_socket, send_lock, slots, message, codec)
+                except RuntimeError:
+                    slots.release()
+                    break
+                
+        except (FramingError, CodecError, json.JSONDecodeError, UnicodeDecodeError) as e:
+            print(f"Malformed frame from client: {e}")
         except Exception as e:
             print(f"Error handling client: {e}")
         finally:
+            for _ in range(self.max_in_flight):
+                slots.acquire()
             client_socket.close()
     
+    def _respond(self, client_socket, send_lock, slots, message, codec):
+        
+        try:
+            response = self._process_message(message)
+            
+            
+            if response:
+                with send_lock:
+                    write_message(client_socket, response, codec)
+        except Exception as e:
+            print(f"Error handling message {message.message_id}: {e}")
+        finally:
+            slots.release()
+    
+    def _start_async_server(self):
+        
+        self.loop = asyncio.new_event_loop()
+        started = threading.Event()
+        startup_error = []
+        
+        def run_loop():
+            asyncio.set_event_loop(self.loop)
+            try:
+                self._async_server = self.loop.run_until_complete(asyncio.start_server(
+                    self._handle_client_async,
+                    host=self.host,
+                    port=self.port,
+                    backlog=self.backlog,
+                    reuse_address=True
+                ))
+            except Exception as e:
+                startup_error.append(e)
+                started.set()
+                return
+            
+            self.port = self._async_server.sockets[0].getsockname()[1]
+            self.connected = True
+            started.set()
+            try:
+                self.loop.run_forever()
+            finally:
+                self._async_server.close()
+                pending = asyncio.all_tasks(self.loop)
+                for task in pending:
+                    task.cancel()
+                self.loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+                self.loop.run_until_complete(self._async_server.wait_closed())
+                self.loop.close()
+        
+        self._loop_thread = threading.Thread(target=run_loop, daemon=True)
+        self._loop_thread.start()
+        started.wait()
+        if startup_error:
+            self.executor.shutdown(wait=False)
+            raise startup_error[0]
+        
+        print(f"Bank Server started on {self.host}:{self.port} (asyncio, backlog {self.backlog})")
+    
+    async def _handle_client_async(self, reader, writer):
+        
+        write_lock = asyncio.Lock()
+        slots = asyncio.Semaphore(self.max_in_flight)
+        tasks = set()
+        codec = JSON_CODEC
+        try:
+            while self.connected:
+                message = await read_message_async(reader)
+                if message is None:
+                    break
+                
+                if message.message_type == CODEC_NEGOTIATION:
+                    response, codec = negotiation_response(message)
+                    async with write_lock:
+                        await write_message_async(writer, response)
+                    continue
+                
+                await slots.acquire()
+                task = self.loop.create_task(self._respond_async(writer, write_lock, slots, message, codec))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+                
+        except (FramingError, CodecError, json.JSONDecodeError, UnicodeDecodeError) as e:
+            print(f"Malformed frame from client: {e}")
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        except Exception as e:
+            print(f"Error handling client: {e}")
+        finally:
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+            writer.close()
+    
+    async def _respond_async(self, writer, write_lock, slots, message, codec):
+        
+        try:
+            response = await self._process_message_async(message)
+            
+            
+            if response:
+                async with write_lock:
+                    await write_message_async(writer, response, codec)
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        except Exception as e:
+            print(f"Error handling message {message.message_id}: {e}")
+        finally:
+            slots.release()
+    
+    async def _process_message_async(self, message):
+        
+        if message.message_type in self.inline_message_types:
+            return self._process_message(message)
+        
+        return await self.loop.run_in_executor(self.executor, self._process_message, message)
+    
     def _process_message(self, message):
         
         print(f"Received message: {message.message_type}")
@@ -86,24 +232,18 @@ class BankServerNetwork:
             print(f"No handler for message type: {message.message_type}")
             return None
     
-    def register_handler(self, message_type, handler_function):
+    def register_handler(self, message_type, handler_function, blocking=True):
         
         self.message_handlers[message_type] = handler_function
+        if blocking:
+            self.inline_message_types.discard(message_type)
+        else:
+            self.inline_message_types.add(message_type)
     
     def send_message(self, host, port, message):
         
         try:
-            client_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            client_socket.connect((host, port))
-            client_socket.sendall(message.to_json().encode())
-            
-            
-            response_data = client_socket.recv(4096)
-            client_socket.close()
-            
-            if response_data:
-                return Message.from_json(response_data.decode())
-            return None
+            return self.connection_pool.request(host, port, message)
         except Exception as e:
             print(f"Error sending message: {e}")
             return None
@@ -111,5 +251,11 @@ class BankServerNetwork:
     def stop(self):
         
         self.connected = False
+        self.connection_pool.close()
         if self.socket:
             self.socket.close()
+        if self.loop and self.loop.is_running():
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self._loop_thread.join(timeout=5)
+        if self.executor:
+            self.executor.shutdown(wait=False)
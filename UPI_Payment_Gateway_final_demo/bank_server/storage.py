@@ -0,0 +1,592 @@
+
+import json
+import os
+import sqlite3
+import sys
+import threading
+from abc import ABC, abstractmethod
+from collections.abc import MutableMapping
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common.models import User, Merchant, Bank
+from common.constants import LEDGER, STORAGE
+from bank_server.ledger_log import LedgerLog, BalanceChange
+from bank_server.merchant_directory import merchant_from_record
+
+STORAGE_BACKENDS = ("json", "sqlite")
+
+def user_from_record(uid: str, user_data: Dict[str, Any]) -> User:
+    
+    return User(
+        uid=uid,
+        name=user_data.get('name', ''),
+        mmid=user_data.get('mmid', ''),
+        pin=user_data.get('pin', ''),
+        account_number=user_data.get('account_number', ''),
+        bank_code=user_data.get('bank_code', ''),
+        mobile_number=user_data.get('mobile_number', ''),
+        password=user_data.get('password', ''),
+        balance=float(user_data.get('balance', 0.0))
+    )
+
+def user_to_record(user: User) -> Dict[str, Any]:
+    
+    return {
+        'name': user.name,
+        'mmid': user.mmid,
+        'pin': user.pin,
+        'account_number': user.account_number,
+        'bank_code': user.bank_code,
+        'mobile_number': user.mobile_number,
+        'password': user.password,
+        'balance': user.balance
+    }
+
+def merchant_to_record(merchant: Merchant) -> Dict[str, Any]:
+    
+    return {
+        'name': merchant.name,
+        'account_number': merchant.account_number,
+        'bank_code': merchant.bank_code,
+        'balance': merchant.balance
+    }
+
+def write_json_atomic(path: str, data: Dict[str, Any]) -> None:
+    
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'w') as f:
+        json.dump(data, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+
+class Storage(ABC):
+    
+    name = ""
+    # True when other processes publish merchants by rewriting a shared file.
+    watches_files = False
+    # True when account lookups are plain dict reads that never touch disk.
+    in_memory = False
+    ledger_log: Optional[LedgerLog] = None
+    
+    def __init__(self, lock=None):
+        self.lock = lock or threading.RLock()
+        self.users: MutableMapping = {}
+        self.merchants: MutableMapping = {}
+        self.mmid_to_uid: MutableMapping = {}
+        self.transactions: MutableMapping = {}
+    
+    @abstractmethod
+    def load(self) -> None:
+        
+        pass
+    
+    def load_users(self) -> None:
+        
+        pass
+    
+    def load_merchants(self) -> None:
+        
+        pass
+    
+    @abstractmethod
+    def load_banks(self) -> Dict[str, Bank]:
+        
+        pass
+    
+    @abstractmethod
+    def save_banks(self, banks: Dict[str, Bank]) -> bool:
+        
+        pass
+    
+    @abstractmethod
+    def save_users(self, users: Optional[Iterable[User]] = None) -> bool:
+        
+        pass
+    
+    @abstractmethod
+    def save_merchants(self, merchants: Optional[Iterable[Merchant]] = None) -> bool:
+        
+        pass
+    
+    def replay(self) -> Iterator[Dict[str, Any]]:
+        
+        return iter(())
+    
+    @abstractmethod
+    def append(self, changes: List[BalanceChange], transactions: List[Dict[str, Any]]) -> int:
+        
+        pass
+    
+    def commit(self, seq: int) -> None:
+        
+        pass
+    
+    def pending_records(self) -> int:
+        
+        return 0
+    
+    def checkpoint(self) -> bool:
+        
+        return True
+    
+    def close(self) -> None:
+        
+        pass
+
+class JsonStorage(Storage):
+    
+    name = "json"
+    watches_files = True
+    in_memory = True
+    
+    def __init__(self, users_file: str = "users.json", merchants_file: str = "merchants.json",
+                 banks_file: str = "banks.json", ledger_log: Optional[LedgerLog] = None, lock=None):
+        super().__init__(lock)
+        self.users_file = users_file
+        self.merchants_file = merchants_file
+        self.banks_file = banks_file
+        self.ledger_log = ledger_log or create_ledger_log()
+        # Called after every rewrite of merchants_file we make ourselves.
+        self.on_merchants_saved: Optional[Callable[[], None]] = None
+    
+    def load(self) -> None:
+        
+        self.load_merchants()
+        self.load_users()
+    
+    def load_merchants(self) -> None:
+        
+        if os.path.exists(self.merchants_file):
+            try:
+                with open(self.merchants_file, 'r') as f:
+                    merchants_data = json.load(f)
+                
+                with self.lock:
+                    for mid, merchant_data in merchants_data.items():
+                        # Balances of merchants already in memory are ahead of the
+                        # last checkpoint; only pick up merchants registered elsewhere.
+                        if mid in self.merchants:
+                            continue
+                        self.merchants[mid] = merchant_from_record(mid, merchant_data)
+                if self.on_merchants_saved:
+                    self.on_merchants_saved()
+                print(f"Loaded {len(self.merchants)} merchants from file")
+            except Exception as e:
+                print(f"Error loading merchants from file: {e}")
+                
+                self.save_merchants()
+    
+    def load_users(self) -> None:
+        
+        if os.path.exists(self.users_file):
+            try:
+                with open(self.users_file, 'r') as f:
+                    users_data = json.load(f)
+                
+                with self.lock:
+                    for uid, user_data in users_data.items():
+                        self.users[uid] = user_from_record(uid, user_data)
+                        
+                        mmid = user_data.get('mmid', '')
+                        if mmid:
+                            self.mmid_to_uid[mmid] = uid
+                print(f"Loaded {len(self.users)} users from file")
+            except Exception as e:
+                print(f"Error loading users from file: {e}")
+                
+                self.save_users()
+    
+    def load_banks(self) -> Dict[str, Bank]:
+        
+        banks = {}
+        if os.path.exists(self.banks_file):
+            try:
+                with open(self.banks_file, 'r') as f:
+                    banks_data = json.load(f)
+                
+                for code, bank_data in banks_data.items():
+                    banks[code] = Bank(
+                        code=code,
+                        name=bank_data.get('name', ''),
+                        branches=bank_data.get('branches', [])
+                    )
+                print(f"Loaded {len(banks)} banks from file")
+            except Exception as e:
+                print(f"Error loading banks from file: {e}")
+        return banks
+    
+    def save_banks(self, banks: Dict[str, Bank]) -> bool:
+        
+        banks_data = {}
+        for code, bank in banks.items():
+            banks_data[code] = {
+                'name': bank.name,
+                'branches': bank.branches
+            }
+        
+        try:
+            write_json_atomic(self.banks_file, banks_data)
+            print(f"Saved {len(banks_data)} banks to file")
+            return True
+        except Exception as e:
+            print(f"Error saving banks to file: {e}")
+            return False
+    
+    def save_users(self, users: Optional[Iterable[User]] = None) -> bool:
+        
+        # The JSON file can only be rewritten whole, whatever changed.
+        with self.lock:
+            users_data = {uid: user_to_record(user) for uid, user in self.users.items()}
+        
+        try:
+            write_json_atomic(self.users_file, users_data)
+            print(f"Saved {len(users_data)} users to file")
+            return True
+        except Exception as e:
+            print(f"Error saving users to file: {e}")
+            return False
+    
+    def save_merchants(self, merchants: Optional[Iterable[Merchant]] = None) -> bool:
+        
+        with self.lock:
+            merchants_data = {mid: merchant_to_record(merchant) for mid, merchant in self.merchants.items()}
+        
+        try:
+            write_json_atomic(self.merchants_file, merchants_data)
+            if self.on_merchants_saved:
+                self.on_merchants_saved()
+            print(f"Saved {len(merchants_data)} merchants to file")
+            return True
+        except Exception as e:
+            print(f"Error saving merchants to file: {e}")
+            return False
+    
+    def replay(self) -> Iterator[Dict[str, Any]]:
+        
+        return self.ledger_log.replay()
+    
+    def append(self, changes: List[BalanceChange], transactions: List[Dict[str, Any]]) -> int:
+        
+        seq = self.ledger_log.append(changes, [transaction["transaction_id"] for transaction in transactions])
+        for transaction in transactions:
+            self.transactions[transaction["transaction_id"]] = transaction
+        return seq
+    
+    def commit(self, seq: int) -> None:
+        
+        self.ledger_log.commit(seq)
+    
+    def pending_records(self) -> int:
+        
+        return self.ledger_log.records_since_checkpoint
+    
+    def checkpoint(self) -> bool:
+        
+        if not (self.save_users() and self.save_merchants()):
+            return False
+        self.ledger_log.truncate()
+        return True
+    
+    def close(self) -> None:
+        
+        self.ledger_log.close()
+
+class SqliteTable(MutableMapping):
+    
+    # Read-through cache over one table: rows are only loaded when a key is
+    # first looked up, and objects stay cached so balance updates applied in
+    # memory are the ones the payment path reads back.
+    
+    def __init__(self, storage: "SqliteStorage", table: str, key_column: str, from_row: Callable):
+        self.storage = storage
+        self.from_row = from_row
+        self._cache: Dict[str, Any] = {}
+        self._select = f"SELECT * FROM {table} WHERE {key_column} = ?"
+        self._keys = f"SELECT {key_column} FROM {table}"
+        self._count = f"SELECT COUNT(*) FROM {table}"
+        self._delete = f"DELETE FROM {table} WHERE {key_column} = ?"
+    
+    def __getitem__(self, key: str):
+        
+        value = self._cache.get(key)
+        if value is not None:
+            return value
+        if not isinstance(key, str):
+            raise KeyError(key)
+        
+        row = self.storage.connection().execute(self._select, (key,)).fetchone()
+        if row is None:
+            raise KeyError(key)
+        return self._cache.setdefault(key, self.from_row(row))
+    
+    def __contains__(self, key) -> bool:
+        
+        try:
+            self[key]
+            return True
+        except KeyError:
+            return False
+    
+    def __setitem__(self, key: str, value) -> None:
+        
+        self._cache[key] = value
+    
+    def __delitem__(self, key: str) -> None:
+        
+        self._cache.pop(key, None)
+        with self.storage.connection() as connection:
+            connection.execute(self._delete, (key,))
+    
+    def __iter__(self) -> Iterator[str]:
+        
+        seen = set()
+        for (key,) in self.storage.connection().execute(self._keys):
+            seen.add(key)
+            yield key
+        for key in list(self._cache):
+            if key not in seen:
+                yield key
+    
+    def __len__(self) -> int:
+        
+        return self.storage.connection().execute(self._count).fetchone()[0]
+    
+    def cached(self) -> List[Any]:
+        
+        return list(self._cache.values())
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    uid TEXT PRIMARY KEY,
+    name TEXT, mmid TEXT, pin TEXT, account_number TEXT, bank_code TEXT,
+    mobile_number TEXT, password TEXT, balance REAL NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS mmids (
+    mmid TEXT PRIMARY KEY,
+    uid TEXT NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS merchants (
+    mid TEXT PRIMARY KEY,
+    name TEXT, account_number TEXT, bank_code TEXT, balance REAL NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS banks (
+    code TEXT PRIMARY KEY,
+    name TEXT, branches TEXT
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS transactions (
+    transaction_id TEXT PRIMARY KEY,
+    sender_id TEXT, receiver_id TEXT, amount REAL, description TEXT, timestamp REAL
+);
+CREATE INDEX IF NOT EXISTS transactions_by_sender ON transactions (sender_id, timestamp);
+CREATE INDEX IF NOT EXISTS transactions_by_receiver ON transactions (receiver_id, timestamp);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+) WITHOUT ROWID;
+"""
+
+UPSERT_USER = ("INSERT OR REPLACE INTO users (uid, name, mmid, pin, account_number, bank_code, "
+               "mobile_number, password, balance) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)")
+UPSERT_MMID = "INSERT OR REPLACE INTO mmids (mmid, uid) VALUES (?, ?)"
+UPSERT_MERCHANT = ("INSERT OR REPLACE INTO merchants (mid, name, account_number, bank_code, balance) "
+                   "VALUES (?, ?, ?, ?, ?)")
+UPSERT_BANK = "INSERT OR REPLACE INTO banks (code, name, branches) VALUES (?, ?, ?)"
+
+# Payment path: the statement text never changes, so sqlite3's per-connection
+# statement cache compiles each of these once and reuses the prepared statement.
+UPDATE_USER_BALANCE = "UPDATE users SET balance = ? WHERE uid = ?"
+UPDATE_MERCHANT_BALANCE = "UPDATE merchants SET balance = ? WHERE mid = ?"
+INSERT_TRANSACTION = ("INSERT INTO transactions (transaction_id, sender_id, receiver_id, amount, description, timestamp) "
+                      "VALUES (?, ?, ?, ?, ?, ?)")
+
+SYNCHRONOUS_BY_POLICY = {"always": "FULL", "group": "NORMAL", "interval": "NORMAL"}
+
+class SqliteStorage(Storage):
+    
+    name = "sqlite"
+    
+    def __init__(self, path: str = "bank.db", fsync_policy: Optional[str] = None, lock=None,
+                 users_file: str = "users.json", merchants_file: str = "merchants.json",
+                 banks_file: str = "banks.json", ledger_file: str = "ledger.log"):
+        super().__init__(lock)
+        self.path = path
+        self.synchronous = SYNCHRONOUS_BY_POLICY[fsync_policy or LEDGER["FSYNC_POLICY"]]
+        self.json_files = (users_file, merchants_file, banks_file, ledger_file)
+        
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+        self._seq = 0
+        
+        self.users = SqliteTable(self, "users", "uid", lambda row: User(
+            uid=row[0], name=row[1], mmid=row[2], pin=row[3], account_number=row[4],
+            bank_code=row[5], mobile_number=row[6], password=row[7], balance=row[8]
+        ))
+        self.mmid_to_uid = SqliteTable(self, "mmids", "mmid", lambda row: row[1])
+        self.merchants = SqliteTable(self, "merchants", "mid", lambda row: Merchant(
+            mid=row[0], name=row[1], account_number=row[2], bank_code=row[3], balance=row[4]
+        ))
+        self.transactions = SqliteTable(self, "transactions", "transaction_id", lambda row: {
+            "transaction_id": row[0], "sender_id": row[1], "receiver_id": row[2],
+            "amount": row[3], "description": row[4], "timestamp": row[5]
+        })
+    
+    def connection(self) -> sqlite3.Connection:
+        
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(f"PRAGMA synchronous={self.synchronous}")
+            self._local.connection = connection
+            with self._connections_lock:
+                self._connections.append(connection)
+        return connection
+    
+    def load(self) -> None:
+        
+        connection = self.connection()
+        connection.executescript(SCHEMA)
+        migrated = connection.execute("SELECT value FROM meta WHERE key = 'json_migrated'").fetchone()
+        if migrated is None:
+            self.migrate_from_json()
+    
+    def migrate_from_json(self) -> Dict[str, int]:
+        
+        users_file, merchants_file, banks_file, ledger_file = self.json_files
+        source = JsonStorage(users_file, merchants_file, banks_file, LedgerLog(ledger_file))
+        source.load()
+        for record in source.replay():
+            for kind, account_id, _, balance in record["changes"]:
+                account = (source.users if kind == "user" else source.merchants).get(account_id)
+                if account is not None:
+                    account.balance = balance
+        banks = source.load_banks()
+        
+        with self.connection() as connection:
+            connection.executemany(UPSERT_USER, [self._user_row(user) for user in source.users.values()])
+            connection.executemany(UPSERT_MMID, list(source.mmid_to_uid.items()))
+            connection.executemany(UPSERT_MERCHANT, [self._merchant_row(merchant) for merchant in source.merchants.values()])
+            connection.executemany(UPSERT_BANK, [self._bank_row(bank) for bank in banks.values()])
+            connection.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('json_migrated', '1')")
+        
+        counts = {"users": len(source.users), "merchants": len(source.merchants), "banks": len(banks)}
+        if any(counts.values()):
+            print(f"Migrated {counts['users']} users, {counts['merchants']} merchants and "
+                  f"{counts['banks']} banks from JSON into {self.path}")
+        return counts
+    
+    def load_banks(self) -> Dict[str, Bank]:
+        
+        banks = {}
+        for code, name, branches in self.connection().execute("SELECT code, name, branches FROM banks"):
+            banks[code] = Bank(code=code, name=name, branches=json.loads(branches or "[]"))
+        return banks
+    
+    def save_banks(self, banks: Dict[str, Bank]) -> bool:
+        
+        try:
+            with self.connection() as connection:
+                connection.executemany(UPSERT_BANK, [self._bank_row(bank) for bank in banks.values()])
+            return True
+        except sqlite3.Error as e:
+            print(f"Error saving banks: {e}")
+            return False
+    
+    def save_users(self, users: Optional[Iterable[User]] = None) -> bool:
+        
+        users = list(users) if users is not None else self.users.cached()
+        try:
+            with self.connection() as connection:
+                connection.executemany(UPSERT_USER, [self._user_row(user) for user in users])
+                connection.executemany(UPSERT_MMID, [(user.mmid, user.uid) for user in users if user.mmid])
+            return True
+        except sqlite3.Error as e:
+            print(f"Error saving users: {e}")
+            return False
+    
+    def save_merchants(self, merchants: Optional[Iterable[Merchant]] = None) -> bool:
+        
+        merchants = list(merchants) if merchants is not None else self.merchants.cached()
+        try:
+            with self.connection() as connection:
+                connection.executemany(UPSERT_MERCHANT, [self._merchant_row(merchant) for merchant in merchants])
+            return True
+        except sqlite3.Error as e:
+            print(f"Error saving merchants: {e}")
+            return False
+    
+    def append(self, changes: List[BalanceChange], transactions: List[Dict[str, Any]]) -> int:
+        
+        user_balances = [(balance, account_id) for kind, account_id, _, balance in changes if kind == "user"]
+        merchant_balances = [(balance, account_id) for kind, account_id, _, balance in changes if kind == "merchant"]
+        with self.connection() as connection:
+            connection.executemany(UPDATE_USER_BALANCE, user_balances)
+            connection.executemany(UPDATE_MERCHANT_BALANCE, merchant_balances)
+            connection.executemany(INSERT_TRANSACTION, [(
+                transaction["transaction_id"], transaction["sender_id"], transaction["receiver_id"],
+                transaction["amount"], transaction.get("description", ""), transaction["timestamp"]
+            ) for transaction in transactions])
+        
+        with self._connections_lock:
+            self._seq += 1
+            return self._seq
+    
+    def checkpoint(self) -> bool:
+        
+        try:
+            self.connection().execute("PRAGMA wal_checkpoint(PASSIVE)")
+            return True
+        except sqlite3.Error as e:
+            print(f"Error checkpointing database: {e}")
+            return False
+    
+    def close(self) -> None:
+        
+        with self._connections_lock:
+            for connection in self._connections:
+                try:
+                    connection.close()
+                except sqlite3.Error:
+                    pass
+            self._connections.clear()
+        self._local = threading.local()
+    
+    @staticmethod
+    def _user_row(user: User) -> tuple:
+        
+        return (user.uid, user.name, user.mmid, user.pin, user.account_number, user.bank_code,
+                user.mobile_number, user.password, user.balance)
+    
+    @staticmethod
+    def _merchant_row(merchant: Merchant) -> tuple:
+        
+        return (merchant.mid, merchant.name, merchant.account_number, merchant.bank_code, merchant.balance)
+    
+    @staticmethod
+    def _bank_row(bank: Bank) -> tuple:
+        
+        return (bank.code, bank.name, json.dumps(bank.branches))
+
+def create_ledger_log(fsync_policy: Optional[str] = None) -> LedgerLog:
+    
+    return LedgerLog(
+        LEDGER["LOG_FILE"],
+        fsync_policy=fsync_policy or LEDGER["FSYNC_POLICY"],
+        fsync_interval=LEDGER["FSYNC_INTERVAL"],
+        group_max_batch=LEDGER["GROUP_COMMIT_MAX_BATCH"],
+        group_max_wait=LEDGER["GROUP_COMMIT_MAX_WAIT"]
+    )
+
+def create_storage(backend: Optional[str] = None, fsync_policy: Optional[str] = None, lock=None) -> Storage:
+    
+    backend = backend or STORAGE["BACKEND"]
+    if backend == "json":
+        return JsonStorage(ledger_log=create_ledger_log(fsync_policy), lock=lock)
+    if backend == "sqlite":
+        return SqliteStorage(STORAGE["SQLITE_FILE"], fsync_policy=fsync_policy, lock=lock)
+    raise ValueError(f"Unknown storage backend: {backend}")
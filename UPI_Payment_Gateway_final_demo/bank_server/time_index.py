@@ -0,0 +1,80 @@
+
+import os
+from array import array
+from bisect import bisect_left
+from typing import Iterable
+
+
+INDEX_PREFIX = "time-"
+INDEX_SUFFIX = ".idx"
+
+class TimeIndex:
+    
+    def __init__(self, directory: str, stride: int):
+        # One sample every stride blocks, holding the largest block timestamp
+        # up to that block; the samples never decrease even if the clock
+        # stepped back, so a binary search over them stays correct.
+        self.path = os.path.join(directory, f"{INDEX_PREFIX}{stride}{INDEX_SUFFIX}")
+        self.stride = stride
+        self.samples = array("d")
+        self.current = False
+        
+        self._latest = float("-inf")
+        self._file = None
+    
+    def catch_up(self, store) -> None:
+        
+        self.samples = array("d")
+        try:
+            with open(self.path, "rb") as f:
+                self.samples.frombytes(f.read())
+        except (OSError, ValueError):
+            self._reset()
+        if len(self.samples) > -(-store.block_count // self.stride):
+            # The chain lost a tail the index had already seen; start over.
+            self._reset()
+        
+        # The running maximum resumes from the last sample; only the blocks
+        # after it, up to the next sampled position, have to be read again.
+        resume = (len(self.samples) - 1) * self.stride + 1 if self.samples else 0
+        self._latest = self.samples[-1] if self.samples else float("-inf")
+        self._extend(resume, (store.timestamp_at(position) for position in range(resume, store.block_count)))
+        self.current = True
+    
+    def add(self, first_position: int, timestamps: Iterable[float]) -> None:
+        
+        if self.current:
+            self._extend(first_position, timestamps)
+    
+    def lower_bound(self, timestamp: float) -> int:
+        
+        # Every block before the returned position is older than timestamp.
+        return max(0, bisect_left(self.samples, timestamp) - 1) * self.stride
+    
+    def close(self) -> None:
+        
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        self.current = False
+    
+    def _extend(self, first_position: int, timestamps: Iterable[float]) -> None:
+        
+        added = array("d")
+        for position, timestamp in enumerate(timestamps, first_position):
+            self._latest = max(self._latest, timestamp)
+            if position % self.stride == 0:
+                added.append(self._latest)
+        if added:
+            self.samples.extend(added)
+            if self._file is None:
+                self._file = open(self.path, "ab")
+            added.tofile(self._file)
+            self._file.flush()
+    
+    def _reset(self) -> None:
+        
+        self.close()
+        self.samples = array("d")
+        with open(self.path, "wb"):
+            pass
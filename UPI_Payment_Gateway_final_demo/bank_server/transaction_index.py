@@ -0,0 +1,274 @@
+import hashlib
+import heapq
+import json
+import mmap
+import os
+import struct
+from typing import Dict, Iterable, Optional, Tuple
+
+
+INDEX_FILE = "txid.idx"
+LOG_FILE = "txid.log"
+META_FILE = "txid.meta"
+
+# Fixed-size records: 16-byte key digest, segment number, byte offset.
+RECORD = struct.Struct("<16sIQ")
+KEY_BYTES = 16
+
+# Appended records kept in memory before they are merged into the sorted file.
+MERGE_RECORDS = 16384
+
+def transaction_key(transaction_id: str) -> bytes:
+    
+    return hashlib.blake2b(transaction_id.encode("utf-8"), digest_size=16).digest()
+
+class TransactionIndex:
+    
+    def __init__(self, directory: str, merge_records: Optional[int] = None):
+        # txid.idx holds records sorted by key and is binary searched through
+        # a read-only mapping, so a lookup touches a few pages rather than a
+        # dict of every transaction. New records go to txid.log and a small
+        # in-memory dict until there are enough of them to merge.
+        self.path = os.path.join(directory, INDEX_FILE)
+        self.log_path = os.path.join(directory, LOG_FILE)
+        self.meta_path = os.path.join(directory, META_FILE)
+        self.merge_records = merge_records or MERGE_RECORDS
+        self.recent: Dict[bytes, Tuple[int, int]] = {}
+        self.loaded = False
+        # Blocks covered and records in the sorted file; a batch block has
+        # one record per transaction plus one for the block itself.
+        self.blocks = 0
+        self.records = 0
+        
+        self._logged = 0
+        self._map: Optional[mmap.mmap] = None
+        self._log = None
+    
+    def load(self, expected_blocks: int) -> bool:
+        
+        try:
+            with open(self.meta_path, "r") as f:
+                meta = json.load(f)
+            size = os.path.getsize(self.path)
+            with open(self.log_path, "rb") as f:
+                log = f.read()
+        except (OSError, ValueError):
+            return False
+        # The meta file is only written on close and after a merge, so an
+        # index that was torn by a crash or missed appends no longer matches
+        # it and is rebuilt.
+        if (meta.get("blocks") != expected_blocks or size != meta.get("records", -1) * RECORD.size
+                or len(log) != meta.get("logged", -1) * RECORD.size):
+            return False
+        
+        self._close_files()
+        self.records = meta["records"]
+        self._map_sorted()
+        self.recent = {key: (segment, offset) for key, segment, offset in RECORD.iter_unpack(log)}
+        self._logged = meta["logged"]
+        self.blocks = expected_blocks
+        self.loaded = True
+        return True
+    
+    def rebuild(self, locations: Iterable[Tuple[str, Tuple[int, int]]], blocks: int) -> None:
+        
+        self._close_files()
+        with open(self.log_path, "wb"):
+            pass
+        self.recent = {}
+        self._logged = 0
+        
+        # An external sort: each bounded run is sorted and spilled to its own
+        # file, and the runs are then merged in one pass, so a rebuild never
+        # holds more than a run's worth of entries either.
+        run_paths = []
+        run: Dict[bytes, Tuple[int, int]] = {}
+        try:
+            for transaction_id, location in locations:
+                run[transaction_key(transaction_id)] = location
+                if len(run) >= self.merge_records:
+                    run_paths.append(self._spill(run, len(run_paths)))
+                    run = {}
+            if run:
+                run_paths.append(self._spill(run, len(run_paths)))
+            self.records = self._merge_runs(run_paths)
+        finally:
+            for run_path in run_paths:
+                os.remove(run_path)
+        self._map_sorted()
+        self.blocks = blocks
+        self.loaded = True
+        self._write_meta()
+    
+    def _spill(self, run: Dict[bytes, Tuple[int, int]], number: int) -> str:
+        
+        run_path = f"{self.path}.run{number}"
+        with open(run_path, "wb") as f:
+            f.write(b"".join(RECORD.pack(key, segment, offset) for key, (segment, offset) in sorted(run.items())))
+        return run_path
+    
+    def _merge_runs(self, run_paths) -> int:
+        
+        def records(number, run_path):
+            with open(run_path, "rb") as f:
+                while True:
+                    chunk = f.read(RECORD.size * 4096)
+                    if not chunk:
+                        return
+                    for i in range(0, len(chunk), RECORD.size):
+                        # Later runs sort first, so the newest location of a
+                        # repeated key is the one kept.
+                        yield chunk[i:i + KEY_BYTES], -number, chunk[i:i + RECORD.size]
+        
+        temp_path = f"{self.path}.tmp"
+        count = 0
+        previous = None
+        with open(temp_path, "wb") as f:
+            for key, _, record in heapq.merge(*(records(number, run_path) for number, run_path in enumerate(run_paths))):
+                if key != previous:
+                    f.write(record)
+                    count += 1
+                    previous = key
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.path)
+        return count
+    
+    def add(self, locations: Iterable[Tuple[str, Tuple[int, int]]], blocks: int) -> None:
+        
+        if not self.loaded:
+            return
+        records = []
+        for transaction_id, (segment, offset) in locations:
+            key = transaction_key(transaction_id)
+            self.recent[key] = (segment, offset)
+            records.append(RECORD.pack(key, segment, offset))
+        if self._log is None:
+            self._log = open(self.log_path, "ab")
+        self._log.write(b"".join(records))
+        self._log.flush()
+        self._logged += len(records)
+        self.blocks = blocks
+        if len(self.recent) >= self.merge_records:
+            self._compact()
+    
+    def get(self, transaction_id: str) -> Optional[Tuple[int, int]]:
+        
+        key = transaction_key(transaction_id)
+        location = self.recent.get(key)
+        if location is not None:
+            return location
+        position = self._position(key)
+        if position < self.records and self._key_at(position) == key:
+            _, segment, offset = RECORD.unpack_from(self._map, position * RECORD.size)
+            return segment, offset
+        return None
+    
+    def __len__(self) -> int:
+        
+        return self.records + sum(1 for key in self.recent if not self._contains(key))
+    
+    def close(self) -> None:
+        
+        if self.loaded:
+            if self.recent:
+                self._compact()
+            else:
+                self._write_meta()
+        self._close_files()
+        self.recent = {}
+        self.loaded = False
+    
+    def _compact(self) -> None:
+        
+        self._merge(self.recent)
+        self.recent = {}
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+        with open(self.log_path, "wb"):
+            pass
+        self._logged = 0
+        self._write_meta()
+    
+    def _merge(self, entries: Dict[bytes, Tuple[int, int]]) -> None:
+        
+        if not entries:
+            return
+        # Runs of the old file between insertion points are copied as raw
+        # bytes; only the new entries are packed one by one. A new entry
+        # replaces an old one with the same key.
+        temp_path = f"{self.path}.tmp"
+        records = self.records
+        with open(temp_path, "wb") as f:
+            view = memoryview(self._map) if self._map is not None else None
+            try:
+                copied = 0
+                for key, (segment, offset) in sorted(entries.items()):
+                    position = self._position(key)
+                    if position > copied:
+                        f.write(view[copied * RECORD.size:position * RECORD.size])
+                    f.write(RECORD.pack(key, segment, offset))
+                    if position < self.records and self._key_at(position) == key:
+                        copied = position + 1
+                    else:
+                        copied = position
+                        records += 1
+                if copied < self.records:
+                    f.write(view[copied * RECORD.size:self.records * RECORD.size])
+            finally:
+                if view is not None:
+                    view.release()
+            f.flush()
+            os.fsync(f.fileno())
+        self._close_map()
+        os.replace(temp_path, self.path)
+        self.records = records
+        self._map_sorted()
+    
+    def _position(self, key: bytes) -> int:
+        
+        low, high = 0, self.records
+        while low < high:
+            middle = (low + high) // 2
+            if self._key_at(middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+    
+    def _key_at(self, position: int) -> bytes:
+        
+        start = position * RECORD.size
+        return self._map[start:start + KEY_BYTES]
+    
+    def _contains(self, key: bytes) -> bool:
+        
+        position = self._position(key)
+        return position < self.records and self._key_at(position) == key
+    
+    def _map_sorted(self) -> None:
+        
+        if self.records:
+            with open(self.path, "rb") as f:
+                self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    
+    def _close_map(self) -> None:
+        
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+    
+    def _write_meta(self) -> None:
+        
+        temp_path = f"{self.meta_path}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump({"blocks": self.blocks, "records": self.records, "logged": self._logged}, f)
+        os.replace(temp_path, self.meta_path)
+    
+    def _close_files(self) -> None:
+        
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+        self._close_map()
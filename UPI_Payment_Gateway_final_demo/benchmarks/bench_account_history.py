@@ -0,0 +1,86 @@
+import sys
+import os
+import time
+import shutil
+import tempfile
+import argparse
+
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bank_server.account_index import AccountIndex
+from bank_server.block_store import BlockStore
+
+
+TARGET_ACCOUNT = "user-target"
+
+
+def build_chain(directory, blocks, target_payments):
+    
+    # Busy accounts fill the chain; the target account pays every
+    # blocks // target_payments blocks.
+    store = BlockStore(directory)
+    every = max(1, blocks // target_payments)
+    for start in range(0, blocks, 10000):
+        records = []
+        for i in range(start, min(start + 10000, blocks)):
+            sender_id = TARGET_ACCOUNT if i % every == 0 else f"user{i % 100000:012d}"
+            records.append({
+                "transaction_id": f"{i:064x}",
+                "transaction_data": {
+                    "transaction_id": f"{i:064x}", "sender_id": sender_id,
+                    "receiver_id": f"merchant{i % 5000:08d}", "amount": 10.0, "timestamp": 1700000000.0 + i
+                },
+                "previous_hash": f"{i - 1:064x}",
+                "timestamp": 1700000000.0 + i
+            })
+        store.append(records)
+    store.close()
+
+
+def time_call(function, repeat=1):
+    
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = function()
+    return (time.perf_counter() - start) / repeat * 1e3, result
+
+
+def main():
+    
+    parser = argparse.ArgumentParser(description="Account statement latency: posting index vs chain scan")
+    parser.add_argument("--blocks", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--payments", type=int, default=50)
+    parser.add_argument("--page-size", type=int, default=50)
+    parser.add_argument("--skip-scan", action="store_true", help="skip the linear scan baseline")
+    args = parser.parse_args()
+    
+    print(f"{'blocks':>9} {'index build s':>14} {'page ms':>8} {'rows':>5} {'scan ms':>10}")
+    for blocks in args.blocks:
+        temp_dir = tempfile.mkdtemp()
+        try:
+            build_chain(temp_dir, blocks, args.payments)
+            store = BlockStore(temp_dir)
+            index = AccountIndex(temp_dir)
+            
+            build_ms, _ = time_call(lambda: index.catch_up(store))
+            page_ms, page = time_call(lambda: [
+                store.read_at((segment, offset))
+                for _, _, segment, offset in index.query(TARGET_ACCOUNT, args.page_size)
+            ], repeat=20)
+            scan_ms = None
+            if not args.skip_scan:
+                scan_ms, _ = time_call(lambda: [
+                    record for record in store.iter_records()
+                    if record["transaction_data"].get("sender_id") == TARGET_ACCOUNT
+                ])
+            index.close()
+            store.close()
+        finally:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+        scan = f"{scan_ms:>10.0f}" if scan_ms is not None else f"{'-':>10}"
+        print(f"{blocks:>9} {build_ms / 1e3:>14.2f} {page_ms:>8.2f} {len(page):>5} {scan}")
+
+
+if __name__ == "__main__":
+    main()
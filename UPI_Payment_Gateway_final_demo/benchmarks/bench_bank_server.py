@@ -0,0 +1,99 @@
+import sys
+import os
+import io
+import time
+import hashlib
+import argparse
+import threading
+import contextlib
+
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bank_server.network import BankServerNetwork
+from common.network_protocol import Message
+
+
+def verify_pin_handler(message):
+
+    hashed_pin = hashlib.sha256(message.data["pin"].encode()).hexdigest()[:16]
+    return Message(
+        message_type="VERIFY_PIN_RESPONSE",
+        sender="BANK_SERVER",
+        receiver=message.sender,
+        data={"success": hashed_pin == message.data["expected"]},
+        message_id=message.message_id
+    )
+
+
+def percentile(values, pct):
+
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def run_mode(mode, concurrency, requests_per_client, backlog):
+
+    network = BankServerNetwork(mode=mode, host="127.0.0.1", port=0, backlog=backlog)
+    network.register_handler("VERIFY_PIN", verify_pin_handler)
+    network.start_server()
+
+    expected = hashlib.sha256(b"1234").hexdigest()[:16]
+    latencies = []
+    failures = [0]
+    lock = threading.Lock()
+    barrier = threading.Barrier(concurrency + 1)
+
+    def client(client_id):
+        local = []
+        barrier.wait()
+        for i in range(requests_per_client):
+            message = Message("VERIFY_PIN", "BENCH", "BANK_SERVER",
+                              {"pin": "1234", "expected": expected}, f"{client_id}-{i}")
+            start = time.perf_counter()
+            response = network.send_message("127.0.0.1", network.port, message)
+            local.append(time.perf_counter() - start)
+            if response is None or not response.data.get("success"):
+                with lock:
+                    failures[0] += 1
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=client, args=(i,), daemon=True) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    network.stop()
+
+    return {
+        "connections_per_second": len(latencies) / elapsed,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "failures": failures[0],
+    }
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description="Threaded vs asyncio bank server connection benchmark")
+    parser.add_argument("--concurrency", default="10,50,200", help="Comma separated concurrent client counts")
+    parser.add_argument("--requests", type=int, default=50, help="Connections opened per client")
+    parser.add_argument("--backlog", type=int, default=1024, help="Listen backlog")
+    args = parser.parse_args()
+
+    print(f"{'clients':>8} {'mode':>9} {'conn/s':>10} {'p50 ms':>8} {'p99 ms':>8} {'failed':>7}")
+    for concurrency in [int(c) for c in args.concurrency.split(",")]:
+        for mode in ("threaded", "asyncio"):
+            with contextlib.redirect_stdout(io.StringIO()):
+                result = run_mode(mode, concurrency, args.requests, args.backlog)
+            print(f"{concurrency:>8} {mode:>9} {result['connections_per_second']:>10.1f} "
+                  f"{result['p50_ms']:>8.2f} {result['p99_ms']:>8.2f} {result['failures']:>7}")
+
+
+if __name__ == "__main__":
+    main()
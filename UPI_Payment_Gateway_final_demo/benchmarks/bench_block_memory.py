@@ -0,0 +1,107 @@
+
+import sys
+import os
+import gc
+import time
+import hashlib
+import shutil
+import tempfile
+import argparse
+import tracemalloc
+
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bank_server.block_store import BlockStore
+from bank_server.blockchain import Block
+
+
+class DictBlock:
+    # Block as it was before __slots__: one instance dict per block.
+    
+    def __init__(self, transaction_id, transaction_data, previous_hash, timestamp, hash):
+        self.transaction_id = transaction_id
+        self.transaction_data = transaction_data
+        self.previous_hash = previous_hash
+        self.timestamp = timestamp
+        self.hash = hash
+
+
+def records(count):
+    
+    previous_hash = "0" * 64
+    for i in range(count):
+        transaction_id = hashlib.sha256(str(i).encode()).hexdigest()
+        block = Block(transaction_id, {
+            "transaction_id": transaction_id,
+            "sender_id": f"{i % 1000:016x}",
+            "receiver_id": f"{i % 997:016x}",
+            "amount": 250.0 + i % 100,
+            "description": "Payment via UPI",
+            "timestamp": 1700000000.0 + i
+        }, previous_hash, 1700000000.5 + i)
+        previous_hash = block.hash
+        yield block.to_dict()
+
+
+def measure(build):
+    
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    objects = build()
+    elapsed = time.perf_counter() - start
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return objects, size, elapsed
+
+
+def main():
+    
+    parser = argparse.ArgumentParser(description="Bytes per block: dict blocks vs __slots__ blocks vs packed views")
+    parser.add_argument("--blocks", type=int, default=100000)
+    args = parser.parse_args()
+    
+    temp_dir = tempfile.mkdtemp()
+    try:
+        stores = {}
+        for segment_format in ("json", "binary"):
+            store = BlockStore(os.path.join(temp_dir, segment_format), segment_format=segment_format)
+            locations = []
+            batch = []
+            for record in records(args.blocks):
+                batch.append(record)
+                if len(batch) == 10000:
+                    locations += store.append(batch)
+                    batch = []
+            locations += store.append(batch)
+            store.close()
+            # Reopen so every segment but the last is sealed and mapped.
+            stores[segment_format] = (BlockStore(store.directory), locations)
+        
+        json_store, json_locations = stores["json"]
+        binary_store, binary_locations = stores["binary"]
+        cases = [
+            ("dict Block (before)", lambda: [DictBlock(**record) for record in json_store.iter_records()]),
+            ("__slots__ Block", lambda: [Block.from_dict(record) for record in binary_store.iter_records()]),
+            ("BlockView on mmap", lambda: [binary_store.view_at(location) for location in binary_locations])
+        ]
+        
+        print(f"{'representation':<22} {'bytes/block':>12} {'build s':>8}")
+        for name, build in cases:
+            objects, size, elapsed = measure(build)
+            print(f"{name:<22} {size / args.blocks:>12.0f} {elapsed:>8.2f}")
+            del objects
+        
+        print()
+        print(f"{'segment format':<22} {'disk bytes/block':>17}")
+        for segment_format, (store, _) in stores.items():
+            disk = sum(segment["bytes"] for segment in store.segments)
+            print(f"{segment_format:<22} {disk / args.blocks:>17.0f}")
+            store.close()
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+import sys
+import os
+import time
+import shutil
+import tempfile
+import argparse
+
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bank_server.blockchain import Blockchain
+
+
+def transaction(i):
+    
+    return {
+        "transaction_id": f"{i:064x}",
+        "sender_id": f"user{i % 1000:012d}",
+        "receiver_id": f"merchant{i % 1000:08d}",
+        "amount": 10.0,
+        "timestamp": 1700000000.0 + i,
+        "status": "completed"
+    }
+
+
+def build_chain(blockchain, length):
+    
+    blockchain.add_blocks([(f"{i:064x}", transaction(i)) for i in range(1, length)])
+
+
+def time_legacy_append(blockchain, iterations):
+    
+    start = time.perf_counter()
+    for i in range(iterations):
+        blockchain.add_block(f"legacy{i}", transaction(i))
+        blockchain.save_to_file("legacy.json")
+    return (time.perf_counter() - start) / iterations * 1e3
+
+
+def time_store_append(blockchain, iterations):
+    
+    start = time.perf_counter()
+    for i in range(iterations):
+        blockchain.add_block(f"store{i}", transaction(i))
+    return (time.perf_counter() - start) / iterations * 1e3
+
+
+def time_call(function):
+    
+    start = time.perf_counter()
+    function()
+    return (time.perf_counter() - start) * 1e3
+
+
+def main():
+    
+    parser = argparse.ArgumentParser(description="Per-block persistence cost: whole-chain JSON rewrite vs append-only segments")
+    parser.add_argument("--blocks", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--legacy-iterations", type=int, default=5)
+    parser.add_argument("--store-iterations", type=int, default=2000)
+    args = parser.parse_args()
+    
+    original_cwd = os.getcwd()
+    print(f"{'blocks':>8} {'rewrite ms':>11} {'append ms':>10} {'load json ms':>13} {'load segs ms':>13}")
+    for blocks in args.blocks:
+        temp_dir = tempfile.mkdtemp()
+        os.chdir(temp_dir)
+        try:
+            legacy = Blockchain()
+            build_chain(legacy, blocks)
+            rewrite_ms = time_legacy_append(legacy, args.legacy_iterations)
+            load_json_ms = time_call(lambda: Blockchain.load_from_file("legacy.json"))
+            
+            stored = Blockchain.open("chain")
+            build_chain(stored, blocks)
+            append_ms = time_store_append(stored, args.store_iterations)
+            stored.close()
+            load_segments_ms = time_call(lambda: Blockchain.load_from_file("chain"))
+        finally:
+            os.chdir(original_cwd)
+            shutil.rmtree(temp_dir, ignore_errors=True)
+        print(f"{blocks:>8} {rewrite_ms:>11.3f} {append_ms:>10.4f} {load_json_ms:>13.1f} {load_segments_ms:>13.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+import sys
+import os
+import json
+import time
+import shutil
+import tempfile
+import argparse
+
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bank_server.block_store import BlockStore
+from bank_server.blockchain import Block, Blockchain
+
+
+def record(i):
+    
+    return {
+        "transaction_id": f"{i:064x}",
+        "transaction_data": {
+            "transaction_id": f"{i:064x}", "sender_id": f"user{i % 1000:012d}",
+            "receiver_id": f"merchant{i % 1000:08d}", "amount": 10.0, "timestamp": 1700000000.0 + i
+        },
+        "previous_hash": f"{i - 1:064x}",
+        "timestamp": 1700000000.0 + i
+    }
+
+
+def build_chain(directory, blocks):
+    
+    store = BlockStore(directory)
+    for start in range(0, blocks, 10000):
+        store.append([record(i) for i in range(start, min(start + 10000, blocks))])
+    store.close()
+
+
+def time_call(function):
+    
+    start = time.perf_counter()
+    function()
+    return (time.perf_counter() - start) * 1e3
+
+
+def open_lazily(directory):
+    
+    blockchain = Blockchain.open(directory)
+    blockchain.get_latest_block()
+    blockchain.close()
+
+
+def open_eagerly(directory):
+    
+    store = BlockStore(directory)
+    [Block.from_dict(record) for record in store.iter_records()]
+    store.close()
+
+
+def main():
+    
+    parser = argparse.ArgumentParser(description="Chain open time: lazy segments vs loading every block")
+    parser.add_argument("--blocks", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--legacy-max", type=int, default=100000,
+                        help="largest chain to also time as a single json file")
+    args = parser.parse_args()
+    
+    print(f"{'blocks':>9} {'lazy ms':>9} {'eager ms':>9} {'json ms':>9}")
+    for blocks in args.blocks:
+        temp_dir = tempfile.mkdtemp()
+        try:
+            directory = os.path.join(temp_dir, "chain")
+            build_chain(directory, blocks)
+            # Warm the page cache so both columns read from memory.
+            open_lazily(directory)
+            lazy_ms = time_call(lambda: open_lazily(directory))
+            eager_ms = time_call(lambda: open_eagerly(directory))
+            
+            json_ms = None
+            if blocks <= args.legacy_max:
+                legacy_file = os.path.join(temp_dir, "chain.json")
+                with open(legacy_file, "w") as f:
+                    json.dump([record(i) for i in range(blocks)], f, indent=4)
+                json_ms = time_call(lambda: Blockchain.load_from_file(legacy_file))
+        finally:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+        legacy = f"{json_ms:>9.1f}" if json_ms is not None else f"{'-':>9}"
+        print(f"{blocks:>9} {lazy_ms:>9.2f} {eager_ms:>9.1f} {legacy}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+import sys
+import os
+import time
+import shutil
+import tempfile
+import argparse
+
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bank_server.blockchain import Blockchain
+
+
+def transaction(i):
+    
+    return {
+        "transaction_id": f"{i:064x}", "sender_id": f"user{i % 1000:012d}",
+        "receiver_id": f"merchant{i % 1000:08d}", "amount": 10.0, "timestamp": 1700000000.0 + i
+    }
+
+
+def time_call(function):
+    
+    start = time.perf_counter()
+    result = function()
+    return (time.perf_counter() - start) * 1e3, result
+
+
+def main():
+    
+    parser = argparse.ArgumentParser(description="Chain verification: full pass, parallel full pass, incremental audit")
+    parser.add_argument("--blocks", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--new-blocks", type=int, default=1000)
+    args = parser.parse_args()
+    
+    print(f"{'blocks':>9} {'full ms':>9} {'parallel ms':>12} {'incremental ms':>15}")
+    for blocks in args.blocks:
+        temp_dir = tempfile.mkdtemp()
+        try:
+            blockchain = Blockchain.open(os.path.join(temp_dir, "chain"))
+            for start in range(1, blocks, 10000):
+                blockchain.add_blocks([(f"{i:064x}", transaction(i)) for i in range(start, min(start + 10000, blocks))])
+            
+            full_ms, full_ok = time_call(lambda: blockchain.verify(since_checkpoint=False))
+            parallel_ms, parallel_ok = time_call(lambda: blockchain.verify(since_checkpoint=False, workers=args.workers))
+            blockchain.add_blocks([(f"{blocks + i:064x}", transaction(blocks + i)) for i in range(args.new_blocks)])
+            incremental_ms, incremental_ok = time_call(blockchain.verify)
+            assert full_ok and parallel_ok and incremental_ok
+            blockchain.close()
+        finally:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+        print(f"{blocks:>9} {full_ms:>9.0f} {parallel_ms:>12.0f} {incremental_ms:>15.1f}")
+
+
+if __name__ == "__main__":
+    main()
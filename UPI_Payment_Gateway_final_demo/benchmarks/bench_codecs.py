@@ -0,0 +1,79 @@
+import sys
+import os
+import time
+import argparse
+
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common.network_protocol import Message, CODECS
+
+
+SAMPLE_MESSAGES = {
+    "PROCESS_TRANSACTION": Message(
+        "PROCESS_TRANSACTION", "UPI_MACHINE", "BANK_SERVER",
+        {"sender_id": "b2e08dc8c61283d4", "receiver_id": "d1df7809f269d037",
+         "amount": 250.0, "description": "Payment via UPI"},
+        "6f1c8a52-3f0e-4a3e-9d0a-5b7c2f9e1a11"
+    ),
+    "PROCESS_TRANSACTION_RESPONSE": Message(
+        "PROCESS_TRANSACTION_RESPONSE", "BANK_SERVER", "UPI_MACHINE",
+        {"success": True, "transaction_id": "9f2b" * 16, "error": None},
+        "6f1c8a52-3f0e-4a3e-9d0a-5b7c2f9e1a11"
+    ),
+    "VERIFY_PIN": Message(
+        "VERIFY_PIN", "USER_DEVICE", "BANK_SERVER",
+        {"user_id": "b2e08dc8c61283d4", "pin": "1234"},
+        "0b5e43c1-7a6d-4c55-8c43-1d2f3e4a5b6c"
+    ),
+    "VERIFY_PIN_RESPONSE": Message(
+        "VERIFY_PIN_RESPONSE", "BANK_SERVER", "USER_DEVICE",
+        {"success": True}, "0b5e43c1-7a6d-4c55-8c43-1d2f3e4a5b6c"
+    ),
+    "AUTHENTICATE_USER": Message(
+        "AUTHENTICATE_USER", "USER_DEVICE", "BANK_SERVER",
+        {"uid": "b2e08dc8c61283d4", "password": "correct horse battery"},
+        "2c9d7e8f-1a2b-4c3d-9e8f-7a6b5c4d3e2f"
+    ),
+    "AUTHENTICATE_USER_RESPONSE": Message(
+        "AUTHENTICATE_USER_RESPONSE", "BANK_SERVER", "USER_DEVICE",
+        {"success": True, "user_id": "b2e08dc8c61283d4", "mmid": "816060ecc2246af1", "error": None},
+        "2c9d7e8f-1a2b-4c3d-9e8f-7a6b5c4d3e2f"
+    ),
+    "GET_MERCHANT_INFO": Message(
+        "GET_MERCHANT_INFO", "UPI_MACHINE", "BANK_SERVER",
+        {"merchant_id": "d1df7809f269d037"}, "a1b2c3d4-e5f6-4a7b-8c9d-0e1f2a3b4c5d"
+    ),
+    "GET_MERCHANT_INFO_RESPONSE": Message(
+        "GET_MERCHANT_INFO_RESPONSE", "BANK_SERVER", "UPI_MACHINE",
+        {"success": True, "merchant_name": "chip", "bank_code": "SBIN0000001"},
+        "a1b2c3d4-e5f6-4a7b-8c9d-0e1f2a3b4c5d"
+    ),
+}
+
+
+def time_per_call(function, argument, iterations):
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        function(argument)
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description="Encode/decode cost and wire size per codec")
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+
+    print(f"{'message type':<30} {'codec':>7} {'bytes':>6} {'encode us':>10} {'decode us':>10}")
+    for name, message in SAMPLE_MESSAGES.items():
+        for codec in CODECS.values():
+            payload = codec.encode(message)
+            encode_us = time_per_call(codec.encode, message, args.iterations)
+            decode_us = time_per_call(codec.decode, payload, args.iterations)
+            print(f"{name:<30} {codec.name:>7} {len(payload):>6} {encode_us:>10.2f} {decode_us:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
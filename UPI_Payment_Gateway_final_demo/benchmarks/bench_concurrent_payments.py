@@ -0,0 +1,90 @@
+import sys
+import os
+import time
+import random
+import shutil
+import tempfile
+import argparse
+import threading
+
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bank_server.bank_manager import BankManager
+from common.models import User, Merchant
+
+
+def setup_bank(accounts, stripes, fsync_policy):
+    
+    bank_manager = BankManager(fsync_policy=fsync_policy, lock_stripes=stripes, checkpoint_records=10 ** 9)
+    bank_manager.initialize()
+    bank_manager.merchant_directory.stop()
+    for i in range(accounts):
+        uid = f"user{i:06d}"
+        bank_manager.users[uid] = User(
+            uid=uid, name=uid, mmid=uid, pin="", account_number=uid,
+            bank_code="SBIN0000001", mobile_number="", password="", balance=1e9
+        )
+        mid = f"merchant{i:06d}"
+        bank_manager.merchants[mid] = Merchant(
+            mid=mid, name=mid, account_number=mid, bank_code="HDFC0000001", balance=0.0
+        )
+    return bank_manager
+
+
+def run(bank_manager, threads, payments, accounts):
+    
+    per_thread = payments // threads
+    
+    def worker(seed):
+        rng = random.Random(seed)
+        for _ in range(per_thread):
+            bank_manager.process_transaction(
+                f"user{rng.randrange(accounts):06d}", f"merchant{rng.randrange(accounts):06d}", 1.0
+            )
+    
+    workers = [threading.Thread(target=worker, args=(seed,)) for seed in range(threads)]
+    start = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return per_thread * threads / (time.perf_counter() - start)
+
+
+def main():
+    
+    parser = argparse.ArgumentParser(description="Payment throughput by thread count: one global stripe vs lock striping")
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    parser.add_argument("--stripes", type=int, nargs="+", default=[1, 64])
+    parser.add_argument("--payments", type=int, default=4000)
+    parser.add_argument("--accounts", type=int, default=1000)
+    parser.add_argument("--fsync-policy", default="group")
+    args = parser.parse_args()
+    
+    original_cwd = os.getcwd()
+    rows = []
+    for stripes in args.stripes:
+        for threads in args.threads:
+            temp_dir = tempfile.mkdtemp()
+            os.chdir(temp_dir)
+            devnull = open(os.devnull, "w")
+            stdout, sys.stdout = sys.stdout, devnull
+            try:
+                bank_manager = setup_bank(args.accounts, stripes, args.fsync_policy)
+                throughput = run(bank_manager, threads, args.payments, args.accounts)
+                bank_manager.ledger_log.close()
+            finally:
+                sys.stdout = stdout
+                devnull.close()
+                os.chdir(original_cwd)
+                shutil.rmtree(temp_dir, ignore_errors=True)
+            rows.append((stripes, threads, throughput))
+    
+    print(f"{'stripes':>8} {'threads':>8} {'payments/s':>11}")
+    for stripes, threads, throughput in rows:
+        print(f"{stripes:>8} {threads:>8} {throughput:>11.0f}")
+
+
+if __name__ == "__main__":
+    main()
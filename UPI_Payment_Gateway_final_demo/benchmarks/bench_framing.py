@@ -0,0 +1,111 @@
+import sys
+import os
+import json
+import socket
+import threading
+import time
+import argparse
+
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common.network_protocol import Message, read_message, write_message
+
+
+def build_history_message(size_bytes):
+
+    transactions = []
+    message = Message("HISTORY_RESPONSE", "BANK_SERVER", "USER_DEVICE", {"transactions": transactions}, "bench")
+    entry_size = len(json.dumps({
+        "transaction_id": "f" * 64,
+        "sender_id": "b2e08dc8c61283d4",
+        "receiver_id": "d1df7809f269d037",
+        "amount": 100.0,
+        "timestamp": time.time()
+    }))
+    for i in range(max(1, size_bytes // entry_size)):
+        transactions.append({
+            "transaction_id": f"{i:064x}",
+            "sender_id": "b2e08dc8c61283d4",
+            "receiver_id": "d1df7809f269d037",
+            "amount": 100.0,
+            "timestamp": time.time()
+        })
+    return message
+
+
+def legacy_read_message(sock, counters):
+
+    data = b""
+    while True:
+        chunk = sock.recv(4096)
+        if not chunk:
+            return None
+        data += chunk
+        try:
+            counters["parses"] += 1
+            return Message.from_json(data.decode())
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            continue
+
+
+def legacy_write_message(sock, message):
+
+    sock.sendall(message.to_json().encode())
+
+
+def run_case(message, iterations, framed):
+
+    left, right = socket.socketpair()
+    counters = {"parses": 0}
+
+    def writer():
+        for _ in range(iterations):
+            if framed:
+                write_message(left, message)
+            else:
+                legacy_write_message(left, message)
+            left.recv(1)
+
+    thread = threading.Thread(target=writer, daemon=True)
+    start = time.perf_counter()
+    thread.start()
+    for _ in range(iterations):
+        if framed:
+            counters["parses"] += 1
+            read_message(right)
+        else:
+            legacy_read_message(right, counters)
+        right.sendall(b"k")
+    elapsed = time.perf_counter() - start
+    thread.join()
+    left.close()
+    right.close()
+    return elapsed, counters["parses"] / iterations
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description="Message framing throughput by message size")
+    parser.add_argument("--sizes", default="1024,16384,131072,1048576",
+                        help="Comma separated payload sizes in bytes")
+    parser.add_argument("--budget", type=float, default=8 * 1024 * 1024,
+                        help="Approximate bytes transferred per case")
+    args = parser.parse_args()
+
+    print(f"{'size':>10} {'mode':>8} {'msgs/s':>10} {'MB/s':>9} {'parses/msg':>11}")
+    for size in [int(s) for s in args.sizes.split(",")]:
+        message = build_history_message(size)
+        wire_size = len(message.to_bytes())
+        iterations = max(3, int(args.budget // wire_size))
+        for framed in (False, True):
+            if not framed and wire_size > 256 * 1024:
+                iterations = 3
+            elapsed, parses = run_case(message, iterations, framed)
+            mode = "framed" if framed else "legacy"
+            print(f"{wire_size:>10} {mode:>8} {iterations / elapsed:>10.1f} "
+                  f"{wire_size * iterations / elapsed / 1e6:>9.2f} {parses:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
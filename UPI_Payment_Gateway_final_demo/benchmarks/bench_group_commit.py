@@ -0,0 +1,66 @@
+import sys
+import os
+import time
+import shutil
+import tempfile
+import argparse
+import threading
+
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bank_server.ledger_log import LedgerLog
+
+
+def run(path, policy, clients, commits_per_client, max_batch, max_wait):
+    
+    log = LedgerLog(path, fsync_policy=policy, group_max_batch=max_batch, group_max_wait=max_wait)
+    
+    def client(index):
+        for i in range(commits_per_client):
+            seq = log.append([
+                ("user", f"user{index:04d}", -1.0, 1e6 - i),
+                ("merchant", f"merchant{index:04d}", 1.0, float(i))
+            ], [f"{index:08x}{i:056x}"])
+            log.commit(seq)
+    
+    threads = [threading.Thread(target=client, args=(index,)) for index in range(clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    
+    stats = log.group_commit_stats()
+    log.close()
+    average_batch = stats["records"] / stats["batches"] if stats and stats["batches"] else 1.0
+    return clients * commits_per_client / elapsed, average_batch
+
+
+def main():
+    
+    parser = argparse.ArgumentParser(description="Durable ledger commits/s vs concurrent clients")
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32, 64])
+    parser.add_argument("--commits", type=int, default=4000, help="total commits per run")
+    parser.add_argument("--max-batch", type=int, default=256)
+    parser.add_argument("--max-wait", type=float, nargs="+", default=[0.0, 0.001, 0.005])
+    args = parser.parse_args()
+    
+    configurations = [("always", None)] + [("group", max_wait) for max_wait in args.max_wait]
+    temp_dir = tempfile.mkdtemp()
+    try:
+        print(f"{'policy':>8} {'max wait ms':>12} {'clients':>8} {'tx/s':>10} {'avg batch':>10}")
+        for policy, max_wait in configurations:
+            for clients in args.clients:
+                path = os.path.join(temp_dir, f"{policy}-{max_wait}-{clients}.log")
+                throughput, average_batch = run(path, policy, clients, max(1, args.commits // clients),
+                                                args.max_batch, max_wait or 0.0)
+                wait_label = f"{max_wait * 1e3:.1f}" if max_wait is not None else "-"
+                print(f"{policy:>8} {wait_label:>12} {clients:>8} {throughput:>10.0f} {average_batch:>10.1f}")
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
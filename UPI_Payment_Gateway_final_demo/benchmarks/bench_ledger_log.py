@@ -0,0 +1,100 @@
+import sys
+import os
+import time
+import shutil
+import tempfile
+import argparse
+
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bank_server.bank_manager import BankManager
+from bank_server.ledger_log import FSYNC_POLICIES
+from common.models import User, Merchant
+
+
+def populate(bank_manager, accounts):
+    
+    for i in range(accounts // 2):
+        uid = f"user{i:012d}"
+        bank_manager.users[uid] = User(
+            uid=uid, name=f"User {i}", mmid=f"mmid{i:012d}", pin="0" * 16,
+            account_number=uid, bank_code="SBIN0000001", mobile_number="9000000000",
+            password="0" * 16, balance=1000.0
+        )
+        mid = f"merchant{i:08d}"
+        bank_manager.merchants[mid] = Merchant(
+            mid=mid, name=f"Merchant {i}", account_number=mid,
+            bank_code="HDFC0000001", balance=0.0
+        )
+
+
+def time_legacy_persist(bank_manager, iterations):
+    
+    start = time.perf_counter()
+    for _ in range(iterations):
+        bank_manager.save_users()
+        bank_manager.save_merchants()
+    return (time.perf_counter() - start) / iterations * 1e3
+
+
+def time_ledger_append(bank_manager, iterations):
+    
+    log = bank_manager.ledger_log
+    start = time.perf_counter()
+    for i in range(iterations):
+        seq = log.append([
+            ("user", "user000000000000", -1.0, 999.0 - i),
+            ("merchant", "merchant00000000", 1.0, 1.0 + i)
+        ], [f"{i:064x}"])
+        log.commit(seq)
+    return (time.perf_counter() - start) / iterations * 1e3
+
+
+def time_call(function):
+    
+    start = time.perf_counter()
+    function()
+    return (time.perf_counter() - start) * 1e3
+
+
+def main():
+    
+    parser = argparse.ArgumentParser(description="Per-payment persistence cost: full JSON rewrite vs ledger log")
+    parser.add_argument("--accounts", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--legacy-iterations", type=int, default=3)
+    parser.add_argument("--log-iterations", type=int, default=2000)
+    args = parser.parse_args()
+    
+    original_cwd = os.getcwd()
+    rows = []
+    for accounts in args.accounts:
+        for policy in FSYNC_POLICIES:
+            temp_dir = tempfile.mkdtemp()
+            os.chdir(temp_dir)
+            devnull = open(os.devnull, "w")
+            stdout, sys.stdout = sys.stdout, devnull
+            try:
+                bank_manager = BankManager(fsync_policy=policy, checkpoint_records=args.log_iterations + 1)
+                populate(bank_manager, accounts)
+                legacy_ms = time_legacy_persist(bank_manager, args.legacy_iterations) if policy == FSYNC_POLICIES[0] else None
+                log_ms = time_ledger_append(bank_manager, args.log_iterations)
+                checkpoint_ms = time_call(bank_manager.checkpoint)
+                time_ledger_append(bank_manager, args.log_iterations)
+                bank_manager.ledger_log.close()
+                replay_ms = time_call(bank_manager.replay_ledger)
+            finally:
+                sys.stdout = stdout
+                devnull.close()
+                os.chdir(original_cwd)
+                shutil.rmtree(temp_dir, ignore_errors=True)
+            rows.append((accounts, policy, legacy_ms, log_ms, checkpoint_ms, replay_ms))
+    
+    print(f"{'accounts':>9} {'policy':>9} {'rewrite ms/tx':>14} {'log ms/tx':>10} {'checkpoint ms':>14} {'replay ms':>10}")
+    for accounts, policy, legacy_ms, log_ms, checkpoint_ms, replay_ms in rows:
+        legacy = f"{legacy_ms:>14.2f}" if legacy_ms is not None else f"{'-':>14}"
+        print(f"{accounts:>9} {policy:>9} {legacy} {log_ms:>10.4f} {checkpoint_ms:>14.1f} {replay_ms:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
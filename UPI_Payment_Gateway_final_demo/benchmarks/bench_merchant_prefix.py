@@ -0,0 +1,67 @@
+
+import sys
+import os
+import time
+import random
+import hashlib
+import argparse
+
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bank_server.merchant_index import MerchantPrefixIndex
+
+
+def merchant_ids(count):
+    
+    return [hashlib.sha256(str(i).encode()).hexdigest()[:16] for i in range(count)]
+
+
+def time_scan(mids, prefixes):
+    
+    # What decrypt_vmid_to_mid used to do: test every merchant id.
+    start = time.perf_counter()
+    for prefix in prefixes:
+        [mid for mid in mids if mid.startswith(prefix)]
+    return (time.perf_counter() - start) / len(prefixes) * 1e6
+
+
+def time_index(index, prefixes):
+    
+    start = time.perf_counter()
+    for prefix in prefixes:
+        index.candidates(prefix)
+    return (time.perf_counter() - start) / len(prefixes) * 1e6
+
+
+def main():
+    
+    parser = argparse.ArgumentParser(description="Merchant lookup by id prefix: sorted index vs linear scan")
+    parser.add_argument("--merchants", type=int, nargs="+", default=[100000, 1000000])
+    parser.add_argument("--lookups", type=int, default=10000)
+    parser.add_argument("--scan-lookups", type=int, default=5)
+    parser.add_argument("--adds", type=int, default=1000)
+    args = parser.parse_args()
+    
+    rng = random.Random(0)
+    print(f"{'merchants':>10} {'build s':>8} {'add us':>7} {'8-char us':>10} {'4-char us':>10} {'avg k@4':>8} {'scan us':>10}")
+    for count in args.merchants:
+        mids = merchant_ids(count)
+        start = time.perf_counter()
+        index = MerchantPrefixIndex(mids)
+        build = time.perf_counter() - start
+        
+        start = time.perf_counter()
+        for i in range(args.adds):
+            index.add(f"{rng.getrandbits(64):016x}")
+        add = (time.perf_counter() - start) / args.adds * 1e6
+        
+        long_prefixes = [rng.choice(mids)[:8] for _ in range(args.lookups)]
+        short_prefixes = [prefix[:4] for prefix in long_prefixes]
+        matches = sum(len(index.candidates(prefix)) for prefix in short_prefixes) / len(short_prefixes)
+        print(f"{count:>10} {build:>8.2f} {add:>7.1f} {time_index(index, long_prefixes):>10.2f} "
+              f"{time_index(index, short_prefixes):>10.2f} {matches:>8.1f} {time_scan(mids, long_prefixes[:args.scan_lookups]):>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+
+import sys
+import os
+import json
+import time
+import random
+import shutil
+import tempfile
+import argparse
+
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bank_server.blockchain import Blockchain, verify_transaction_proof
+
+
+def transactions(count):
+    
+    return [(f"{i:064x}", {
+        "sender_id": f"user{i % 1000:012d}",
+        "receiver_id": f"merchant{i % 1000:08d}",
+        "amount": 10.0,
+        "timestamp": 1700000000.0 + i
+    }) for i in range(count)]
+
+
+def chain_bytes(directory):
+    
+    return sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory) if name.startswith("segment-"))
+
+
+def run(entries, batch_size, payments_per_call):
+    
+    temp_dir = tempfile.mkdtemp()
+    try:
+        blockchain = Blockchain.open(temp_dir, batch_size=batch_size, batch_interval=3600)
+        start = time.perf_counter()
+        for i in range(0, len(entries), payments_per_call):
+            if batch_size == 1:
+                blockchain.add_blocks(entries[i:i + payments_per_call])
+            else:
+                blockchain.add_transactions(entries[i:i + payments_per_call])
+        blockchain.seal()
+        elapsed = time.perf_counter() - start
+        
+        blocks = len(blockchain.chain) - 1
+        size = chain_bytes(temp_dir)
+        start = time.perf_counter()
+        blockchain.verify(since_checkpoint=False)
+        verify_s = time.perf_counter() - start
+        
+        proof_bytes = proof_us = 0.0
+        if batch_size > 1:
+            rng = random.Random(0)
+            samples = [entries[rng.randrange(len(entries))] for _ in range(200)]
+            proofs = [blockchain.transaction_proof(transaction_id) for transaction_id, _ in samples]
+            proof_bytes = sum(len(json.dumps(proof)) for proof in proofs) / len(proofs)
+            start = time.perf_counter()
+            for (transaction_id, transaction_data), proof in zip(samples, proofs):
+                assert verify_transaction_proof(transaction_id, transaction_data, proof)
+            proof_us = (time.perf_counter() - start) / len(proofs) * 1e6
+        blockchain.close()
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+    return len(entries) / elapsed, blocks, size, verify_s, proof_bytes, proof_us
+
+
+def main():
+    
+    parser = argparse.ArgumentParser(description="One block per transaction vs Merkle batch blocks")
+    parser.add_argument("--transactions", type=int, default=100000)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 16, 256, 1024])
+    parser.add_argument("--payments-per-call", type=int, default=1)
+    args = parser.parse_args()
+    
+    entries = transactions(args.transactions)
+    print(f"{'batch':>6} {'tx/s':>9} {'blocks':>8} {'chain MB':>9} {'verify s':>9} {'proof B':>8} {'proof us':>9}")
+    for batch_size in args.batch_sizes:
+        rate, blocks, size, verify_s, proof_bytes, proof_us = run(entries, batch_size, args.payments_per_call)
+        print(f"{batch_size:>6} {rate:>9.0f} {blocks:>8} {size / 1e6:>9.1f} {verify_s:>9.2f} {proof_bytes:>8.0f} {proof_us:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
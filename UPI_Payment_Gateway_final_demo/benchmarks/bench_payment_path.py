@@ -0,0 +1,80 @@
+import sys
+import os
+import time
+import shutil
+import tempfile
+import argparse
+
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bank_server.bank_manager import BankManager
+from common.models import User, Merchant
+
+
+def setup_bank(merchants):
+    
+    bank_manager = BankManager()
+    bank_manager.initialize()
+    bank_manager.merchant_directory.stop()
+    bank_manager.users["sender"] = User(
+        uid="sender", name="Sender", mmid="mmid", pin="0" * 16, account_number="sender",
+        bank_code="SBIN0000001", mobile_number="9000000000", password="0" * 16, balance=1e12
+    )
+    for i in range(merchants):
+        mid = f"merchant{i:08d}"
+        bank_manager.merchants[mid] = Merchant(
+            mid=mid, name=f"Merchant {i}", account_number=mid, bank_code="SBIN0000001", balance=0.0
+        )
+    bank_manager.save_users()
+    bank_manager.save_merchants()
+    return bank_manager
+
+
+def measure(bank_manager, payments, reload_merchants):
+    
+    latencies = []
+    for i in range(payments):
+        start = time.perf_counter()
+        if reload_merchants:
+            # What process_transaction did on every call before the directory.
+            bank_manager.load_merchants()
+        bank_manager.process_transaction("sender", f"merchant{i % 100:08d}", 1.0)
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    return latencies[len(latencies) // 2] * 1e3, latencies[int(len(latencies) * 0.99)] * 1e3
+
+
+def main():
+    
+    parser = argparse.ArgumentParser(description="process_transaction latency with and without reloading merchants.json")
+    parser.add_argument("--merchants", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--payments", type=int, default=200)
+    args = parser.parse_args()
+    
+    original_cwd = os.getcwd()
+    rows = []
+    for merchants in args.merchants:
+        for label, reload_merchants in (("reload per payment", True), ("merchant directory", False)):
+            temp_dir = tempfile.mkdtemp()
+            os.chdir(temp_dir)
+            devnull = open(os.devnull, "w")
+            stdout, sys.stdout = sys.stdout, devnull
+            try:
+                bank_manager = setup_bank(merchants)
+                p50, p99 = measure(bank_manager, args.payments, reload_merchants)
+                bank_manager.ledger_log.close()
+            finally:
+                sys.stdout = stdout
+                devnull.close()
+                os.chdir(original_cwd)
+                shutil.rmtree(temp_dir, ignore_errors=True)
+            rows.append((merchants, label, p50, p99))
+    
+    print(f"{'merchants':>9} {'payment path':>20} {'p50 ms':>8} {'p99 ms':>8}")
+    for merchants, label, p50, p99 in rows:
+        print(f"{merchants:>9} {label:>20} {p50:>8.3f} {p99:>8.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+
+import sys
+import os
+import time
+import argparse
+from unittest import mock
+
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from upi_machine import lwc
+from upi_machine.lwc import Speck64, speck_encrypt
+
+
+def rate(run, blocks):
+    
+    start = time.perf_counter()
+    run()
+    return blocks / (time.perf_counter() - start)
+
+
+def main():
+    
+    parser = argparse.ArgumentParser(description="SPECK throughput in blocks/s: scalar vs NumPy batch")
+    parser.add_argument("--blocks", type=int, default=100000)
+    args = parser.parse_args()
+    
+    cipher = Speck64(os.urandom(16))
+    data = os.urandom(8 * args.blocks)
+    blocks = [data[i:i + 8] for i in range(0, len(data), 8)]
+    legacy_blocks = [block.hex()[:8] for block in blocks[:args.blocks // 10]]
+    
+    cases = [
+        ("legacy speck_encrypt (10 rounds)", lambda: [speck_encrypt(block, "UPI12345678") for block in legacy_blocks], len(legacy_blocks)),
+        ("Speck64.encrypt_block", lambda: [cipher.encrypt_block(block) for block in blocks], args.blocks),
+        ("Speck64.decrypt_block", lambda: [cipher.decrypt_block(block) for block in blocks], args.blocks),
+    ]
+    if lwc.np is not None:
+        cases += [
+            ("Speck64.encrypt_many (NumPy)", lambda: cipher.encrypt_many(data), args.blocks),
+            ("Speck64.decrypt_many (NumPy)", lambda: cipher.decrypt_many(data), args.blocks),
+        ]
+    
+    def without_numpy():
+        with mock.patch.object(lwc, "np", None):
+            cipher.encrypt_many(data)
+    cases.append(("Speck64.encrypt_many (no NumPy)", without_numpy, args.blocks))
+    
+    print(f"{'path':<34} {'blocks/s':>12}")
+    for name, run, count in cases:
+        print(f"{name:<34} {rate(run, count):>12,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+
+import sys
+import os
+import time
+import random
+import shutil
+import tempfile
+import argparse
+
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bank_server.block_store import BlockStore
+from bank_server.blockchain import Block, Blockchain
+
+BASE = 1700000000.0
+
+
+def build_chain(directory, blocks):
+    
+    store = BlockStore(directory)
+    previous_hash = "0"
+    for start in range(0, blocks, 10000):
+        records = []
+        for i in range(start, min(start + 10000, blocks)):
+            block = Block(f"{i:064x}", {
+                "transaction_id": f"{i:064x}",
+                "sender_id": f"{i % 1000:016x}",
+                "receiver_id": f"{i % 997:016x}",
+                "amount": 10.0,
+                "description": "Payment via UPI",
+                "timestamp": BASE + i
+            }, previous_hash, BASE + i + 0.5)
+            previous_hash = block.digest()
+            records.append(block.to_dict())
+        store.append(records)
+    store.close()
+    return Blockchain(BlockStore(directory))
+
+
+def time_indexed(blockchain, windows):
+    
+    start = time.perf_counter()
+    for start_time, end_time in windows:
+        sum(1 for _ in blockchain.blocks_between(start_time, end_time))
+    return (time.perf_counter() - start) / len(windows) * 1e3
+
+
+def time_scan(blockchain, windows):
+    
+    start = time.perf_counter()
+    for start_time, end_time in windows:
+        sum(1 for block in blockchain.chain if start_time <= block.timestamp < end_time)
+    return (time.perf_counter() - start) / len(windows) * 1e3
+
+
+def main():
+    
+    parser = argparse.ArgumentParser(description="Time-window queries: sparse time index vs scanning from genesis")
+    parser.add_argument("--blocks", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--window", type=float, default=100.0, help="Window length in seconds (one block per second)")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--scan-queries", type=int, default=3)
+    args = parser.parse_args()
+    
+    print(f"{'blocks':>8} {'index build s':>14} {'indexed ms':>11} {'scan ms':>9} {'speedup':>8}")
+    for blocks in args.blocks:
+        temp_dir = tempfile.mkdtemp()
+        try:
+            blockchain = build_chain(os.path.join(temp_dir, "chain"), blocks)
+            rng = random.Random(0)
+            windows = []
+            for _ in range(args.queries):
+                start_time = BASE + rng.uniform(0, blocks - args.window)
+                windows.append((start_time, start_time + args.window))
+            
+            start = time.perf_counter()
+            blockchain.position_at(BASE)
+            build = time.perf_counter() - start
+            indexed = time_indexed(blockchain, windows)
+            scan = time_scan(blockchain, windows[:args.scan_queries])
+            print(f"{blocks:>8} {build:>14.2f} {indexed:>11.2f} {scan:>9.1f} {scan / indexed:>7.0f}x")
+            blockchain.close()
+        finally:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
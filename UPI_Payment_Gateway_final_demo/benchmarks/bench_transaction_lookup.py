@@ -0,0 +1,91 @@
+import sys
+import os
+import time
+import random
+import shutil
+import tempfile
+import argparse
+import tracemalloc
+
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bank_server.block_store import BlockStore
+from bank_server.transaction_index import TransactionIndex
+
+
+def build_store(directory, blocks):
+    
+    store = BlockStore(directory)
+    for start in range(0, blocks, 10000):
+        store.append([{
+            "transaction_id": f"{i:064x}",
+            "transaction_data": {"sender_id": f"user{i % 1000:012d}", "receiver_id": f"merchant{i % 1000:08d}", "amount": 10.0},
+            "previous_hash": f"{i - 1:064x}",
+            "timestamp": 1700000000.0 + i
+        } for i in range(start, min(start + 10000, blocks))])
+    return store
+
+
+def time_rebuild(store, index):
+    
+    start = time.perf_counter()
+    index.rebuild(((record["transaction_id"], location) for location, record in store.scan()), store.block_count)
+    return time.perf_counter() - start
+
+
+def time_indexed_lookup(store, index, transaction_ids):
+    
+    start = time.perf_counter()
+    for transaction_id in transaction_ids:
+        store.read_at(index.get(transaction_id))
+    return (time.perf_counter() - start) / len(transaction_ids) * 1e6
+
+
+def time_linear_lookup(store, transaction_ids):
+    
+    start = time.perf_counter()
+    for transaction_id in transaction_ids:
+        for record in store.iter_records():
+            if record["transaction_id"] == transaction_id:
+                break
+    return (time.perf_counter() - start) / len(transaction_ids) * 1e6
+
+
+def main():
+    
+    parser = argparse.ArgumentParser(description="Transaction lookup latency: txid index vs linear chain scan")
+    parser.add_argument("--blocks", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--lookups", type=int, default=10000)
+    parser.add_argument("--linear-lookups", type=int, default=3)
+    args = parser.parse_args()
+    
+    rng = random.Random(0)
+    print(f"{'blocks':>8} {'rebuild s':>10} {'load s':>8} {'load MB':>8} {'indexed us':>11} {'linear us':>12}")
+    for blocks in args.blocks:
+        temp_dir = tempfile.mkdtemp()
+        try:
+            store = build_store(temp_dir, blocks)
+            index = TransactionIndex(temp_dir)
+            rebuild_s = time_rebuild(store, index)
+            
+            # Python heap held by a freshly loaded index.
+            tracemalloc.start()
+            index = TransactionIndex(temp_dir)
+            start = time.perf_counter()
+            index.load(store.block_count)
+            load_s = time.perf_counter() - start
+            load_mb = tracemalloc.get_traced_memory()[0] / 2 ** 20
+            tracemalloc.stop()
+            
+            transaction_ids = [f"{rng.randrange(blocks):064x}" for _ in range(args.lookups)]
+            indexed_us = time_indexed_lookup(store, index, transaction_ids)
+            linear_us = time_linear_lookup(store, transaction_ids[:args.linear_lookups])
+            store.close()
+        finally:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+        print(f"{blocks:>8} {rebuild_s:>10.2f} {load_s:>8.2f} {load_mb:>8.1f} {indexed_us:>11.1f} {linear_us:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
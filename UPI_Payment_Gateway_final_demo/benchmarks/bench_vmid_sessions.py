@@ -0,0 +1,88 @@
+
+import sys
+import os
+import time
+import shutil
+import tempfile
+import argparse
+import threading
+from contextlib import redirect_stdout
+
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from upi_machine.lwc import get_merchant_from_mapping, save_merchant_mapping
+from upi_machine.vmid_sessions import VMIDSessionStore
+
+
+def run_terminals(terminals, operations, work):
+    
+    barrier = threading.Barrier(terminals + 1)
+    
+    def terminal(number):
+        barrier.wait()
+        for i in range(operations):
+            work(number, i)
+    
+    threads = [threading.Thread(target=terminal, args=(number,)) for number in range(terminals)]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    return terminals * operations / (time.perf_counter() - start)
+
+
+def session_work(store):
+    
+    def work(number, i):
+        timestamp = int(time.time())
+        nonce = store.issue(f"{number:08x}{i:08x}", timestamp)
+        store.resolve(timestamp, nonce)
+    return work
+
+
+def mapping_work(number, i):
+    
+    timestamp = int(time.time())
+    save_merchant_mapping(f"{number:08x}{i:08x}", timestamp)
+    get_merchant_from_mapping(timestamp)
+
+
+def main():
+    
+    parser = argparse.ArgumentParser(description="VMID issue+resolve throughput under concurrent terminals")
+    parser.add_argument("--terminals", type=int, nargs="+", default=[1, 16, 256])
+    parser.add_argument("--operations", type=int, default=2000, help="Issue+resolve pairs per terminal")
+    parser.add_argument("--mapping-operations", type=int, default=20)
+    args = parser.parse_args()
+    
+    temp_dir = tempfile.mkdtemp()
+    cwd = os.getcwd()
+    os.chdir(temp_dir)
+    try:
+        print(f"{'store':<28} " + " ".join(f"{f'{terminals} terminals':>14}" for terminals in args.terminals) + "   (ops/s)")
+        cases = [
+            ("sessions, 1 shard", lambda: session_work(VMIDSessionStore(shards=1)), args.operations),
+            ("sessions, 64 shards", lambda: session_work(VMIDSessionStore(shards=64)), args.operations),
+            ("sessions, 64 + journal", lambda: session_work(VMIDSessionStore(shards=64, journal_path="sessions.log")), args.operations),
+            ("merchant_mappings.json", lambda: mapping_work, args.mapping_operations),
+        ]
+        for name, make, operations in cases:
+            rates = []
+            for terminals in args.terminals:
+                for path in ("sessions.log", "merchant_mappings.json"):
+                    if os.path.exists(path):
+                        os.remove(path)
+                # The legacy mapping file prints a line for every torn read.
+                with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+                    rates.append(run_terminals(terminals, operations, make()))
+            print(f"{name:<28} " + " ".join(f"{rate:>14,.0f}" for rate in rates))
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
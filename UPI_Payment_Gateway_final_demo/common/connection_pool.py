@@ -0,0 +1,187 @@
+
+import socket
+import select
+import threading
+import time
+from collections import deque
+from typing import Dict, Tuple, Optional, Deque, Iterable
+
+from common.network_protocol import (
+    Message, JSON_CODEC, DEFAULT_CODEC_PREFERENCE,
+    open_connection, read_message, write_message
+)
+
+Destination = Tuple[str, int]
+
+class ConnectionPool:
+    
+    def __init__(self,
+                 max_per_destination: int = 4,
+                 idle_timeout: float = 30.0,
+                 connect_timeout: float = 5.0,
+                 acquire_timeout: float = 10.0,
+                 codecs: Optional[Iterable[str]] = DEFAULT_CODEC_PREFERENCE):
+        self.max_per_destination = max_per_destination
+        self.idle_timeout = idle_timeout
+        self.connect_timeout = connect_timeout
+        self.acquire_timeout = acquire_timeout
+        self.codecs = tuple(codecs) if codecs else None
+        
+        self._idle: Dict[Destination, Deque[Tuple[socket.socket, float]]] = {}
+        self._open: Dict[Destination, int] = {}
+        self._codecs: Dict[socket.socket, object] = {}
+        self._condition = threading.Condition()
+        self._closed = False
+        self.stats = {"created": 0, "reused": 0, "evicted": 0, "discarded": 0}
+    
+    def acquire(self, host: str, port: int) -> Tuple[socket.socket, bool]:
+        
+        destination = (host, port)
+        deadline = time.monotonic() + self.acquire_timeout
+        
+        with self._condition:
+            while True:
+                if self._closed:
+                    raise RuntimeError("Connection pool is closed")
+                
+                self._evict_idle_locked(destination)
+                idle = self._idle.get(destination)
+                while idle:
+                    sock, _ = idle.pop()
+                    if self._is_healthy(sock):
+                        self.stats["reused"] += 1
+                        return sock, True
+                    self._discard_locked(destination, sock)
+                
+                if self._open.get(destination, 0) < self.max_per_destination:
+                    self._open[destination] = self._open.get(destination, 0) + 1
+                    break
+                
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError(f"No free connection to {host}:{port} within {self.acquire_timeout}s")
+                self._condition.wait(remaining)
+        
+        try:
+            sock, codec = open_connection(host, port, self.codecs, self.connect_timeout)
+        except Exception:
+            with self._condition:
+                self._open[destination] -= 1
+                self._condition.notify()
+            raise
+        
+        with self._condition:
+            self._codecs[sock] = codec
+            self.stats["created"] += 1
+        return sock, False
+    
+    def codec_for(self, sock: socket.socket):
+        
+        with self._condition:
+            return self._codecs.get(sock, JSON_CODEC)
+    
+    def release(self, host: str, port: int, sock: socket.socket, reuse: bool = True) -> None:
+        
+        destination = (host, port)
+        with self._condition:
+            if reuse and not self._closed:
+                self._idle.setdefault(destination, deque()).append((sock, time.monotonic()))
+            else:
+                self._discard_locked(destination, sock)
+            self._condition.notify()
+    
+    def request(self, host: str, port: int, message: Message) -> Optional[Message]:
+        
+        for attempt in range(2):
+            sock, reused = self.acquire(host, port)
+            try:
+                write_message(sock, message, self.codec_for(sock))
+            except ConnectionError:
+                self.release(host, port, sock, reuse=False)
+                
+                # A pooled socket can be closed by the peer between the health
+                # check and the write; the request never left, so a single
+                # retry on a fresh connection is safe.
+                if reused and attempt == 0:
+                    continue
+                raise
+            except Exception:
+                self.release(host, port, sock, reuse=False)
+                raise
+            
+            # Once the request is written the server may already have acted on
+            # it, so a lost response is never resent: a second
+            # PROCESS_TRANSACTION would debit the payer twice.
+            try:
+                response = read_message(sock)
+            except Exception:
+                self.release(host, port, sock, reuse=False)
+                raise
+            
+            if response is None:
+                self.release(host, port, sock, reuse=False)
+                return None
+            
+            self.release(host, port, sock)
+            return response
+        return None
+    
+    def evict_idle(self) -> int:
+        
+        with self._condition:
+            evicted = 0
+            for destination in list(self._idle):
+                evicted += self._evict_idle_locked(destination)
+            self._condition.notify_all()
+            return evicted
+    
+    def close(self) -> None:
+        
+        with self._condition:
+            self._closed = True
+            for destination, idle in self._idle.items():
+                while idle:
+                    sock, _ = idle.pop()
+                    self._discard_locked(destination, sock)
+            self._idle.clear()
+            self._condition.notify_all()
+    
+    def _evict_idle_locked(self, destination: Destination) -> int:
+        
+        idle = self._idle.get(destination)
+        if not idle:
+            return 0
+        
+        cutoff = time.monotonic() - self.idle_timeout
+        evicted = 0
+        while idle and idle[0][1] <= cutoff:
+            sock, _ = idle.popleft()
+            self._discard_locked(destination, sock)
+            evicted += 1
+        self.stats["evicted"] += evicted
+        return evicted
+    
+    def _discard_locked(self, destination: Destination, sock: socket.socket) -> None:
+        
+        try:
+            sock.close()
+        except OSError:
+            pass
+        self._codecs.pop(sock, None)
+        self._open[destination] = max(0, self._open.get(destination, 0) - 1)
+        self.stats["discarded"] += 1
+    
+    @staticmethod
+    def _is_healthy(sock: socket.socket) -> bool:
+        
+        try:
+            readable, _, errored = select.select([sock], [], [sock], 0)
+            if errored:
+                return False
+            if readable:
+                # An idle keep-alive socket must have nothing to read: either the
+                # peer closed it or it holds a stray response.
+                return False
+            return True
+        except (OSError, ValueError):
+            return False
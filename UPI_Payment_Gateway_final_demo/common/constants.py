@@ -23,7 +23,63 @@ NETWORK = {
     "USER_DEVICE_HOST": "127.0.0.1",
     "USER_DEVICE_PORT": 5002,
     "BANK_SERVER_HOST": "127.0.0.1",
-    "BANK_SERVER_PORT": 5003
+    "BANK_SERVER_PORT": 5003,
+    "BANK_SERVER_BACKLOG": 128,
+    "BANK_SERVER_MODE": "threaded"
+}
+
+
+LEDGER = {
+    "LOG_FILE": "ledger.log",
+    "FSYNC_POLICY": "group",
+    "FSYNC_INTERVAL": 0.05,
+    "GROUP_COMMIT_MAX_BATCH": 256,
+    "GROUP_COMMIT_MAX_WAIT": 0.0,
+    "CHECKPOINT_RECORDS": 10000,
+    "LOCK_STRIPES": 64
+}
+
+
+STORAGE = {
+    "BACKEND": "json",
+    "SQLITE_FILE": "bank.db"
+}
+
+
+VMID = {
+    "KEY_FILE": "vmid.key",
+    "VERSION": 2,
+    "TAG_BYTES": 8,
+    "SESSION_TTL": 300,
+    "SESSION_SHARDS": 64,
+    "SESSION_WHEEL_TICK": 1.0,
+    "SESSION_JOURNAL": None,
+    "SESSION_JOURNAL_COMPACT_RECORDS": 10000
+}
+
+
+MERCHANT_CACHE = {
+    "TTL": 300.0,
+    "NEGATIVE_TTL": 5.0,
+    "PUSH_UPDATES": True
+}
+
+
+BLOCKCHAIN = {
+    "DATA_DIR": "blockchain_data",
+    "SEGMENT_MAX_BYTES": 4 * 1024 * 1024,
+    "SEGMENT_FORMAT": "binary",
+    "FSYNC": False,
+    "HISTORY_PAGE_SIZE": 50,
+    "VERIFY_WORKERS": 4,
+    "BATCH_MAX_TRANSACTIONS": 256,
+    "BATCH_MAX_AGE": 1.0,
+    "ARCHIVE_KEEP_SEGMENTS": 2,
+    "ARCHIVE_CHUNK_BYTES": 64 * 1024,
+    "ARCHIVE_COMPRESSION_LEVEL": 6,
+    "ARCHIVE_KEY_FILE": "archive.key",
+    "TIME_INDEX_STRIDE": 64,
+    "SHOW_PAGE_SIZE": 10
 }
 
 
@@ -0,0 +1,199 @@
+
+import heapq
+import socket
+import threading
+import time
+import uuid
+from concurrent.futures import Future, CancelledError, InvalidStateError
+from typing import Dict, List, Optional, Tuple, Iterable
+
+from common.network_protocol import (
+    Message, FramingError, CodecError, JSON_CODEC, DEFAULT_CODEC_PREFERENCE,
+    open_connection, read_message, write_message
+)
+
+class RequestTimeout(Exception):
+    pass
+
+class MultiplexedClient:
+    
+    def __init__(self, host: str, port: int, default_timeout: float = 10.0, connect_timeout: float = 5.0,
+                 codecs: Optional[Iterable[str]] = DEFAULT_CODEC_PREFERENCE):
+        self.host = host
+        self.port = port
+        self.default_timeout = default_timeout
+        self.connect_timeout = connect_timeout
+        self.codecs = tuple(codecs) if codecs else None
+        self.codec = JSON_CODEC
+        
+        self._sock: Optional[socket.socket] = None
+        self._reader: Optional[threading.Thread] = None
+        self._pending: Dict[str, Future] = {}
+        self._deadlines: List[Tuple[float, str]] = []
+        self._lock = threading.Lock()
+        self._send_lock = threading.Lock()
+        self._connect_lock = threading.Lock()
+        self._deadline_ready = threading.Condition(self._lock)
+        self._closed = False
+        
+        self._sweeper = threading.Thread(target=self._expire_requests, daemon=True)
+        self._sweeper.start()
+    
+    def submit(self, message: Message, timeout: Optional[float] = None) -> Future:
+        
+        if message.message_id is None:
+            message.message_id = str(uuid.uuid4())
+        message_id = message.message_id
+        timeout = self.default_timeout if timeout is None else timeout
+        
+        future: Future = Future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Multiplexed client is closed")
+            if message_id in self._pending:
+                raise ValueError(f"Request {message_id} is already in flight")
+            self._pending[message_id] = future
+            if timeout is not None:
+                heapq.heappush(self._deadlines, (time.monotonic() + timeout, message_id))
+                self._deadline_ready.notify()
+        future.add_done_callback(lambda _: self._forget(message_id, future))
+        
+        sock = None
+        try:
+            sock = self._connection()
+            with self._send_lock:
+                write_message(sock, message, self.codec)
+        except Exception as e:
+            error = ConnectionError(f"Could not send request {message_id}: {e}")
+            self._fail(message_id, error)
+            self._reset(sock, error)
+        
+        return future
+    
+    def request(self, message: Message, timeout: Optional[float] = None) -> Message:
+        
+        future = self.submit(message, timeout)
+        try:
+            return future.result()
+        except CancelledError:
+            raise RequestTimeout(f"Request {message.message_id} was cancelled")
+    
+    def cancel(self, message_id: str) -> bool:
+        
+        with self._lock:
+            future = self._pending.get(message_id)
+        return future.cancel() if future else False
+    
+    def in_flight(self) -> int:
+        
+        with self._lock:
+            return len(self._pending)
+    
+    def close(self) -> None:
+        
+        with self._lock:
+            self._closed = True
+            self._deadline_ready.notify()
+        self._reset(self._sock, ConnectionError("Multiplexed client closed"))
+    
+    def _connection(self) -> socket.socket:
+        
+        with self._connect_lock:
+            if self._sock is not None:
+                return self._sock
+            sock, self.codec = open_connection(self.host, self.port, self.codecs, self.connect_timeout)
+            with self._lock:
+                self._sock = sock
+            self._reader = threading.Thread(target=self._read_responses, args=(sock,), daemon=True)
+            self._reader.start()
+            return sock
+    
+    def _read_responses(self, sock: socket.socket) -> None:
+        
+        error: Exception = ConnectionError("Connection closed by server")
+        try:
+            while True:
+                response = read_message(sock)
+                if response is None:
+                    break
+                
+                with self._lock:
+                    future = self._pending.get(response.message_id)
+                if future is None:
+                    # Late reply to a request that already timed out or was cancelled.
+                    continue
+                self._settle(future, result=response)
+        except (OSError, FramingError, CodecError, ValueError) as e:
+            error = ConnectionError(f"Connection lost: {e}")
+        self._reset(sock, error)
+    
+    def _expire_requests(self) -> None:
+        
+        while True:
+            expired = []
+            with self._lock:
+                while not self._closed and not expired:
+                    if not self._deadlines:
+                        self._deadline_ready.wait()
+                        continue
+                    
+                    deadline, message_id = self._deadlines[0]
+                    remaining = deadline - time.monotonic()
+                    if remaining > 0:
+                        self._deadline_ready.wait(remaining)
+                        continue
+                    
+                    while self._deadlines and self._deadlines[0][0] <= time.monotonic():
+                        _, message_id = heapq.heappop(self._deadlines)
+                        future = self._pending.pop(message_id, None)
+                        if future is not None:
+                            expired.append((message_id, future))
+                closed = self._closed
+            
+            for message_id, future in expired:
+                self._settle(future, error=RequestTimeout(f"Request {message_id} timed out"))
+            if closed:
+                return
+    
+    def _forget(self, message_id: str, future: Future) -> None:
+        
+        with self._lock:
+            if self._pending.get(message_id) is future:
+                del self._pending[message_id]
+    
+    def _fail(self, message_id: str, error: Exception) -> None:
+        
+        with self._lock:
+            future = self._pending.pop(message_id, None)
+        if future is not None:
+            self._settle(future, error=error)
+    
+    def _reset(self, sock: Optional[socket.socket], error: Optional[Exception] = None) -> None:
+        
+        with self._lock:
+            if sock is None or self._sock is not sock:
+                return
+            self._sock = None
+            pending = list(self._pending.items())
+            self._pending.clear()
+        
+        try:
+            sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        sock.close()
+        
+        error = error or ConnectionError("Connection reset")
+        for _, future in pending:
+            self._settle(future, error=error)
+    
+    @staticmethod
+    def _settle(future: Future, result: Optional[Message] = None, error: Optional[Exception] = None) -> None:
+        
+        try:
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+        except InvalidStateError:
+            pass
@@ -1,7 +1,21 @@
 
 import json
 import base64
-from typing import Dict, Any, Union, Optional
+import asyncio
+import socket
+import struct
+from typing import Dict, Any, Union, Optional, Iterable, Tuple
+
+
+FRAME_HEADER = struct.Struct(">I")
+MAX_FRAME_SIZE = 16 * 1024 * 1024
+
+
+class FramingError(Exception):
+    pass
+
+class CodecError(Exception):
+    pass
 
 class Message:
     
@@ -48,3 +62,351 @@ class Message:
             data=message_dict["data"],
             message_id=message_dict["message_id"]
         )
+    
+    def to_bytes(self) -> bytes:
+        
+        return self.to_json().encode('utf-8')
+    
+    @classmethod
+    def from_bytes(cls, payload: Union[bytes, bytearray, memoryview]) -> 'Message':
+        
+        return decode_message(payload)
+
+
+class JsonCodec:
+    
+    name = "json"
+    
+    def encode(self, message: Message) -> bytes:
+        
+        return message.to_json().encode('utf-8')
+    
+    def decode(self, payload: Union[bytes, bytearray, memoryview]) -> Message:
+        
+        if isinstance(payload, memoryview):
+            payload = payload.tobytes()
+        return Message.from_json(payload)
+
+
+_BINARY_MAGIC = 0xB1
+_TAG_NONE = 0
+_TAG_FALSE = 1
+_TAG_TRUE = 2
+_TAG_INT = 3
+_TAG_FLOAT = 4
+_TAG_STR = 5
+_TAG_BYTES = 6
+_TAG_LIST = 7
+_TAG_DICT = 8
+_FLOAT = struct.Struct(">d")
+
+
+def _write_varint(out: bytearray, value: int) -> None:
+    
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _read_varint(buffer: bytes, pos: int) -> Tuple[int, int]:
+    
+    byte = buffer[pos]
+    if byte < 0x80:
+        return byte, pos + 1
+    
+    result = byte & 0x7F
+    shift = 7
+    pos += 1
+    while True:
+        byte = buffer[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return result, pos
+        shift += 7
+
+
+def _encode_value(out: bytearray, value: Any) -> None:
+    
+    if value is None:
+        out.append(_TAG_NONE)
+    elif value is True:
+        out.append(_TAG_TRUE)
+    elif value is False:
+        out.append(_TAG_FALSE)
+    elif isinstance(value, str):
+        encoded = value.encode('utf-8')
+        out.append(_TAG_STR)
+        _write_varint(out, len(encoded))
+        out += encoded
+    elif isinstance(value, int):
+        out.append(_TAG_INT)
+        _write_varint(out, value << 1 if value >= 0 else ((-value) << 1) - 1)
+    elif isinstance(value, float):
+        out.append(_TAG_FLOAT)
+        out += _FLOAT.pack(value)
+    elif isinstance(value, (bytes, bytearray, memoryview)):
+        out.append(_TAG_BYTES)
+        _write_varint(out, len(value))
+        out += value
+    elif isinstance(value, (list, tuple)):
+        out.append(_TAG_LIST)
+        _write_varint(out, len(value))
+        for item in value:
+            _encode_value(out, item)
+    elif isinstance(value, dict):
+        out.append(_TAG_DICT)
+        _write_varint(out, len(value))
+        for key, item in value.items():
+            encoded = str(key).encode('utf-8')
+            _write_varint(out, len(encoded))
+            out += encoded
+            _encode_value(out, item)
+    else:
+        raise CodecError(f"Cannot encode value of type {type(value).__name__}")
+
+
+def _decode_value(buffer: bytes, pos: int) -> Tuple[Any, int]:
+    
+    tag = buffer[pos]
+    pos += 1
+    if tag == _TAG_STR:
+        length, pos = _read_varint(buffer, pos)
+        end = pos + length
+        return buffer[pos:end].decode('utf-8'), end
+    if tag == _TAG_INT:
+        value, pos = _read_varint(buffer, pos)
+        return (value >> 1) if not value & 1 else -((value + 1) >> 1), pos
+    if tag == _TAG_FLOAT:
+        return _FLOAT.unpack_from(buffer, pos)[0], pos + _FLOAT.size
+    if tag == _TAG_NONE:
+        return None, pos
+    if tag == _TAG_TRUE:
+        return True, pos
+    if tag == _TAG_FALSE:
+        return False, pos
+    if tag == _TAG_BYTES:
+        length, pos = _read_varint(buffer, pos)
+        end = pos + length
+        return buffer[pos:end], end
+    if tag == _TAG_LIST:
+        count, pos = _read_varint(buffer, pos)
+        items = []
+        for _ in range(count):
+            item, pos = _decode_value(buffer, pos)
+            items.append(item)
+        return items, pos
+    if tag == _TAG_DICT:
+        count, pos = _read_varint(buffer, pos)
+        items = {}
+        for _ in range(count):
+            length, pos = _read_varint(buffer, pos)
+            end = pos + length
+            items[buffer[pos:end].decode('utf-8')], pos = _decode_value(buffer, end)
+        return items, pos
+    raise CodecError(f"Unknown value tag {tag}")
+
+
+class BinaryCodec:
+    
+    name = "binary"
+    
+    def encode(self, message: Message) -> bytes:
+        
+        out = bytearray((_BINARY_MAGIC,))
+        _encode_value(out, message.message_type)
+        _encode_value(out, message.sender)
+        _encode_value(out, message.receiver)
+        _encode_value(out, message.message_id)
+        _encode_value(out, message.data)
+        return bytes(out)
+    
+    def decode(self, payload: Union[bytes, bytearray, memoryview]) -> Message:
+        
+        buffer = bytes(payload)
+        if not buffer or buffer[0] != _BINARY_MAGIC:
+            raise CodecError("Payload is not a binary encoded message")
+        try:
+            message_type, pos = _decode_value(buffer, 1)
+            sender, pos = _decode_value(buffer, pos)
+            receiver, pos = _decode_value(buffer, pos)
+            message_id, pos = _decode_value(buffer, pos)
+            data, pos = _decode_value(buffer, pos)
+        except (IndexError, struct.error, UnicodeDecodeError) as e:
+            raise CodecError(f"Truncated or corrupt binary message: {e}")
+        if pos != len(buffer):
+            raise CodecError(f"{len(buffer) - pos} trailing bytes after binary message")
+        return Message(message_type, sender, receiver, data, message_id)
+
+
+JSON_CODEC = JsonCodec()
+BINARY_CODEC = BinaryCodec()
+CODECS = {codec.name: codec for codec in (BINARY_CODEC, JSON_CODEC)}
+DEFAULT_CODEC_PREFERENCE = ("binary", "json")
+CODEC_NEGOTIATION = "CODEC_NEGOTIATION"
+
+
+def decode_message(payload: Union[bytes, bytearray, memoryview]) -> Message:
+    
+    if len(payload) and payload[0] == _BINARY_MAGIC:
+        return BINARY_CODEC.decode(payload)
+    return JSON_CODEC.decode(payload)
+
+
+def select_codec(offered: Iterable[str]):
+    
+    for name in offered:
+        if name in CODECS:
+            return CODECS[name]
+    return JSON_CODEC
+
+
+def negotiation_response(message: Message):
+    
+    codec = select_codec(message.data.get("codecs", []))
+    response = Message(
+        message_type=f"{CODEC_NEGOTIATION}_RESPONSE",
+        sender=message.receiver,
+        receiver=message.sender,
+        data={"codec": codec.name},
+        message_id=message.message_id
+    )
+    return response, codec
+
+
+def _recv_exactly(sock: socket.socket, size: int) -> Optional[bytearray]:
+    
+    buffer = bytearray(size)
+    view = memoryview(buffer)
+    received = 0
+    while received < size:
+        count = sock.recv_into(view[received:], size - received)
+        if count == 0:
+            if received == 0:
+                return None
+            raise FramingError(f"Connection closed after {received} of {size} bytes")
+        received += count
+    return buffer
+
+
+def encode_frame(payload: bytes) -> bytes:
+    
+    if len(payload) > MAX_FRAME_SIZE:
+        raise FramingError(f"Frame of {len(payload)} bytes exceeds limit of {MAX_FRAME_SIZE}")
+    return FRAME_HEADER.pack(len(payload)) + payload
+
+
+def send_frame(sock: socket.socket, payload: bytes) -> None:
+    
+    sock.sendall(encode_frame(payload))
+
+
+def recv_frame(sock: socket.socket) -> Optional[bytearray]:
+    
+    header = _recv_exactly(sock, FRAME_HEADER.size)
+    if header is None:
+        return None
+    
+    (length,) = FRAME_HEADER.unpack(header)
+    if length > MAX_FRAME_SIZE:
+        raise FramingError(f"Frame of {length} bytes exceeds limit of {MAX_FRAME_SIZE}")
+    if length == 0:
+        return bytearray()
+    
+    payload = _recv_exactly(sock, length)
+    if payload is None:
+        raise FramingError("Connection closed before frame payload")
+    return payload
+
+
+def write_message(sock: socket.socket, message: Message, codec=JSON_CODEC) -> None:
+    
+    send_frame(sock, codec.encode(message))
+
+
+def read_message(sock: socket.socket) -> Optional[Message]:
+    
+    payload = recv_frame(sock)
+    if payload is None:
+        return None
+    return Message.from_bytes(payload)
+
+
+async def read_frame_async(reader: asyncio.StreamReader) -> Optional[bytes]:
+    
+    try:
+        header = await reader.readexactly(FRAME_HEADER.size)
+    except asyncio.IncompleteReadError as e:
+        if not e.partial:
+            return None
+        raise FramingError("Connection closed inside frame header")
+    
+    (length,) = FRAME_HEADER.unpack(header)
+    if length > MAX_FRAME_SIZE:
+        raise FramingError(f"Frame of {length} bytes exceeds limit of {MAX_FRAME_SIZE}")
+    
+    try:
+        return await reader.readexactly(length)
+    except asyncio.IncompleteReadError as e:
+        raise FramingError(f"Connection closed after {len(e.partial)} of {length} bytes")
+
+
+async def read_message_async(reader: asyncio.StreamReader) -> Optional[Message]:
+    
+    payload = await read_frame_async(reader)
+    if payload is None:
+        return None
+    return Message.from_bytes(payload)
+
+
+async def write_message_async(writer: asyncio.StreamWriter, message: Message, codec=JSON_CODEC) -> None:
+    
+    writer.write(encode_frame(codec.encode(message)))
+    await writer.drain()
+
+
+def negotiate_codec(sock: socket.socket,
+                    codecs: Iterable[str] = DEFAULT_CODEC_PREFERENCE,
+                    timeout: Optional[float] = 2.0):
+    
+    request = Message(
+        message_type=CODEC_NEGOTIATION,
+        sender="CLIENT",
+        receiver="SERVER",
+        data={"codecs": list(codecs)},
+        message_id="codec-negotiation"
+    )
+    previous_timeout = sock.gettimeout()
+    sock.settimeout(timeout)
+    try:
+        write_message(sock, request, JSON_CODEC)
+        response = read_message(sock)
+    finally:
+        sock.settimeout(previous_timeout)
+    
+    if response is None:
+        raise ConnectionError("Connection closed during codec negotiation")
+    return CODECS.get(response.data.get("codec"), JSON_CODEC)
+
+
+def open_connection(host: str, port: int,
+                    codecs: Optional[Iterable[str]] = DEFAULT_CODEC_PREFERENCE,
+                    connect_timeout: float = 5.0,
+                    negotiation_timeout: float = 2.0):
+    
+    sock = socket.create_connection((host, port), timeout=connect_timeout)
+    sock.settimeout(None)
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    if not codecs or list(codecs) == [JSON_CODEC.name]:
+        return sock, JSON_CODEC
+    
+    try:
+        return sock, negotiate_codec(sock, codecs, negotiation_timeout)
+    except socket.timeout:
+        # Peers without negotiation support never answer; fall back to plain JSON.
+        sock.close()
+        sock = socket.create_connection((host, port), timeout=connect_timeout)
+        sock.settimeout(None)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        return sock, JSON_CODEC
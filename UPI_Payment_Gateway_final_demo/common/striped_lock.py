@@ -0,0 +1,51 @@
+
+import threading
+from contextlib import contextmanager
+from typing import Hashable, Iterator, List
+
+class StripedLock:
+    
+    def __init__(self, stripes: int = 64):
+        if stripes < 1:
+            raise ValueError("StripedLock needs at least one stripe")
+        self._locks: List[threading.Lock] = [threading.Lock() for _ in range(stripes)]
+    
+    @property
+    def stripes(self) -> int:
+        
+        return len(self._locks)
+    
+    def stripe_for(self, key: Hashable) -> int:
+        
+        return hash(key) % len(self._locks)
+    
+    @contextmanager
+    def acquire(self, *keys: Hashable) -> Iterator[None]:
+        
+        # Stripes are always taken in ascending index order, so two callers
+        # locking the same pair from opposite ends cannot deadlock.
+        indices = sorted({self.stripe_for(key) for key in keys})
+        for index in indices:
+            self._locks[index].acquire()
+        try:
+            yield
+        finally:
+            for index in reversed(indices):
+                self._locks[index].release()
+    
+    @contextmanager
+    def acquire_stripe(self, index: int) -> Iterator[None]:
+        
+        with self._locks[index]:
+            yield
+    
+    @contextmanager
+    def acquire_all(self) -> Iterator[None]:
+        
+        for lock in self._locks:
+            lock.acquire()
+        try:
+            yield
+        finally:
+            for lock in reversed(self._locks):
+                lock.release()
@@ -1,5 +1,7 @@
 import sys
 import os
+import shutil
+import tempfile
 import unittest
 
 
@@ -132,5 +134,78 @@ class TestBankManager(unittest.TestCase):
         self.assertEqual(transaction.receiver_id, receiver_id)
         self.assertEqual(transaction.amount, transaction_amount)
 
+class TestTransactionBatch(unittest.TestCase):
+    
+    def setUp(self):
+        
+        self.original_cwd = os.getcwd()
+        self.temp_dir = tempfile.mkdtemp()
+        os.chdir(self.temp_dir)
+        
+        self.bank_manager = BankManager()
+        self.bank_manager.initialize()
+        
+        _, self.sender_id = self.bank_manager.register_user(
+            name="Batch Sender",
+            bank_code="SBIN0000001",
+            mobile_number="9000000001",
+            password="sender",
+            pin="1111",
+            initial_balance=500.0
+        )
+        _, self.merchant_id = self.bank_manager.register_merchant(
+            name="Batch Merchant",
+            bank_code="HDFC0000001",
+            password="merchant"
+        )
+    
+    def tearDown(self):
+        
+        os.chdir(self.original_cwd)
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+    
+    def test_batch_applies_transfers_in_order(self):
+        
+        results = self.bank_manager.process_transaction_batch([
+            {"sender_id": self.sender_id, "receiver_id": self.merchant_id, "amount": 100.0},
+            {"sender_id": self.sender_id, "receiver_id": self.merchant_id, "amount": 150.0},
+        ])
+        
+        self.assertEqual(len(results), 2)
+        self.assertTrue(all(success for success, _ in results))
+        self.assertNotEqual(results[0][1], results[1][1])
+        self.assertEqual(self.bank_manager.users[self.sender_id].balance, 250.0)
+        self.assertEqual(self.bank_manager.merchants[self.merchant_id].balance, 250.0)
+        
+        
+        sbi_chain = self.bank_manager.blockchains["State Bank of India"]
+        hdfc_chain = self.bank_manager.blockchains["HDFC Bank"]
+        self.bank_manager.seal_blockchains()
+        self.assertEqual([entry["transaction_id"] for entry in sbi_chain.get_latest_block().entries()],
+                         [results[0][1], results[1][1]])
+        self.assertEqual(hdfc_chain.get_latest_block().entries(), sbi_chain.get_latest_block().entries())
+        self.assertTrue(sbi_chain.is_chain_valid())
+    
+    def test_batch_rejects_items_against_running_balance(self):
+        
+        results = self.bank_manager.process_transaction_batch([
+            {"sender_id": self.sender_id, "receiver_id": self.merchant_id, "amount": 400.0},
+            {"sender_id": self.sender_id, "receiver_id": self.merchant_id, "amount": 200.0},
+            {"sender_id": "unknown", "receiver_id": self.merchant_id, "amount": 1.0},
+            {"sender_id": self.sender_id, "receiver_id": self.merchant_id, "amount": -5.0},
+            {"sender_id": self.sender_id, "receiver_id": self.merchant_id, "amount": 100.0},
+        ])
+        
+        self.assertEqual([success for success, _ in results], [True, False, False, False, True])
+        self.assertEqual(results[1][1], "Insufficient balance")
+        self.assertEqual(results[2][1], "Sender not found")
+        self.assertEqual(results[3][1], "Invalid amount")
+        self.assertEqual(self.bank_manager.users[self.sender_id].balance, 0.0)
+        self.assertEqual(self.bank_manager.merchants[self.merchant_id].balance, 500.0)
+    
+    def test_empty_batch(self):
+        
+        self.assertEqual(self.bank_manager.process_transaction_batch([]), [])
+
 if __name__ == "__main__":
     unittest.main()
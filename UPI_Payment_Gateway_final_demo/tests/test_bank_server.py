@@ -9,7 +9,7 @@ import socket
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from bank_server.main import BankServer
-from common.network_protocol import Message
+from common.network_protocol import Message, read_message, write_message
 from common.constants import NETWORK
 
 class TestBankServer(unittest.TestCase):
@@ -69,16 +69,13 @@ class TestBankServer(unittest.TestCase):
         
         client_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         client_socket.connect((NETWORK["BANK_SERVER_HOST"], NETWORK["BANK_SERVER_PORT"]))
-        client_socket.sendall(registration_message.to_json().encode())
+        write_message(client_socket, registration_message)
         
         
-        response_data = client_socket.recv(4096)
+        response = read_message(client_socket)
         client_socket.close()
         
         
-        response = Message.from_json(response_data.decode())
-        
-        
         self.assertEqual(response.message_type, "REGISTER_USER_RESPONSE")
         self.assertEqual(response.sender, "BANK_SERVER")
         self.assertEqual(response.receiver, "TEST_CLIENT")
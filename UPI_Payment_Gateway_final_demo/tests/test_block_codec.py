@@ -0,0 +1,138 @@
+
+import sys
+import os
+import hashlib
+import shutil
+import tempfile
+import unittest
+
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bank_server.block_codec import BlockView, HEADER, KIND_BATCH, KIND_JSON, KIND_PAYMENT, PAYMENT, decode_record, encode_record
+from bank_server.block_store import BlockStore
+from bank_server.blockchain import Block, Blockchain
+
+def transaction_id(i):
+    
+    return hashlib.sha256(f"tx{i}".encode()).hexdigest()
+
+def payment(i, description="Payment via UPI"):
+    
+    return {
+        "transaction_id": transaction_id(i),
+        "sender_id": f"{i:016x}",
+        "receiver_id": "d1df7809f269d037",
+        "amount": 10.25 + i,
+        "description": description,
+        "timestamp": 1700000000.5 + i
+    }
+
+class TestBlockCodec(unittest.TestCase):
+    
+    def test_payment_block_packs_to_fixed_layout(self):
+        
+        block = Block(transaction_id(1), payment(1), "ab" * 32, 1700000001.25)
+        record = block.to_dict()
+        encoded = encode_record(record)
+        
+        self.assertEqual(encoded[0], KIND_PAYMENT)
+        self.assertLess(len(encoded), HEADER.size + PAYMENT.size + 32)
+        self.assertEqual(decode_record(encoded), record)
+        self.assertEqual(Block.from_dict(decode_record(encoded)).compute_hash(), block.hash)
+    
+    def test_batch_block_round_trips(self):
+        
+        entries = [{"transaction_id": transaction_id(i), "transaction_data": payment(i, f"note {i % 3}")} for i in range(20)]
+        root = "cd" * 32
+        record = Block(root, {"merkle_root": root, "transactions": entries}, "ab" * 32, 1700000001.25).to_dict()
+        encoded = encode_record(record)
+        
+        self.assertEqual(encoded[0], KIND_BATCH)
+        self.assertEqual(decode_record(encoded), record)
+    
+    def test_unpackable_blocks_fall_back_to_json(self):
+        
+        cases = [
+            dict(payment(1), amount=10),
+            dict(payment(1), amount=0.1 + 0.2),
+            dict(payment(1), sender_id="USER1"),
+            dict(payment(1), note="extra field")
+        ]
+        for transaction_data in cases:
+            record = Block(transaction_id(1), transaction_data, "ab" * 32, 1700000001.25).to_dict()
+            encoded = encode_record(record)
+            self.assertEqual(encoded[0], KIND_JSON)
+            self.assertEqual(decode_record(encoded), record)
+        
+        genesis = Block("0", {"message": "Genesis Block"}, "0", 1700000000.0).to_dict()
+        self.assertEqual(decode_record(encode_record(genesis)), genesis)
+    
+    def test_view_reads_one_payment_in_place(self):
+        
+        entries = [{"transaction_id": transaction_id(i), "transaction_data": payment(i)} for i in range(8)]
+        root = "cd" * 32
+        view = BlockView(encode_record(Block(root, {"merkle_root": root, "transactions": entries}, "ab" * 32, 1.5).to_dict()))
+        
+        self.assertEqual(len(view), 8)
+        self.assertEqual(view.transaction_id, root)
+        self.assertEqual(view.timestamp, 1.5)
+        self.assertEqual(view.find(transaction_id(5)), 5)
+        self.assertIsNone(view.find(transaction_id(9)))
+        self.assertEqual(view.amount_paise(5), 1525)
+        self.assertEqual(view.entry(5), entries[5])
+
+class TestBinarySegments(unittest.TestCase):
+    
+    def setUp(self):
+        
+        self.temp_dir = tempfile.mkdtemp()
+        self.directory = os.path.join(self.temp_dir, "chain")
+    
+    def tearDown(self):
+        
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+    
+    def _fill(self, blockchain, batches, first_batch=0):
+        
+        for batch in range(first_batch, first_batch + batches):
+            blockchain.add_transactions([(transaction_id(i), payment(i)) for i in range(batch * 10, batch * 10 + 10)])
+            blockchain.seal()
+    
+    def test_chain_survives_reopen_across_segments(self):
+        
+        blockchain = Blockchain(BlockStore(self.directory, segment_max_bytes=2048))
+        self._fill(blockchain, 6)
+        blockchain.close()
+        
+        reopened = Blockchain(BlockStore(self.directory, segment_max_bytes=2048))
+        self.assertGreater(len(reopened.store.segments), 2)
+        self.assertTrue(reopened.verify(since_checkpoint=False))
+        self.assertEqual(reopened.find_transaction(transaction_id(17)), payment(17))
+        self.assertEqual(len(reopened.account_history(f"{17:016x}", 10)), 1)
+    
+    def test_existing_json_segments_keep_their_format(self):
+        
+        blockchain = Blockchain(BlockStore(self.directory, segment_format="json"))
+        self._fill(blockchain, 2)
+        blockchain.close()
+        
+        reopened = Blockchain.open(self.directory)
+        self.assertEqual(reopened.store.format.name, "json")
+        self._fill(reopened, 1, first_batch=2)
+        self.assertTrue(reopened.verify(since_checkpoint=False))
+        self.assertEqual(reopened.find_transaction(transaction_id(25)), payment(25))
+    
+    def test_binary_segments_are_smaller(self):
+        
+        sizes = {}
+        for segment_format in ("json", "binary"):
+            directory = os.path.join(self.temp_dir, segment_format)
+            blockchain = Blockchain(BlockStore(directory, segment_format=segment_format))
+            self._fill(blockchain, 5)
+            sizes[segment_format] = blockchain.store.segments[-1]["bytes"]
+            blockchain.close()
+        self.assertLess(sizes["binary"] * 2, sizes["json"])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,330 @@
+import sys
+import os
+import json
+import shutil
+import tempfile
+import unittest
+
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bank_server.block_store import BlockStore, INDEX_FILE, OFFSETS_SUFFIX
+from bank_server.blockchain import Blockchain
+from bank_server.transaction_index import INDEX_FILE as TXID_INDEX_FILE, LOG_FILE as TXID_LOG_FILE, TransactionIndex
+from bank_server.bank_manager import BankManager
+
+class TestBlockStore(unittest.TestCase):
+    
+    def setUp(self):
+        
+        self.temp_dir = tempfile.mkdtemp()
+        self.directory = os.path.join(self.temp_dir, "chain")
+    
+    def tearDown(self):
+        
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+    
+    def test_append_and_stream_back(self):
+        
+        store = BlockStore(self.directory)
+        locations = store.append([{"n": i} for i in range(10)])
+        store.close()
+        
+        store = BlockStore(self.directory)
+        self.assertEqual(store.block_count, 10)
+        self.assertEqual([record["n"] for record in store.iter_records()], list(range(10)))
+        self.assertEqual([record["n"] for record in store.iter_records(start_block=7)], [7, 8, 9])
+        self.assertEqual(store.read_at(locations[4]), {"n": 4})
+    
+    def test_segments_roll_over(self):
+        
+        store = BlockStore(self.directory, segment_max_bytes=64)
+        locations = store.append([{"n": i, "pad": "x" * 20} for i in range(10)])
+        for i in range(10, 20):
+            locations += store.append([{"n": i, "pad": "x" * 20}])
+        
+        self.assertGreater(len(store.segments), 1)
+        self.assertEqual(store.read_at(locations[15])["n"], 15)
+        self.assertEqual([record["n"] for record in store.iter_records(start_block=12)], list(range(12, 20)))
+        
+        with open(os.path.join(self.directory, INDEX_FILE)) as f:
+            sealed = json.load(f)["segments"][:-1]
+        self.assertEqual(sealed, store.segments[:-1])
+    
+    def test_archiving_does_not_break_readers_of_the_segment(self):
+        
+        store = BlockStore(self.directory, segment_max_bytes=160)
+        for i in range(12):
+            store.append([{"n": i, "pad": "x" * 20}])
+        self.assertGreater(store.segments[0]["blocks"], 1)
+        
+        records = store.iter_records()
+        first = next(records)
+        store.mark_archived(0)
+        self.assertEqual([first["n"]] + [record["n"] for record in records], list(range(12)))
+        
+        position = store.segments[1]["first_block"]
+        view = store.view_at(store.location_of(position))
+        store.mark_archived(1)
+        self.assertEqual(view.to_dict()["n"], position)
+        view.buffer.release()
+        store.close()
+    
+    def test_torn_tail_is_dropped(self):
+        
+        store = BlockStore(self.directory)
+        store.append([{"n": 0}, {"n": 1}])
+        store.close()
+        with open(store.segment_path(0), "ab") as f:
+            f.write(b'{"n":')
+        
+        store = BlockStore(self.directory)
+        self.assertEqual(store.block_count, 2)
+        store.append([{"n": 2}])
+        self.assertEqual([record["n"] for record in store.iter_records()], [0, 1, 2])
+    
+    def test_missing_index_is_rebuilt(self):
+        
+        store = BlockStore(self.directory, segment_max_bytes=32)
+        store.append([{"n": i} for i in range(8)])
+        store.close()
+        os.remove(os.path.join(self.directory, INDEX_FILE))
+        
+        store = BlockStore(self.directory, segment_max_bytes=32)
+        self.assertEqual(store.block_count, 8)
+        self.assertEqual([record["n"] for record in store.iter_records()], list(range(8)))
+
+class TestBlockchainStorage(unittest.TestCase):
+    
+    def setUp(self):
+        
+        self.temp_dir = tempfile.mkdtemp()
+        self.original_dir = os.getcwd()
+        os.chdir(self.temp_dir)
+    
+    def tearDown(self):
+        
+        os.chdir(self.original_dir)
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+    
+    def test_blocks_persist_without_rewrite(self):
+        
+        blockchain = Blockchain.open("chain")
+        blockchain.add_block("tx1", {"amount": 1})
+        blockchain.add_blocks([("tx2", {"amount": 2}), ("tx3", {"amount": 3})])
+        blockchain.close()
+        
+        loaded = Blockchain.load_from_file("chain")
+        self.assertEqual([block.transaction_id for block in loaded.chain], ["0", "tx1", "tx2", "tx3"])
+        self.assertEqual(loaded.chain[0].timestamp, blockchain.chain[0].timestamp)
+        self.assertTrue(loaded.is_chain_valid())
+    
+    def test_legacy_file_is_migrated_once(self):
+        
+        legacy = Blockchain()
+        legacy.add_block("tx1", {"amount": 1})
+        legacy.save_to_file("legacy.json")
+        
+        blockchain = Blockchain.open("chain", ["missing.json", "legacy.json"])
+        self.assertEqual([block.transaction_id for block in blockchain.chain], ["0", "tx1"])
+        blockchain.add_block("tx2", {"amount": 2})
+        blockchain.close()
+        
+        reopened = Blockchain.open("chain", ["legacy.json"])
+        self.assertEqual([block.transaction_id for block in reopened.chain], ["0", "tx1", "tx2"])
+    
+    def test_bank_manager_appends_to_store(self):
+        
+        bank_manager = BankManager()
+        bank_manager.initialize()
+        success, uid = bank_manager.register_user("Store User", "SBIN0000001", "9999999999", "password", "1234", 100.0)
+        self.assertTrue(success)
+        success, mid = bank_manager.register_merchant("Store Merchant", "SBIN0000001", "password", 0.0)
+        self.assertTrue(success)
+        success, transaction_id = bank_manager.process_transaction(uid, mid, 10.0)
+        self.assertTrue(success)
+        self.assertEqual(bank_manager.get_transaction_from_blockchain(transaction_id)["amount"], 10.0)
+        bank_manager.close()
+        
+        self.assertFalse(os.path.exists("blockchain_State_Bank_of_India.json"))
+        loaded = Blockchain.load_from_file(os.path.join("blockchain_data", "blockchain_State_Bank_of_India"))
+        self.assertEqual([entry["transaction_id"] for entry in loaded.get_latest_block().entries()], [transaction_id])
+    
+    def test_chain_is_read_lazily(self):
+        
+        store = BlockStore("chain", segment_max_bytes=512)
+        blockchain = Blockchain(store)
+        blockchain.add_blocks([(f"tx{i}", {"n": i}) for i in range(40)])
+        blockchain.close()
+        
+        store = BlockStore("chain", segment_max_bytes=512)
+        self.assertGreater(len(store.segments), 2)
+        os.remove(store.segment_path(1, OFFSETS_SUFFIX))
+        reopened = Blockchain(store)
+        self.assertEqual(len(reopened.chain), 41)
+        self.assertEqual(reopened.chain[-1].transaction_id, "tx39")
+        self.assertEqual(reopened.chain[12].transaction_data, {"n": 11})
+        self.assertEqual([block.transaction_id for block in reopened.chain[1:4]], ["tx0", "tx1", "tx2"])
+        self.assertEqual([block.transaction_data for block in reopened.chain][1:], [{"n": i} for i in range(40)])
+        
+        reopened.add_block("tx40", {"n": 40})
+        self.assertEqual(reopened.get_latest_block().previous_hash, reopened.chain[40].hash)
+        self.assertEqual(reopened.chain[41].transaction_id, "tx40")
+        self.assertTrue(reopened.is_chain_valid())
+
+class TestTransactionIndex(unittest.TestCase):
+    
+    def setUp(self):
+        
+        self.temp_dir = tempfile.mkdtemp()
+        self.directory = os.path.join(self.temp_dir, "chain")
+    
+    def tearDown(self):
+        
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+    
+    def _build(self, count):
+        
+        blockchain = Blockchain.open(self.directory)
+        blockchain.add_blocks([(f"tx{i}", {"n": i}) for i in range(count)])
+        return blockchain
+    
+    def test_lookup_reads_indexed_block(self):
+        
+        blockchain = self._build(50)
+        self.assertEqual(blockchain.find_block("tx17").transaction_data, {"n": 17})
+        blockchain.add_block("late", {"n": -1})
+        self.assertEqual(blockchain.find_block("late").transaction_data, {"n": -1})
+        self.assertIsNone(blockchain.find_block("missing"))
+        self.assertEqual(blockchain.locate("tx0"), next(blockchain.store.scan(1))[0])
+    
+    def test_index_persists_and_is_rebuilt_when_missing_or_stale(self):
+        
+        blockchain = self._build(20)
+        blockchain.find_block("tx0")
+        blockchain.close()
+        
+        reopened = Blockchain.open(self.directory)
+        self.assertTrue(reopened.index.load(reopened.store.block_count))
+        reopened.close()
+        
+        os.remove(os.path.join(self.directory, TXID_INDEX_FILE))
+        reopened = Blockchain.open(self.directory)
+        self.assertEqual(reopened.find_block("tx5").transaction_data, {"n": 5})
+        reopened.close()
+        
+        # Blocks appended before the index was ever loaded leave it stale.
+        reopened = Blockchain.open(self.directory)
+        reopened.add_block("unindexed", {"n": 99})
+        reopened.close()
+        reopened = Blockchain.open(self.directory)
+        self.assertEqual(reopened.find_block("unindexed").transaction_data, {"n": 99})
+    
+    def test_appended_records_are_merged_into_the_sorted_file(self):
+        
+        os.makedirs(self.directory)
+        index = TransactionIndex(self.directory, merge_records=4)
+        index.rebuild([(f"tx{i}", (0, i)) for i in range(10)], 10)
+        index.add([(f"tx{i}", (1, i)) for i in range(10, 13)], 13)
+        self.assertEqual(len(index.recent), 3)
+        index.add([("tx3", (1, 99)), ("tx13", (1, 13))], 15)
+        self.assertEqual(index.recent, {})
+        self.assertEqual(len(index), 14)
+        self.assertEqual(index.get("tx3"), (1, 99))
+        self.assertEqual(index.get("tx12"), (1, 12))
+        self.assertEqual(index.get("tx0"), (0, 0))
+        self.assertIsNone(index.get("missing"))
+        
+        # Logged records are read back only while the meta file covers them.
+        index.add([("tx14", (1, 14))], 16)
+        reopened = TransactionIndex(self.directory)
+        self.assertFalse(reopened.load(16))
+        index._write_meta()
+        self.assertTrue(reopened.load(16))
+        self.assertEqual(reopened.get("tx14"), (1, 14))
+        with open(os.path.join(self.directory, TXID_LOG_FILE), "ab") as f:
+            f.write(b"\0")
+        self.assertFalse(TransactionIndex(self.directory).load(16))
+        reopened._close_files()
+        index._close_files()
+
+class TestAccountHistory(unittest.TestCase):
+    
+    def setUp(self):
+        
+        self.temp_dir = tempfile.mkdtemp()
+        self.original_dir = os.getcwd()
+        os.chdir(self.temp_dir)
+    
+    def tearDown(self):
+        
+        os.chdir(self.original_dir)
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+    
+    def _transaction(self, i, sender_id, receiver_id):
+        
+        return (f"tx{i:04d}", {
+            "transaction_id": f"tx{i:04d}",
+            "sender_id": sender_id,
+            "receiver_id": receiver_id,
+            "amount": float(i),
+            "timestamp": 1000.0 + i
+        })
+    
+    def test_history_is_paginated_newest_first(self):
+        
+        blockchain = Blockchain.open("chain")
+        blockchain.add_blocks([self._transaction(i, f"user{i % 3}", "merchant") for i in range(30)])
+        
+        page = blockchain.account_history("user1", 4)
+        self.assertEqual([transaction_id for _, transaction_id, _ in page], ["tx0028", "tx0025", "tx0022", "tx0019"])
+        before = page[-1][:2]
+        page = blockchain.account_history("user1", 4, before=before)
+        self.assertEqual(page[0][1], "tx0016")
+        
+        page = blockchain.account_history("merchant", 100, start_time=1010.0, end_time=1013.0)
+        self.assertEqual([transaction_data["amount"] for _, _, transaction_data in page], [12.0, 11.0, 10.0])
+        blockchain.close()
+        
+        # A reopened chain catches the index up with blocks it missed.
+        reopened = Blockchain.open("chain")
+        reopened.add_blocks([self._transaction(30, "user1", "merchant")])
+        reopened.close()
+        reopened = Blockchain.open("chain")
+        self.assertEqual(reopened.account_history("user1", 1)[0][1], "tx0030")
+        self.assertEqual(len(reopened.account_history("user1", 100)), 11)
+    
+    def test_adjacent_time_windows_do_not_overlap(self):
+        
+        # Stored and in-memory chains both treat end_time as exclusive.
+        for blockchain in (Blockchain.open("chain"), Blockchain()):
+            blockchain.add_blocks([self._transaction(i, "user0", "merchant") for i in range(30)])
+            pages = [blockchain.account_history("merchant", 100, start_time=start, end_time=end)
+                     for start, end in [(1000.0, 1010.0), (1010.0, 1020.0), (1020.0, 1030.0)]]
+            self.assertEqual([len(page) for page in pages], [10, 10, 10])
+            self.assertEqual(pages[1][-1][1], "tx0010")
+            blockchain.close()
+    
+    def test_bank_manager_statement_spans_banks(self):
+        
+        bank_manager = BankManager()
+        bank_manager.initialize()
+        _, uid = bank_manager.register_user("History User", "SBIN0000001", "9999999999", "password", "1234", 1000.0)
+        _, local_mid = bank_manager.register_merchant("Local Merchant", "SBIN0000001", "password", 0.0)
+        _, remote_mid = bank_manager.register_merchant("Remote Merchant", "HDFC0000001", "password", 0.0)
+        for i in range(5):
+            bank_manager.process_transaction(uid, local_mid if i % 2 else remote_mid, float(i + 1))
+        
+        transactions, cursor = bank_manager.get_account_transactions(uid, limit=3)
+        self.assertEqual([transaction["amount"] for transaction in transactions], [5.0, 4.0, 3.0])
+        transactions, cursor = bank_manager.get_account_transactions(uid, limit=3, cursor=cursor)
+        self.assertEqual([transaction["amount"] for transaction in transactions], [2.0, 1.0])
+        self.assertIsNone(cursor)
+        
+        transactions, _ = bank_manager.get_account_transactions(remote_mid)
+        self.assertEqual([transaction["amount"] for transaction in transactions], [5.0, 3.0, 1.0])
+        self.assertEqual(len(bank_manager.get_user_transactions(uid)), 5)
+        bank_manager.close()
+
+if __name__ == '__main__':
+    unittest.main()
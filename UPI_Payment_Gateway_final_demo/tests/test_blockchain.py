@@ -3,11 +3,14 @@ import os
 import unittest
 import time
 import json
+import shutil
+import tempfile
+from unittest import mock
 
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from bank_server.blockchain import Blockchain, Block, generate_transaction_id
+from bank_server.blockchain import Blockchain, Block, generate_transaction_id, verify_blocks
 
 class TestBlockchain(unittest.TestCase):
     
@@ -95,3 +98,107 @@ class TestBlockchain(unittest.TestCase):
         
         
         new_blockchain = Blockchain.from_dict_list(dict_list)
+        self.assertEqual(len(new_blockchain.chain), 3)
+        self.assertTrue(new_blockchain.is_chain_valid())
+
+class TestBlockVerification(unittest.TestCase):
+    
+    def setUp(self):
+        
+        self.temp_dir = tempfile.mkdtemp()
+        self.directory = os.path.join(self.temp_dir, "chain")
+    
+    def tearDown(self):
+        
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+    
+    def _tamper(self, blockchain, position):
+        
+        number, offset = blockchain.store.location_of(position)
+        path = blockchain.store.segment_path(number)
+        with open(path, "rb") as f:
+            data = f.read()
+        # Same-length edit, so the segment's framing stays intact.
+        start = data.index(b'"n":', offset)
+        with open(path, "wb") as f:
+            f.write(data[:start] + b'"m":' + data[start + 4:])
+    
+    def test_incremental_verification_only_checks_new_blocks(self):
+        
+        blockchain = Blockchain.open(self.directory)
+        blockchain.add_blocks([(f"tx{i}", {"n": i}) for i in range(20)])
+        self.assertTrue(blockchain.verify())
+        blockchain.add_blocks([(f"late{i}", {"n": i}) for i in range(5)])
+        blockchain.close()
+        
+        reopened = Blockchain.open(self.directory)
+        with mock.patch.object(Block, "follows", autospec=True, side_effect=Block.follows) as follows:
+            self.assertTrue(reopened.verify())
+        self.assertEqual(follows.call_count, 5)
+        
+        reopened.add_block("bad", {"n": 0})
+        self._tamper(reopened, 26)
+        self.assertFalse(reopened.verify())
+    
+    def test_tampering_is_detected_by_full_pass(self):
+        
+        blockchain = Blockchain.open(self.directory)
+        blockchain.add_blocks([(f"tx{i}", {"n": i}) for i in range(10)])
+        self.assertTrue(blockchain.verify())
+        self._tamper(blockchain, 4)
+        self.assertFalse(blockchain.is_chain_valid())
+    
+    def test_parallel_verification(self):
+        
+        blockchain = Blockchain.open(self.directory)
+        blockchain.add_blocks([(f"tx{i}", {"n": i}) for i in range(200)])
+        self.assertTrue(blockchain.verify(since_checkpoint=False, workers=2))
+        self._tamper(blockchain, 150)
+        self.assertFalse(blockchain.verify(since_checkpoint=False, workers=2))
+    
+    def test_legacy_blocks_link_by_transaction_id(self):
+        
+        legacy = [
+            {"transaction_id": "0", "transaction_data": {}, "previous_hash": "0", "timestamp": 1.0},
+            {"transaction_id": "tx1", "transaction_data": {"n": 1}, "previous_hash": "0", "timestamp": 2.0}
+        ]
+        blockchain = Blockchain.from_dict_list(legacy)
+        self.assertIsNone(blockchain.chain[1].hash)
+        block = blockchain.add_block("tx2", {"n": 2})
+        self.assertEqual(block.previous_hash, blockchain.chain[1].compute_hash())
+        self.assertTrue(blockchain.is_chain_valid())
+        
+        blockchain.chain[1].transaction_data["n"] = 5
+        self.assertFalse(blockchain.is_chain_valid())
+    
+    def test_unhashed_block_after_hashed_ones_is_rejected(self):
+        
+        b0 = Block("0", {}, "0", 1.0)
+        b1 = Block("tx1", {"amount": 10}, b0.hash, 2.0)
+        b2 = Block("tx2", {"amount": 20}, b1.hash, 3.0)
+        self.assertTrue(verify_blocks([b0, b1, b2], None)[0])
+        
+        # Rewrite the tail and drop its hash, linking it the pre-hashing way.
+        tampered = b2.to_dict()
+        tampered["transaction_data"] = {"amount": 99999}
+        del tampered["hash"]
+        tampered["previous_hash"] = b1.transaction_id
+        self.assertFalse(verify_blocks([b0, b1, Block.from_dict(tampered)], None)[0])
+        
+        tampered["previous_hash"] = b1.hash
+        self.assertFalse(verify_blocks([b0, b1, Block.from_dict(tampered)], None)[0])
+    
+    def test_rewritten_tail_fails_incremental_verification(self):
+        
+        blockchain = Blockchain.open(self.directory)
+        blockchain.add_blocks([(f"tx{i}", {"n": i}) for i in range(5)])
+        self.assertTrue(blockchain.verify())
+        previous = blockchain.chain[-1]
+        blockchain.store.append([{"transaction_id": "forged", "transaction_data": {"n": 99999},
+                                  "previous_hash": previous.transaction_id, "timestamp": time.time()}])
+        blockchain.close()
+        
+        self.assertFalse(Blockchain.open(self.directory).verify())
+
+if __name__ == '__main__':
+    unittest.main()
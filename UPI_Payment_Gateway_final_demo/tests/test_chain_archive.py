@@ -0,0 +1,148 @@
+
+import sys
+import os
+import json
+import hashlib
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bank_server.block_store import BlockStore, INDEX_FILE
+from bank_server.blockchain import Blockchain
+from bank_server.chain_archive import ARCHIVE_MAGIC, ARCHIVE_SUFFIX, SUMMARY_LENGTH
+
+KEY = b"k" * 32
+
+def transaction_id(i):
+    
+    return hashlib.sha256(f"tx{i}".encode()).hexdigest()
+
+def payment(i):
+    
+    return {
+        "transaction_id": transaction_id(i),
+        "sender_id": f"{i % 4:016x}",
+        "receiver_id": "d1df7809f269d037",
+        "amount": 10.0,
+        "description": "Payment via UPI",
+        "timestamp": 1700000000.0 + i
+    }
+
+class TestChainArchive(unittest.TestCase):
+    
+    def setUp(self):
+        
+        self.temp_dir = tempfile.mkdtemp()
+        self.directory = os.path.join(self.temp_dir, "chain")
+        self.blockchain = self._open()
+        for batch in range(12):
+            self.blockchain.add_transactions([(transaction_id(i), payment(i)) for i in range(batch * 10, batch * 10 + 10)])
+            self.blockchain.seal()
+    
+    def tearDown(self):
+        
+        self.blockchain.close()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+    
+    def _open(self):
+        
+        return Blockchain(BlockStore(self.directory, segment_max_bytes=2048))
+    
+    def _reopen(self):
+        
+        self.blockchain.close()
+        self.blockchain = self._open()
+    
+    def test_old_segments_are_archived(self):
+        
+        segments = len(self.blockchain.store.segments)
+        summaries = self.blockchain.archive(keep_segments=1, key=KEY)
+        
+        self.assertEqual(len(summaries), segments - 2)
+        self.assertTrue(all(summary["archive_bytes"] < summary["bytes"] for summary in summaries))
+        for summary in summaries:
+            self.assertFalse(os.path.exists(self.blockchain.store.segment_path(summary["segment"])))
+            self.assertTrue(os.path.exists(self.blockchain.store.segment_path(summary["segment"], ARCHIVE_SUFFIX)))
+        # Running it again has nothing left to do.
+        self.assertEqual(self.blockchain.archive(keep_segments=1, key=KEY), [])
+    
+    def test_queries_cross_the_archive_boundary(self):
+        
+        self.blockchain.archive(keep_segments=1, key=KEY)
+        self._reopen()
+        
+        self.assertTrue(self.blockchain.verify(since_checkpoint=False))
+        self.assertTrue(self.blockchain.verify_archives(KEY))
+        self.assertFalse(self.blockchain.verify_archives(b"x" * 32))
+        self.assertEqual(self.blockchain.find_transaction(transaction_id(3)), payment(3))
+        self.assertEqual(self.blockchain.find_transaction(transaction_id(118)), payment(118))
+        history = self.blockchain.account_history(f"{1:016x}", 100)
+        self.assertEqual(len(history), 30)
+        self.assertEqual(history[-1][1], transaction_id(1))
+    
+    def test_reader_racing_the_archiver_falls_back_to_the_archive(self):
+        
+        self._reopen()
+        store = self.blockchain.store
+        mapped = store._mapped
+        blocks = store.block_count
+        
+        def archive_first_segment(number):
+            # The reader has seen the segment unarchived; archive it before
+            # the reader gets to the file.
+            with mock.patch.object(store, "_mapped", mapped):
+                self.blockchain.archive(keep_segments=len(store.segments) - 2, key=KEY)
+            return mapped(number)
+        
+        with mock.patch.object(store, "_mapped", side_effect=archive_first_segment):
+            records = list(store.iter_records())
+        self.assertTrue(store.segments[0].get("archived"))
+        self.assertEqual(len(records), blocks)
+        self.assertEqual(records, list(store.iter_records()))
+    
+    def test_index_is_rebuilt_from_archives(self):
+        
+        self.blockchain.archive(keep_segments=1, key=KEY)
+        blocks = len(self.blockchain.chain)
+        self.blockchain.close()
+        os.remove(os.path.join(self.directory, INDEX_FILE))
+        
+        self.blockchain = self._open()
+        self.assertEqual(len(self.blockchain.chain), blocks)
+        self.assertEqual([entry["transaction_id"] for entry in self.blockchain.chain[1].entries()][:2],
+                         [transaction_id(0), transaction_id(1)])
+        self.assertTrue(self.blockchain.verify(since_checkpoint=False))
+    
+    def test_summary_carries_balances_forward(self):
+        
+        summaries = self.blockchain.archive(keep_segments=0, key=KEY)
+        archived = sum(summary["transactions"] for summary in summaries)
+        balances = summaries[-1]["balances"]
+        
+        self.assertEqual(balances["d1df7809f269d037"], archived * 1000)
+        self.assertEqual(sum(balances.values()), 0)
+        self.assertEqual(summaries[1]["previous_hash"], summaries[0]["last_hash"])
+    
+    def test_tampered_summary_fails_verification(self):
+        
+        summary = self.blockchain.archive(keep_segments=1, key=KEY)[0]
+        path = self.blockchain.store.segment_path(summary["segment"], ARCHIVE_SUFFIX)
+        with open(path, "rb") as f:
+            data = f.read()
+        start = len(ARCHIVE_MAGIC) + SUMMARY_LENGTH.size
+        length = SUMMARY_LENGTH.unpack_from(data, len(ARCHIVE_MAGIC))[0]
+        tampered = json.loads(data[start:start + length])
+        tampered["balances"]["d1df7809f269d037"] += 100
+        encoded = json.dumps(tampered, separators=(",", ":")).encode("utf-8")
+        with open(path, "wb") as f:
+            f.write(ARCHIVE_MAGIC + SUMMARY_LENGTH.pack(len(encoded)) + encoded + data[start + length:])
+        
+        self._reopen()
+        self.assertFalse(self.blockchain.verify_archives(KEY))
+
+if __name__ == "__main__":
+    unittest.main()
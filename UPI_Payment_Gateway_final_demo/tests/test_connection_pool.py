@@ -0,0 +1,148 @@
+import sys
+import os
+import unittest
+import socket
+import threading
+import time
+
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bank_server.network import BankServerNetwork
+from common.connection_pool import ConnectionPool
+from common.network_protocol import Message, read_message, write_message
+
+def echo_handler(message):
+    
+    return Message("ECHO_RESPONSE", "BANK_SERVER", message.sender, message.data, message.message_id)
+
+class TestConnectionPool(unittest.TestCase):
+    
+    def setUp(self):
+        
+        self.server = BankServerNetwork(mode="threaded", host="127.0.0.1", port=0)
+        self.server.register_handler("ECHO", echo_handler)
+        self.server.start_server()
+        self.destination = ("127.0.0.1", self.server.port)
+        self.pool = ConnectionPool(max_per_destination=2, idle_timeout=30.0, acquire_timeout=0.2)
+    
+    def tearDown(self):
+        
+        self.pool.close()
+        self.server.stop()
+    
+    def test_requests_reuse_one_connection(self):
+        
+        for i in range(10):
+            message = Message("ECHO", "TEST_CLIENT", "BANK_SERVER", {"i": i}, str(i))
+            response = self.pool.request(*self.destination, message)
+            self.assertEqual(response.data["i"], i)
+        
+        self.assertEqual(self.pool.stats["created"], 1)
+        self.assertEqual(self.pool.stats["reused"], 9)
+    
+    def test_binary_codec_negotiated(self):
+        
+        sock, _ = self.pool.acquire(*self.destination)
+        self.assertEqual(self.pool.codec_for(sock).name, "binary")
+        self.pool.release(*self.destination, sock)
+        
+        json_pool = ConnectionPool(codecs=None)
+        try:
+            message = Message("ECHO", "TEST_CLIENT", "BANK_SERVER", {"raw": b"\x00\x01"}, "json")
+            self.assertEqual(json_pool.request(*self.destination, message).data["raw"], "AAE=")
+            
+            message.message_id = "binary"
+            self.assertEqual(self.pool.request(*self.destination, message).data["raw"], b"\x00\x01")
+        finally:
+            json_pool.close()
+    
+    def test_destination_size_limit(self):
+        
+        first, _ = self.pool.acquire(*self.destination)
+        second, _ = self.pool.acquire(*self.destination)
+        
+        with self.assertRaises(TimeoutError):
+            self.pool.acquire(*self.destination)
+        
+        self.pool.release(*self.destination, first)
+        reused, was_reused = self.pool.acquire(*self.destination)
+        self.assertIs(reused, first)
+        self.assertTrue(was_reused)
+        
+        self.pool.release(*self.destination, reused)
+        self.pool.release(*self.destination, second)
+    
+    def test_idle_eviction(self):
+        
+        self.pool.idle_timeout = 0.05
+        sock, _ = self.pool.acquire(*self.destination)
+        self.pool.release(*self.destination, sock)
+        
+        time.sleep(0.1)
+        self.assertEqual(self.pool.evict_idle(), 1)
+        
+        _, reused = self.pool.acquire(*self.destination)
+        self.assertFalse(reused)
+    
+    def test_closed_connection_is_not_reused(self):
+        
+        sock, _ = self.pool.acquire(*self.destination)
+        self.assertTrue(ConnectionPool._is_healthy(sock))
+        
+        left, right = socket.socketpair()
+        right.close()
+        self.assertFalse(ConnectionPool._is_healthy(left))
+        
+        self.pool.release(*self.destination, left)
+        fresh, reused = self.pool.acquire(*self.destination)
+        self.assertFalse(reused)
+        self.assertIsNot(fresh, left)
+        self.assertEqual(self.pool.stats["created"], 2)
+        
+        self.pool.release(*self.destination, sock)
+        self.pool.release(*self.destination, fresh)
+    
+    def test_lost_response_is_not_resent(self):
+        
+        listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        listener.bind(("127.0.0.1", 0))
+        listener.listen(4)
+        received = []
+        
+        def serve():
+            # Answer the first request, then take the second and hang up
+            # without replying, as a server that crashed mid-transaction would.
+            while True:
+                try:
+                    conn, _ = listener.accept()
+                except OSError:
+                    return
+                with conn:
+                    while True:
+                        message = read_message(conn)
+                        if message is None:
+                            break
+                        received.append(message.message_id)
+                        if len(received) > 1:
+                            break
+                        write_message(conn, echo_handler(message))
+        
+        server = threading.Thread(target=serve, daemon=True)
+        server.start()
+        pool = ConnectionPool(codecs=None)
+        try:
+            destination = listener.getsockname()
+            first = Message("PROCESS_TRANSACTION", "TEST_CLIENT", "BANK_SERVER", {}, "t1")
+            self.assertEqual(pool.request(*destination, first).message_id, "t1")
+            
+            second = Message("PROCESS_TRANSACTION", "TEST_CLIENT", "BANK_SERVER", {}, "t2")
+            self.assertIsNone(pool.request(*destination, second))
+            self.assertEqual(received, ["t1", "t2"])
+            self.assertEqual(pool.stats["created"], 1)
+        finally:
+            pool.close()
+            listener.close()
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,185 @@
+import sys
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bank_server.group_commit import GroupCommitWriter
+from bank_server.ledger_log import LedgerLog
+
+class TestGroupCommitWriter(unittest.TestCase):
+    
+    def test_concurrent_records_share_batches(self):
+        
+        written = []
+        
+        def write_batch(batch):
+            time.sleep(0.005)
+            written.append(list(batch))
+        
+        writer = GroupCommitWriter(write_batch, max_batch=64, max_wait=0.002)
+        
+        def client(index):
+            for i in range(20):
+                writer.wait(writer.submit(f"{index}:{i}".encode()))
+        
+        threads = [threading.Thread(target=client, args=(index,)) for index in range(16)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(timeout=30)
+        writer.close()
+        
+        records = [record for batch in written for record in batch]
+        self.assertEqual(len(records), 16 * 20)
+        self.assertEqual(len(set(records)), 16 * 20)
+        self.assertLess(writer.stats["batches"], len(records))
+        self.assertTrue(all(len(batch) <= 64 for batch in written))
+    
+    def test_max_batch_is_respected(self):
+        
+        release = threading.Event()
+        written = []
+        
+        def write_batch(batch):
+            release.wait(5)
+            written.append(len(batch))
+        
+        writer = GroupCommitWriter(write_batch, max_batch=3, max_wait=0)
+        tickets = [writer.submit(b"x") for _ in range(10)]
+        release.set()
+        writer.wait(tickets[-1], timeout=5)
+        writer.close()
+        
+        self.assertEqual(sum(written), 10)
+        self.assertTrue(all(size <= 3 for size in written))
+    
+    def test_write_failure_reaches_waiters(self):
+        
+        def write_batch(batch):
+            raise OSError("disk full")
+        
+        writer = GroupCommitWriter(write_batch)
+        ticket = writer.submit(b"record")
+        with self.assertRaises(OSError):
+            writer.wait(ticket, timeout=5)
+        writer.close()
+    
+    def test_records_after_a_failed_write_are_not_written(self):
+        
+        written = []
+        fail = threading.Event()
+        
+        def write_batch(batch):
+            if fail.is_set():
+                raise OSError("disk full")
+            written.extend(batch)
+        
+        writer = GroupCommitWriter(write_batch)
+        first = writer.submit(b"first")
+        writer.wait(first, timeout=5)
+        fail.set()
+        failed = writer.submit(b"failed")
+        with self.assertRaises(OSError):
+            writer.wait(failed, timeout=5)
+        
+        fail.clear()
+        later = writer.submit(b"later")
+        with self.assertRaises(OSError):
+            writer.wait(later, timeout=5)
+        writer.wait(first, timeout=5)
+        writer.close()
+        self.assertEqual(written, [b"first"])
+    
+    def test_submit_after_close(self):
+        
+        writer = GroupCommitWriter(lambda batch: None)
+        writer.close()
+        with self.assertRaises(RuntimeError):
+            writer.submit(b"late")
+
+class TestLedgerLogGroupPolicy(unittest.TestCase):
+    
+    def setUp(self):
+        
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.temp_dir, "ledger.log")
+    
+    def tearDown(self):
+        
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+    
+    def test_commit_returns_after_record_is_on_disk(self):
+        
+        log = LedgerLog(self.path, fsync_policy="group", group_max_wait=0.01)
+        seq = log.append([("user", "u1", -1.0, 9.0)], ["tx1"])
+        log.commit(seq)
+        
+        with open(self.path, "rb") as f:
+            self.assertIn(b'"tx1"', f.read())
+        log.close()
+    
+    def test_truncate_drains_queued_records(self):
+        
+        log = LedgerLog(self.path, fsync_policy="group", group_max_wait=0.05)
+        log.append([("user", "u1", -1.0, 9.0)], ["tx1"])
+        log.truncate()
+        log.commit(log.append([("user", "u1", -1.0, 8.0)], ["tx2"]))
+        log.close()
+        
+        records = list(LedgerLog(self.path).replay())
+        self.assertEqual([record["txids"] for record in records], [["tx2"]])
+    
+    def test_appends_during_fsync_share_the_next_one(self):
+        
+        log = LedgerLog(self.path, fsync_policy="group", group_max_wait=0)
+        syncing = threading.Event()
+        release = threading.Event()
+        fsyncs = []
+        real_fsync = os.fsync
+        
+        def slow_fsync(fd):
+            fsyncs.append(fd)
+            syncing.set()
+            release.wait(5)
+            real_fsync(fd)
+        
+        tickets = []
+        
+        def commit(index):
+            seq = log.append([("user", f"u{index}", -1.0, 9.0)], [f"tx{index}"])
+            tickets.append(seq)
+            log.commit(seq)
+        
+        with mock.patch("bank_server.ledger_log.os.fsync", slow_fsync):
+            first = threading.Thread(target=commit, args=(0,))
+            first.start()
+            self.assertTrue(syncing.wait(5))
+            
+            # While the first record is being synced, the others must still
+            # be able to queue up behind it.
+            threads = [threading.Thread(target=commit, args=(index,)) for index in range(1, 9)]
+            for thread in threads:
+                thread.start()
+            deadline = time.monotonic() + 5
+            while len(tickets) < 9 and time.monotonic() < deadline:
+                time.sleep(0.001)
+            queued = len(tickets)
+            release.set()
+            for thread in [first] + threads:
+                thread.join(timeout=5)
+        
+        self.assertEqual(queued, 9)
+        self.assertEqual(len(fsyncs), 2)
+        self.assertEqual(log.group_commit_stats()["largest_batch"], 8)
+        log.close()
+        self.assertEqual(len(list(LedgerLog(self.path).replay())), 9)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,164 @@
+import sys
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bank_server.ledger_log import LedgerLog
+from bank_server.bank_manager import BankManager
+
+class TestLedgerLog(unittest.TestCase):
+    
+    def setUp(self):
+        
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.temp_dir, "ledger.log")
+    
+    def tearDown(self):
+        
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+    
+    def test_append_and_replay(self):
+        
+        for policy in ("always", "group", "interval"):
+            path = os.path.join(self.temp_dir, f"{policy}.log")
+            log = LedgerLog(path, fsync_policy=policy)
+            seq = log.append([("user", "u1", -10.0, 90.0)], ["tx1"])
+            log.commit(seq)
+            seq = log.append([("merchant", "m1", 10.0, 10.0)], ["tx2"])
+            log.commit(seq)
+            log.close()
+            
+            records = list(LedgerLog(path).replay())
+            self.assertEqual([record["txids"] for record in records], [["tx1"], ["tx2"]])
+            self.assertEqual(records[0]["changes"], [["user", "u1", -10.0, 90.0]])
+    
+    def test_torn_tail_is_ignored_and_dropped(self):
+        
+        log = LedgerLog(self.path)
+        log.commit(log.append([("user", "u1", -10.0, 90.0)], ["tx1"]))
+        log.close()
+        with open(self.path, "ab") as f:
+            f.write(b'{"txids":["tx2"],"chan')
+        
+        self.assertEqual(len(list(LedgerLog(self.path).replay())), 1)
+        
+        log = LedgerLog(self.path)
+        log.commit(log.append([("user", "u1", -5.0, 85.0)], ["tx3"]))
+        log.close()
+        records = list(LedgerLog(self.path).replay())
+        self.assertEqual([record["txids"] for record in records], [["tx1"], ["tx3"]])
+    
+    def test_truncate(self):
+        
+        log = LedgerLog(self.path)
+        log.commit(log.append([("user", "u1", -10.0, 90.0)], ["tx1"]))
+        self.assertEqual(log.records_since_checkpoint, 1)
+        log.truncate()
+        log.close()
+        
+        self.assertEqual(log.records_since_checkpoint, 0)
+        self.assertEqual(list(LedgerLog(self.path).replay()), [])
+    
+    def test_unknown_policy(self):
+        
+        with self.assertRaises(ValueError):
+            LedgerLog(self.path, fsync_policy="never")
+
+class TestLedgerRecovery(unittest.TestCase):
+    
+    def setUp(self):
+        
+        self.original_cwd = os.getcwd()
+        self.temp_dir = tempfile.mkdtemp()
+        os.chdir(self.temp_dir)
+        
+        self.bank_manager = BankManager()
+        self.bank_manager.initialize()
+        _, self.sender_id = self.bank_manager.register_user(
+            name="Ledger Sender",
+            bank_code="SBIN0000001",
+            mobile_number="9000000002",
+            password="sender",
+            pin="2222",
+            initial_balance=300.0
+        )
+        _, self.merchant_id = self.bank_manager.register_merchant(
+            name="Ledger Merchant",
+            bank_code="ICIC0000001",
+            password="merchant"
+        )
+    
+    def tearDown(self):
+        
+        self.bank_manager.ledger_log.close()
+        os.chdir(self.original_cwd)
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+    
+    def test_payments_do_not_rewrite_account_files(self):
+        
+        mtime = os.stat("users.json").st_mtime_ns
+        self.bank_manager.process_transaction(self.sender_id, self.merchant_id, 50.0)
+        self.assertEqual(os.stat("users.json").st_mtime_ns, mtime)
+        self.assertEqual(self.bank_manager.ledger_log.records_since_checkpoint, 1)
+    
+    def test_initialize_replays_log_tail(self):
+        
+        self.bank_manager.process_transaction(self.sender_id, self.merchant_id, 50.0)
+        self.bank_manager.process_transaction_batch([
+            {"sender_id": self.sender_id, "receiver_id": self.merchant_id, "amount": 25.0},
+            {"sender_id": self.sender_id, "receiver_id": self.merchant_id, "amount": 25.0},
+        ])
+        
+        recovered = BankManager()
+        recovered.initialize()
+        self.assertEqual(recovered.users[self.sender_id].balance, 200.0)
+        self.assertEqual(recovered.merchants[self.merchant_id].balance, 100.0)
+        
+        # Replaying the same tail twice must not apply the deltas again.
+        recovered.replay_ledger()
+        self.assertEqual(recovered.users[self.sender_id].balance, 200.0)
+    
+    def test_checkpoint_truncates_log(self):
+        
+        self.bank_manager.checkpoint_records = 2
+        self.bank_manager.process_transaction(self.sender_id, self.merchant_id, 10.0)
+        self.bank_manager.process_transaction(self.sender_id, self.merchant_id, 10.0)
+        
+        self.assertEqual(self.bank_manager.ledger_log.records_since_checkpoint, 0)
+        self.assertEqual(os.path.getsize("ledger.log"), 0)
+        
+        recovered = BankManager()
+        recovered.initialize()
+        self.assertEqual(recovered.users[self.sender_id].balance, 280.0)
+        self.assertEqual(recovered.merchants[self.merchant_id].balance, 20.0)
+
+    def test_failed_commit_is_rolled_back_and_stops_payments(self):
+        
+        def chain_entries():
+            return sum(len(chain.chain) + len(chain.pending) for chain in self.bank_manager.blockchains.values())
+        
+        entries = chain_entries()
+        with mock.patch("bank_server.ledger_log.os.fsync", side_effect=OSError("disk full")):
+            success, error = self.bank_manager.process_transaction(self.sender_id, self.merchant_id, 50.0)
+        
+        self.assertFalse(success)
+        self.assertEqual(error, "Ledger write failed")
+        self.assertEqual(self.bank_manager.users[self.sender_id].balance, 300.0)
+        self.assertEqual(self.bank_manager.merchants[self.merchant_id].balance, 0.0)
+        self.assertEqual(len(self.bank_manager.transactions), 0)
+        self.assertEqual(chain_entries(), entries)
+        
+        self.assertEqual(self.bank_manager.process_transaction(self.sender_id, self.merchant_id, 10.0),
+                         (False, "Ledger unavailable"))
+        self.assertEqual(self.bank_manager.process_transaction_batch([
+            {"sender_id": self.sender_id, "receiver_id": self.merchant_id, "amount": 10.0}
+        ]), [(False, "Ledger unavailable")])
+        self.assertEqual(self.bank_manager.users[self.sender_id].balance, 300.0)
+
+if __name__ == "__main__":
+    unittest.main()
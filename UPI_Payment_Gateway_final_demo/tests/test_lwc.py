@@ -2,11 +2,22 @@ import sys
 import os
 import unittest
 import time
+import shutil
+import tempfile
 
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from upi_machine.lwc import speck_encrypt, speck_decrypt, generate_vmid
+from unittest import mock
+
+from upi_machine import lwc
+from upi_machine.lwc import Speck64, speck64, speck_encrypt, speck_decrypt, generate_vmid
+from upi_machine.lwc import decrypt_vmid_v2, generate_vmid_v2, is_vmid_v2, vmid_keys
+
+# Test vector from the SPECK implementation guide.
+SPECK_KEY = bytes.fromhex("0001020308090a0b1011121318191a1b")
+SPECK_PLAINTEXT = bytes.fromhex("2d4375747465723b")
+SPECK_CIPHERTEXT = bytes.fromhex("8b024e4548a56f8c")
 
 class TestLWC(unittest.TestCase):
     
@@ -43,5 +54,101 @@ class TestLWC(unittest.TestCase):
         vmid3 = generate_vmid(mid, timestamp + 1)
         self.assertNotEqual(vmid, vmid3)
 
+class TestSpeck64(unittest.TestCase):
+    
+    def test_reference_vector(self):
+        
+        cipher = Speck64(SPECK_KEY)
+        self.assertEqual(len(cipher.round_keys), 27)
+        self.assertEqual(cipher.encrypt_block(SPECK_PLAINTEXT), SPECK_CIPHERTEXT)
+        self.assertEqual(cipher.decrypt_block(SPECK_CIPHERTEXT), SPECK_PLAINTEXT)
+    
+    def test_batch_matches_single_blocks(self):
+        
+        cipher = speck64(SPECK_KEY)
+        data = SPECK_PLAINTEXT + os.urandom(8 * 99)
+        encrypted = cipher.encrypt_many(data)
+        
+        self.assertEqual(encrypted[:8], SPECK_CIPHERTEXT)
+        self.assertEqual(encrypted, b"".join(cipher.encrypt_block(data[i:i + 8]) for i in range(0, len(data), 8)))
+        self.assertEqual(cipher.decrypt_many(encrypted), data)
+        # Without NumPy the batch path falls back to one block at a time.
+        with mock.patch.object(lwc, "np", None):
+            self.assertEqual(cipher.encrypt_many(data), encrypted)
+            self.assertEqual(cipher.decrypt_many(encrypted), data)
+    
+    def test_round_keys_are_cached_per_key(self):
+        
+        self.assertIs(speck64(SPECK_KEY), speck64(SPECK_KEY))
+        self.assertIsNot(speck64(SPECK_KEY), speck64(bytes(16)))
+    
+    def test_rejects_bad_sizes(self):
+        
+        with self.assertRaises(ValueError):
+            Speck64(b"short key")
+        with self.assertRaises(ValueError):
+            speck64(SPECK_KEY).encrypt_many(b"1234567")
+
+class TestVMIDv2(unittest.TestCase):
+    
+    def setUp(self):
+        
+        self.temp_dir = tempfile.mkdtemp()
+        self.keys = vmid_keys(os.path.join(self.temp_dir, "vmid.key"))
+    
+    def tearDown(self):
+        
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+    
+    def test_round_trip_without_mapping_file(self):
+        
+        timestamp = 1700000000
+        for mid in ("1234567890abcdef", "MERCHANT-42", "1234567890ABCDEF"):
+            vmid = generate_vmid_v2(mid, timestamp, self.keys)
+            self.assertTrue(is_vmid_v2(vmid))
+            self.assertEqual(decrypt_vmid_v2(vmid, timestamp, self.keys), mid)
+        self.assertEqual(len(generate_vmid_v2("1234567890abcdef", timestamp, self.keys)), 36)
+        self.assertEqual(os.listdir(self.temp_dir), ["vmid.key"])
+    
+    def test_vmid_changes_with_timestamp(self):
+        
+        mid = "1234567890abcdef"
+        self.assertEqual(generate_vmid_v2(mid, 1700000000, self.keys), generate_vmid_v2(mid, 1700000000, self.keys))
+        self.assertNotEqual(generate_vmid_v2(mid, 1700000000, self.keys), generate_vmid_v2(mid, 1700000001, self.keys))
+    
+    def test_tampering_is_detected(self):
+        
+        timestamp = 1700000000
+        vmid = generate_vmid_v2("1234567890abcdef", timestamp, self.keys)
+        flipped = vmid[:6] + ("0" if vmid[6] != "0" else "1") + vmid[7:]
+        
+        self.assertIsNone(decrypt_vmid_v2(flipped, timestamp, self.keys))
+        self.assertIsNone(decrypt_vmid_v2(vmid, timestamp + 1, self.keys))
+        self.assertIsNone(decrypt_vmid_v2(vmid[:-2], timestamp, self.keys))
+        self.assertIsNone(decrypt_vmid_v2("not hex", timestamp, self.keys))
+        other_keys = vmid_keys(os.path.join(self.temp_dir, "other.key"))
+        self.assertIsNone(decrypt_vmid_v2(vmid, timestamp, other_keys))
+    
+    def test_legacy_vmids_are_told_apart(self):
+        
+        self.assertFalse(is_vmid_v2(speck_encrypt("12345678", "UPI00000000").hex()))
+    
+    def test_default_key_file_is_not_in_working_directory(self):
+        
+        machine_dir = os.path.join(self.temp_dir, "upi_machine")
+        work_dir = os.path.join(self.temp_dir, "work")
+        os.mkdir(machine_dir)
+        os.mkdir(work_dir)
+        cwd = os.getcwd()
+        os.chdir(work_dir)
+        try:
+            with mock.patch.object(lwc, "UPI_MACHINE_DIR", machine_dir):
+                vmid_keys.__wrapped__()
+        finally:
+            os.chdir(cwd)
+        
+        self.assertEqual(os.listdir(machine_dir), ["vmid.key"])
+        self.assertEqual(os.listdir(work_dir), [])
+
 if __name__ == "__main__":
     unittest.main()
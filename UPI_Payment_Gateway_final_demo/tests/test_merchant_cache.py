@@ -0,0 +1,104 @@
+
+import sys
+import os
+import unittest
+
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common.network_protocol import Message
+from upi_machine.merchant_cache import MerchantCache
+
+class FakeBank:
+    
+    def __init__(self):
+        self.merchants = {"1234567890abcdef": {"merchant_name": "Tea Stall", "bank_code": "SBIN0000001"},
+                          "12345678ffffffff": {"merchant_name": "Book Shop", "bank_code": "HDFC0000001"}}
+        self.requests = []
+        self.online = True
+    
+    def __call__(self, message):
+        
+        self.requests.append(message.data)
+        if not self.online:
+            return None
+        if message.message_type == "REGISTER_MERCHANT":
+            self.merchants["9999999999999999"] = {"merchant_name": message.data["name"], "bank_code": message.data["bank_code"]}
+            data = {"success": True, "merchant_id": "9999999999999999"}
+        else:
+            merchant_ids = message.data.get("merchant_ids")
+            if merchant_ids is None:
+                merchant_ids = [mid for mid in self.merchants if mid.startswith(message.data.get("prefix", ""))]
+            data = {
+                "success": True,
+                "merchants": {mid: self.merchants[mid] for mid in merchant_ids if mid in self.merchants},
+                "missing": [mid for mid in merchant_ids if mid not in self.merchants]
+            }
+        return Message(message_type=f"{message.message_type}_RESPONSE", sender="BANK_SERVER",
+                       receiver=message.sender, data=data, message_id=message.message_id)
+
+class FakeClock:
+    
+    def __init__(self):
+        self.now = 1000.0
+    
+    def __call__(self):
+        
+        return self.now
+
+class TestMerchantCache(unittest.TestCase):
+    
+    def setUp(self):
+        
+        self.bank = FakeBank()
+        self.clock = FakeClock()
+        self.cache = MerchantCache(self.bank, ttl=60, negative_ttl=5, clock=self.clock)
+    
+    def test_warm_cache_serves_without_requests(self):
+        
+        self.assertEqual(self.cache.warm(), 2)
+        for _ in range(10):
+            self.assertEqual(self.cache.get("1234567890abcdef")["merchant_name"], "Tea Stall")
+        self.assertEqual(len(self.bank.requests), 1)
+        
+        self.clock.now += 61
+        self.cache.get("1234567890abcdef")
+        self.assertEqual(self.bank.requests[-1], {"merchant_ids": ["1234567890abcdef"]})
+    
+    def test_unknown_merchants_are_cached_briefly(self):
+        
+        self.assertIsNone(self.cache.get("0000000000000000"))
+        self.assertIsNone(self.cache.get("0000000000000000"))
+        self.assertEqual(len(self.bank.requests), 1)
+        
+        self.clock.now += 6
+        self.assertIsNone(self.cache.get("0000000000000000"))
+        self.assertEqual(len(self.bank.requests), 2)
+    
+    def test_push_invalidation_clears_a_negative_entry(self):
+        
+        self.assertIsNone(self.cache.get("5555555555555555"))
+        self.bank.merchants["5555555555555555"] = {"merchant_name": "New Shop", "bank_code": "ICIC0000001"}
+        self.cache.invalidate("5555555555555555")
+        self.assertEqual(self.cache.get("5555555555555555")["merchant_name"], "New Shop")
+    
+    def test_stale_entries_are_served_while_the_bank_is_down(self):
+        
+        self.cache.warm()
+        self.clock.now += 61
+        self.bank.online = False
+        self.assertEqual(self.cache.get("1234567890abcdef")["merchant_name"], "Tea Stall")
+        self.assertIsNone(self.cache.get("0000000000000000"))
+        self.assertEqual(self.cache.find_by_prefix("12345678"), ["1234567890abcdef", "12345678ffffffff"])
+    
+    def test_prefix_lookup_and_registration_go_to_the_bank(self):
+        
+        self.assertEqual(self.cache.find_by_prefix("12345678"), ["1234567890abcdef", "12345678ffffffff"])
+        self.assertEqual(self.cache.find_by_prefix("1234567890"), ["1234567890abcdef"])
+        
+        self.assertIsNone(self.cache.get("9999999999999999"))
+        merchant_id = self.cache.register("Test Merchant", "SBIN0000001", "password")
+        self.assertEqual(self.cache.get(merchant_id)["merchant_name"], "Test Merchant")
+
+if __name__ == "__main__":
+    unittest.main()
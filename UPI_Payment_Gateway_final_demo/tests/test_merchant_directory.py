@@ -0,0 +1,87 @@
+import sys
+import os
+import shutil
+import tempfile
+import unittest
+
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bank_server.bank_manager import BankManager
+
+class TestMerchantDirectory(unittest.TestCase):
+    
+    def setUp(self):
+        
+        self.original_cwd = os.getcwd()
+        self.temp_dir = tempfile.mkdtemp()
+        os.chdir(self.temp_dir)
+        
+        self.bank_manager = self._bank_manager()
+        _, self.sender_id = self.bank_manager.register_user(
+            name="Directory Sender",
+            bank_code="SBIN0000001",
+            mobile_number="9000000003",
+            password="sender",
+            pin="3333",
+            initial_balance=100.0
+        )
+        _, self.merchant_id = self.bank_manager.register_merchant(
+            name="Known Merchant",
+            bank_code="HDFC0000001",
+            password="known"
+        )
+        self.directory = self.bank_manager.merchant_directory
+    
+    def tearDown(self):
+        
+        self.bank_manager.close()
+        os.chdir(self.original_cwd)
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+    
+    def _bank_manager(self):
+        
+        bank_manager = BankManager()
+        bank_manager.initialize()
+        bank_manager.merchant_directory.stop()
+        return bank_manager
+    
+    def _register_elsewhere(self, name):
+        
+        other = self._bank_manager()
+        _, merchant_id = other.register_merchant(name=name, bank_code="ICIC0000001", password=name)
+        other.ledger_log.close()
+        return merchant_id
+    
+    def test_payment_to_known_merchant_does_not_touch_the_file(self):
+        
+        checks = self.directory.stats["checks"]
+        success, _ = self.bank_manager.process_transaction(self.sender_id, self.merchant_id, 10.0)
+        
+        self.assertTrue(success)
+        self.assertEqual(self.directory.stats["checks"], checks)
+    
+    def test_refresh_merges_only_new_merchants(self):
+        
+        self.bank_manager.process_transaction(self.sender_id, self.merchant_id, 40.0)
+        new_id = self._register_elsewhere("Remote Merchant")
+        
+        self.assertEqual(self.directory.refresh(), 1)
+        self.assertEqual(self.bank_manager.merchants[new_id].name, "Remote Merchant")
+        self.assertEqual(self.bank_manager.merchants[self.merchant_id].balance, 40.0)
+        
+        reloads = self.directory.stats["reloads"]
+        self.assertEqual(self.directory.refresh(), 0)
+        self.assertEqual(self.directory.stats["reloads"], reloads)
+    
+    def test_miss_picks_up_merchant_registered_elsewhere(self):
+        
+        new_id = self._register_elsewhere("Late Merchant")
+        success, _ = self.bank_manager.process_transaction(self.sender_id, new_id, 25.0)
+        
+        self.assertTrue(success)
+        self.assertEqual(self.bank_manager.merchants[new_id].name, "Late Merchant")
+        self.assertEqual(self.bank_manager.merchants[new_id].balance, 25.0)
+
+if __name__ == "__main__":
+    unittest.main()
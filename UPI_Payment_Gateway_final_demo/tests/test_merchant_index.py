@@ -0,0 +1,51 @@
+
+import sys
+import os
+import hashlib
+import unittest
+
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bank_server.merchant_index import MerchantPrefixIndex
+
+def mid(i):
+    
+    return hashlib.sha256(str(i).encode()).hexdigest()[:16]
+
+class TestMerchantPrefixIndex(unittest.TestCase):
+    
+    def setUp(self):
+        
+        self.mids = [mid(i) for i in range(5000)]
+        self.index = MerchantPrefixIndex(self.mids)
+    
+    def test_candidates_match_a_linear_scan(self):
+        
+        for prefix in ("", "0", "a1", "ff", "1234", self.mids[7][:6], self.mids[7], self.mids[7] + "0", "g"):
+            expected = sorted(m for m in self.mids if m.startswith(prefix))
+            self.assertEqual(self.index.candidates(prefix), expected)
+    
+    def test_ambiguous_prefixes_return_every_candidate(self):
+        
+        index = MerchantPrefixIndex(["abcd000000000001", "abcd000000000002", "abce000000000000"])
+        self.assertEqual(index.candidates("abcd"), ["abcd000000000001", "abcd000000000002"])
+        self.assertEqual(index.candidates("abcd", limit=1), ["abcd000000000001"])
+        self.assertEqual(index.candidates("abcd0000000000012"), [])
+    
+    def test_added_ids_are_found(self):
+        
+        self.index.add("0000000000000000")
+        self.index.add("0000000000000000")
+        self.index.add(self.mids[0])
+        
+        self.assertEqual(len(self.index), 5001)
+        self.assertIn("0000000000000000", self.index)
+        self.assertEqual(self.index.candidates("00000000"), ["0000000000000000"])
+        
+        self.index.rebuild(self.mids[:10])
+        self.assertEqual(len(self.index), 10)
+        self.assertNotIn("0000000000000000", self.index)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,142 @@
+
+import sys
+import os
+import json
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bank_server.merkle import leaf_hash, merkle_proof, merkle_root, verify_merkle_path
+from bank_server.blockchain import Blockchain, PENDING_FILE, verify_transaction_proof
+
+class TestMerkleTree(unittest.TestCase):
+    
+    def _leaves(self, count):
+        
+        return [leaf_hash({"transaction_id": f"tx{i}", "transaction_data": {"n": i}}) for i in range(count)]
+    
+    def test_every_leaf_has_a_valid_path(self):
+        
+        for count in (1, 2, 3, 7, 8, 33):
+            leaves = self._leaves(count)
+            root = merkle_root(leaves)
+            for index, leaf in enumerate(leaves):
+                self.assertTrue(verify_merkle_path(leaf, merkle_proof(leaves, index), root))
+    
+    def test_path_does_not_prove_another_leaf(self):
+        
+        leaves = self._leaves(5)
+        root = merkle_root(leaves)
+        path = merkle_proof(leaves, 2)
+        self.assertFalse(verify_merkle_path(leaves[3], path, root))
+        # Paths survive a JSON round trip, which turns the steps into lists.
+        self.assertTrue(verify_merkle_path(leaves[2], json.loads(json.dumps(path)), root))
+    
+    def test_proof_is_logarithmic(self):
+        
+        self.assertEqual(len(merkle_proof(self._leaves(1024), 517)), 10)
+
+class TestBatchBlocks(unittest.TestCase):
+    
+    def setUp(self):
+        
+        self.original_cwd = os.getcwd()
+        self.temp_dir = tempfile.mkdtemp()
+        os.chdir(self.temp_dir)
+    
+    def tearDown(self):
+        
+        os.chdir(self.original_cwd)
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+    
+    def _entries(self, first, count):
+        
+        return [(f"tx{i:04d}", {"sender_id": "user", "receiver_id": "merchant", "amount": float(i), "timestamp": 1000.0 + i})
+                for i in range(first, first + count)]
+    
+    def test_batch_seals_when_full(self):
+        
+        blockchain = Blockchain.open("chain", batch_size=4, batch_interval=60)
+        self.assertIsNone(blockchain.add_transactions(self._entries(0, 3)))
+        self.assertEqual(len(blockchain.chain), 1)
+        block = blockchain.add_transactions(self._entries(3, 2))
+        
+        self.assertIsNotNone(block)
+        self.assertEqual(len(blockchain.chain), 2)
+        self.assertEqual(len(block.entries()), 5)
+        self.assertEqual(blockchain.pending, [])
+        self.assertTrue(blockchain.is_chain_valid())
+    
+    def test_batch_seals_when_old(self):
+        
+        blockchain = Blockchain.open("chain", batch_size=100, batch_interval=5)
+        with mock.patch("bank_server.blockchain.time.monotonic", return_value=100.0):
+            blockchain.add_transactions(self._entries(0, 1))
+        with mock.patch("bank_server.blockchain.time.monotonic", return_value=103.0):
+            self.assertFalse(blockchain.seal_due())
+        with mock.patch("bank_server.blockchain.time.monotonic", return_value=106.0):
+            self.assertTrue(blockchain.seal_due())
+            block = blockchain.add_transactions(self._entries(1, 1))
+        self.assertEqual([entry["transaction_id"] for entry in block.entries()], ["tx0000", "tx0001"])
+    
+    def test_transactions_are_found_before_and_after_sealing(self):
+        
+        blockchain = Blockchain.open("chain", batch_size=100, batch_interval=60)
+        blockchain.add_transactions(self._entries(0, 10))
+        self.assertEqual(blockchain.find_transaction("tx0007")["amount"], 7.0)
+        self.assertIsNone(blockchain.transaction_proof("tx0007"))
+        self.assertEqual([entry[1] for entry in blockchain.account_history("user", 2)], ["tx0009", "tx0008"])
+        
+        blockchain.seal()
+        blockchain.close()
+        reopened = Blockchain.open("chain")
+        self.assertEqual(reopened.find_transaction("tx0007")["amount"], 7.0)
+        self.assertEqual([entry[1] for entry in reopened.account_history("merchant", 2)], ["tx0009", "tx0008"])
+    
+    def test_proof_verifies_against_block_header(self):
+        
+        blockchain = Blockchain.open("chain", batch_size=100, batch_interval=60)
+        blockchain.add_transactions(self._entries(0, 13))
+        block = blockchain.seal()
+        
+        proof = json.loads(json.dumps(blockchain.transaction_proof("tx0005")))
+        self.assertEqual(proof["block"]["hash"], block.hash)
+        self.assertLessEqual(len(proof["path"]), 4)
+        self.assertTrue(verify_transaction_proof("tx0005", self._entries(5, 1)[0][1], proof))
+        self.assertFalse(verify_transaction_proof("tx0005", {"amount": 5000.0}, proof))
+        
+        proof["block"]["timestamp"] += 1
+        self.assertFalse(verify_transaction_proof("tx0005", self._entries(5, 1)[0][1], proof))
+    
+    def test_tampered_batch_fails_verification(self):
+        
+        blockchain = Blockchain(batch_size=100, batch_interval=60)
+        blockchain.add_transactions(self._entries(0, 6))
+        blockchain.seal()
+        self.assertTrue(blockchain.is_chain_valid())
+        
+        blockchain.chain[1].transaction_data["transactions"][2]["transaction_data"]["amount"] = 500.0
+        self.assertFalse(blockchain.is_chain_valid())
+    
+    def test_pending_transactions_survive_restart(self):
+        
+        blockchain = Blockchain.open("chain", batch_size=100, batch_interval=60)
+        blockchain.add_transactions(self._entries(0, 3))
+        # Simulate a crash: nothing is sealed or closed.
+        blockchain._journal.close()
+        
+        reopened = Blockchain.open("chain", batch_size=100, batch_interval=60)
+        self.assertEqual([entry["transaction_id"] for entry in reopened.pending], ["tx0000", "tx0001", "tx0002"])
+        reopened.seal()
+        reopened.close()
+        
+        with open(os.path.join("chain", PENDING_FILE), "rb") as f:
+            self.assertEqual(f.read(), b"")
+        self.assertEqual(Blockchain.open("chain").pending, [])
+
+if __name__ == "__main__":
+    unittest.main()
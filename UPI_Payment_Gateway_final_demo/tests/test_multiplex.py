@@ -0,0 +1,101 @@
+import sys
+import os
+import unittest
+import threading
+import time
+
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bank_server.network import BankServerNetwork
+from common.multiplex import MultiplexedClient, RequestTimeout
+from common.network_protocol import Message
+
+def delayed_echo_handler(message):
+    
+    time.sleep(message.data.get("delay", 0))
+    return Message("ECHO_RESPONSE", "BANK_SERVER", message.sender, message.data, message.message_id)
+
+class MultiplexedClientTests:
+    
+    mode = None
+    
+    def setUp(self):
+        
+        self.server = BankServerNetwork(mode=self.mode, host="127.0.0.1", port=0, executor_workers=16)
+        self.server.register_handler("ECHO", delayed_echo_handler)
+        self.server.start_server()
+        self.client = MultiplexedClient("127.0.0.1", self.server.port, default_timeout=5.0)
+    
+    def tearDown(self):
+        
+        self.client.close()
+        self.server.stop()
+    
+    def test_pipelined_requests_share_one_connection(self):
+        
+        futures = []
+        start = time.perf_counter()
+        for i in range(10):
+            message = Message("ECHO", "UPI_MACHINE", "BANK_SERVER", {"i": i, "delay": 0.2}, f"req-{i}")
+            futures.append(self.client.submit(message))
+        responses = [future.result() for future in futures]
+        elapsed = time.perf_counter() - start
+        
+        self.assertEqual([r.message_id for r in responses], [f"req-{i}" for i in range(10)])
+        self.assertEqual([r.data["i"] for r in responses], list(range(10)))
+        self.assertLess(elapsed, 1.0)
+    
+    def test_responses_routed_out_of_order(self):
+        
+        slow = self.client.submit(Message("ECHO", "UPI_MACHINE", "BANK_SERVER", {"delay": 0.3}, "slow"))
+        fast = self.client.submit(Message("ECHO", "UPI_MACHINE", "BANK_SERVER", {"delay": 0.0}, "fast"))
+        
+        self.assertEqual(fast.result(timeout=2).message_id, "fast")
+        self.assertFalse(slow.done())
+        self.assertEqual(slow.result(timeout=2).message_id, "slow")
+    
+    def test_request_timeout(self):
+        
+        message = Message("ECHO", "UPI_MACHINE", "BANK_SERVER", {"delay": 0.5}, "late")
+        with self.assertRaises(RequestTimeout):
+            self.client.request(message, timeout=0.1)
+        self.assertEqual(self.client.in_flight(), 0)
+        
+        response = self.client.request(Message("ECHO", "UPI_MACHINE", "BANK_SERVER", {}, "next"))
+        self.assertEqual(response.message_id, "next")
+    
+    def test_cancel(self):
+        
+        future = self.client.submit(Message("ECHO", "UPI_MACHINE", "BANK_SERVER", {"delay": 0.3}, "cancel-me"))
+        self.assertTrue(self.client.cancel("cancel-me"))
+        self.assertTrue(future.cancelled())
+        self.assertEqual(self.client.in_flight(), 0)
+        self.assertFalse(self.client.cancel("unknown"))
+    
+    def test_concurrent_callers(self):
+        
+        results = {}
+        
+        def caller(i):
+            response = self.client.request(Message("ECHO", "UPI_MACHINE", "BANK_SERVER", {"i": i}, None))
+            results[i] = response.data["i"]
+        
+        threads = [threading.Thread(target=caller, args=(i,)) for i in range(40)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        self.assertEqual(results, {i: i for i in range(40)})
+
+class TestMultiplexedClientThreadedServer(MultiplexedClientTests, unittest.TestCase):
+    
+    mode = "threaded"
+
+class TestMultiplexedClientAsyncioServer(MultiplexedClientTests, unittest.TestCase):
+    
+    mode = "asyncio"
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,162 @@
+import sys
+import os
+import unittest
+import socket
+import threading
+
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bank_server.network import BankServerNetwork
+from user_device.network import UserDeviceNetwork
+from common.network_protocol import (
+    Message, BINARY_CODEC, open_connection, read_message, recv_frame, write_message
+)
+
+def echo_handler(message):
+    
+    return Message(
+        message_type=f"{message.message_type}_RESPONSE",
+        sender="BANK_SERVER",
+        receiver=message.sender,
+        data=message.data,
+        message_id=message.message_id
+    )
+
+class BankServerNetworkTests:
+    
+    mode = None
+    
+    def setUp(self):
+        
+        self.network = BankServerNetwork(mode=self.mode, host="127.0.0.1", port=0, backlog=64)
+        self.network.register_handler("ECHO", echo_handler)
+        self.network.register_handler("PING", echo_handler, blocking=False)
+        self.network.start_server()
+    
+    def tearDown(self):
+        
+        self.network.stop()
+    
+    def test_request_response(self):
+        
+        message = Message("ECHO", "TEST_CLIENT", "BANK_SERVER", {"amount": 100.0}, "echo1")
+        response = self.network.send_message("127.0.0.1", self.network.port, message)
+        
+        self.assertEqual(response.message_type, "ECHO_RESPONSE")
+        self.assertEqual(response.message_id, "echo1")
+        self.assertEqual(response.data["amount"], 100.0)
+    
+    def test_multiple_messages_per_connection(self):
+        
+        client_socket = socket.create_connection(("127.0.0.1", self.network.port))
+        try:
+            for i in range(5):
+                message_type = "PING" if i % 2 else "ECHO"
+                write_message(client_socket, Message(message_type, "TEST_CLIENT", "BANK_SERVER", {"i": i}, str(i)))
+                response = read_message(client_socket)
+                self.assertEqual(response.message_id, str(i))
+                self.assertEqual(response.data["i"], i)
+        finally:
+            client_socket.close()
+    
+    def test_concurrent_clients(self):
+        
+        results = []
+        
+        def client(i):
+            message = Message("ECHO", "TEST_CLIENT", "BANK_SERVER", {"i": i}, str(i))
+            response = self.network.send_message("127.0.0.1", self.network.port, message)
+            results.append(response.data["i"] if response else None)
+        
+        threads = [threading.Thread(target=client, args=(i,)) for i in range(50)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        self.assertEqual(sorted(results), list(range(50)))
+
+class TestThreadedBankServerNetwork(BankServerNetworkTests, unittest.TestCase):
+    
+    mode = "threaded"
+
+class TestAsyncioBankServerNetwork(BankServerNetworkTests, unittest.TestCase):
+    
+    mode = "asyncio"
+    
+    def test_blocking_handlers_run_in_executor(self):
+        
+        handler_threads = {}
+        
+        def record_thread(message):
+            handler_threads[message.message_type] = threading.current_thread()
+            return echo_handler(message)
+        
+        self.network.register_handler("SLOW", record_thread)
+        self.network.register_handler("FAST", record_thread, blocking=False)
+        
+        for message_type in ("SLOW", "FAST"):
+            message = Message(message_type, "TEST_CLIENT", "BANK_SERVER", {}, message_type)
+            self.network.send_message("127.0.0.1", self.network.port, message)
+        
+        self.assertTrue(handler_threads["SLOW"].name.startswith("bank-handler"))
+        self.assertIs(handler_threads["FAST"], self.network._loop_thread)
+    
+    def test_invalid_mode(self):
+        
+        with self.assertRaises(ValueError):
+            BankServerNetwork(mode="forking")
+
+class TestUserDeviceNetwork(unittest.TestCase):
+    
+    def setUp(self):
+        
+        self.network = UserDeviceNetwork()
+        self.network.host = "127.0.0.1"
+        self.network.port = 0
+        self.network.register_handler("ECHO", echo_handler)
+        self.network.start_server()
+    
+    def tearDown(self):
+        
+        self.network.stop()
+    
+    def test_request_response(self):
+        
+        client_socket = socket.create_connection(("127.0.0.1", self.network.port))
+        try:
+            write_message(client_socket, Message("ECHO", "TEST_CLIENT", "USER_DEVICE", {"amount": 100.0}, "echo1"))
+            response = read_message(client_socket)
+        finally:
+            client_socket.close()
+        
+        self.assertEqual(response.message_type, "ECHO_RESPONSE")
+        self.assertEqual(response.message_id, "echo1")
+        self.assertEqual(response.data["amount"], 100.0)
+    
+    def test_replies_use_negotiated_codec(self):
+        
+        client_socket, codec = open_connection("127.0.0.1", self.network.port)
+        try:
+            self.assertIs(codec, BINARY_CODEC)
+            write_message(client_socket, Message("ECHO", "TEST_CLIENT", "USER_DEVICE", {"signature": b"\x00\xff"}, "b1"), codec)
+            response = BINARY_CODEC.decode(recv_frame(client_socket))
+        finally:
+            client_socket.close()
+        
+        self.assertEqual(response.message_id, "b1")
+        self.assertEqual(response.data["signature"], b"\x00\xff")
+    
+    def test_unhandled_message_gets_no_reply(self):
+        
+        client_socket = socket.create_connection(("127.0.0.1", self.network.port))
+        try:
+            write_message(client_socket, Message("UNKNOWN", "TEST_CLIENT", "USER_DEVICE", {}, "u1"))
+            write_message(client_socket, Message("ECHO", "TEST_CLIENT", "USER_DEVICE", {"i": 1}, "e1"))
+            self.assertEqual(read_message(client_socket).message_id, "e1")
+        finally:
+            client_socket.close()
+
+if __name__ == "__main__":
+    unittest.main()
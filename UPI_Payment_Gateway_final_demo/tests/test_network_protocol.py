@@ -1,11 +1,17 @@
 import sys
 import os
 import unittest
+import socket
+import threading
 
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from common.network_protocol import Message
+from common.network_protocol import (
+    Message, FramingError, CodecError, FRAME_HEADER, encode_frame, send_frame, recv_frame,
+    read_message, write_message, BINARY_CODEC, JSON_CODEC, decode_message,
+    negotiation_response, open_connection, CODEC_NEGOTIATION
+)
 
 class TestNetworkProtocol(unittest.TestCase):
     
@@ -55,7 +61,129 @@ class TestNetworkProtocol(unittest.TestCase):
         
         self.assertEqual(reconstructed_message.data["text"], "Hello")
         
+    def test_frame_roundtrip(self):
+        
+        left, right = socket.socketpair()
+        try:
+            send_frame(left, b"hello")
+            send_frame(left, b"")
+            send_frame(left, b"world")
+            
+            self.assertEqual(recv_frame(right), b"hello")
+            self.assertEqual(recv_frame(right), b"")
+            self.assertEqual(recv_frame(right), b"world")
+            
+            left.close()
+            self.assertIsNone(recv_frame(right))
+        finally:
+            right.close()
+    
+    def test_large_message_split_across_reads(self):
+        
+        history = [{"transaction_id": f"tx{i}", "amount": float(i)} for i in range(5000)]
+        original_message = Message(
+            message_type="HISTORY",
+            sender="BANK_SERVER",
+            receiver="USER_DEVICE",
+            data={"transactions": history},
+            message_id="hist1"
+        )
+        
+        left, right = socket.socketpair()
+        try:
+            writer = threading.Thread(target=write_message, args=(left, original_message))
+            writer.start()
+            reconstructed_message = read_message(right)
+            writer.join()
+        finally:
+            left.close()
+            right.close()
+        
+        self.assertEqual(reconstructed_message.message_id, "hist1")
+        self.assertEqual(reconstructed_message.data["transactions"], history)
+    
+    def test_truncated_frame(self):
+        
+        left, right = socket.socketpair()
+        try:
+            left.sendall(encode_frame(b"0123456789")[:FRAME_HEADER.size + 4])
+            left.close()
+            with self.assertRaises(FramingError):
+                recv_frame(right)
+        finally:
+            right.close()
+    
+    def test_oversized_frame_rejected(self):
+        
+        left, right = socket.socketpair()
+        try:
+            left.sendall(FRAME_HEADER.pack(0xFFFFFFFF))
+            with self.assertRaises(FramingError):
+                recv_frame(right)
+        finally:
+            left.close()
+            right.close()
+
+    def test_binary_codec_roundtrip(self):
+        
+        data = {
+            "sender_id": "b2e08dc8c61283d4",
+            "amount": 1234.5,
+            "count": 7,
+            "negative": -42,
+            "large": 2 ** 70,
+            "flag": True,
+            "missing": None,
+            "signature": b"\x00\xffraw bytes",
+            "items": [1, "two", 3.0, [False], {"nested": b"\x01"}]
+        }
+        flat_data = {k: v for k, v in data.items() if k != "items"}
+        original_message = Message("PROCESS_TRANSACTION", "UPI_MACHINE", "BANK_SERVER", data, "bin1")
+        
+        payload = BINARY_CODEC.encode(original_message)
+        reconstructed_message = decode_message(payload)
+        
+        self.assertEqual(reconstructed_message.message_type, "PROCESS_TRANSACTION")
+        self.assertEqual(reconstructed_message.sender, "UPI_MACHINE")
+        self.assertEqual(reconstructed_message.receiver, "BANK_SERVER")
+        self.assertEqual(reconstructed_message.message_id, "bin1")
+        self.assertEqual(reconstructed_message.data, data)
+        self.assertIsInstance(reconstructed_message.data["signature"], bytes)
+        
+        flat_message = Message("PROCESS_TRANSACTION", "UPI_MACHINE", "BANK_SERVER", flat_data, "bin1")
+        self.assertLess(len(BINARY_CODEC.encode(flat_message)), len(JSON_CODEC.encode(flat_message)))
+    
+    def test_codec_detection(self):
         
+        message = Message("VERIFY_PIN", "USER_DEVICE", "BANK_SERVER", {"pin": "1234"}, None)
+        self.assertEqual(decode_message(JSON_CODEC.encode(message)).data, {"pin": "1234"})
+        self.assertEqual(decode_message(BINARY_CODEC.encode(message)).data, {"pin": "1234"})
+        
+        with self.assertRaises(CodecError):
+            decode_message(BINARY_CODEC.encode(message)[:-3])
+    
+    def test_codec_negotiation(self):
+        
+        offer = Message(CODEC_NEGOTIATION, "CLIENT", "SERVER", {"codecs": ["msgpack", "binary", "json"]}, "n1")
+        response, codec = negotiation_response(offer)
+        self.assertIs(codec, BINARY_CODEC)
+        self.assertEqual(response.data["codec"], "binary")
+        
+        offer.data["codecs"] = ["msgpack"]
+        _, codec = negotiation_response(offer)
+        self.assertIs(codec, JSON_CODEC)
+    
+    def test_negotiation_falls_back_to_json_for_silent_peer(self):
+        
+        listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        listener.bind(("127.0.0.1", 0))
+        listener.listen(4)
+        try:
+            sock, codec = open_connection("127.0.0.1", listener.getsockname()[1], negotiation_timeout=0.1)
+            sock.close()
+            self.assertIs(codec, JSON_CODEC)
+        finally:
+            listener.close()
 
 if __name__ == "__main__":
     unittest.main()
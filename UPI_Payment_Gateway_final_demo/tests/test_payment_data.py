@@ -3,21 +3,33 @@ import os
 import unittest
 import json
 import base64
+import shutil
+import tempfile
 
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from upi_machine.qr_generator import generate_payment_data, save_data_to_file
+from upi_machine.lwc import vmid_keys
 from common.crypto import encrypt_data, decrypt_data
 
 class TestPaymentData(unittest.TestCase):
     
+    def setUp(self):
+        
+        self.temp_dir = tempfile.mkdtemp()
+        self.keys = vmid_keys(os.path.join(self.temp_dir, "vmid.key"))
+    
+    def tearDown(self):
+        
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+    
     def test_payment_data_generation(self):
         
         merchant_id = "1234567890"
         
         
-        payment_data = generate_payment_data(merchant_id)
+        payment_data = generate_payment_data(merchant_id, keys=self.keys)
         self.assertIsNotNone(payment_data)
         self.assertIsInstance(payment_data, str)
         
@@ -29,7 +41,7 @@ class TestPaymentData(unittest.TestCase):
         self.assertIn("tag", payment_dict)
         
         
-        payment_data_with_amount = generate_payment_data(merchant_id, amount=100.0, description="Test payment")
+        payment_data_with_amount = generate_payment_data(merchant_id, amount=100.0, description="Test payment", keys=self.keys)
         self.assertIsNotNone(payment_data_with_amount)
         
         
@@ -3,15 +3,27 @@ import os
 import unittest
 import json
 import base64
+import shutil
+import tempfile
 
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from user_device.payment_parser import parse_payment_data
 from upi_machine.qr_generator import generate_payment_data
+from upi_machine.lwc import vmid_keys
 
 class TestPaymentParser(unittest.TestCase):
     
+    def setUp(self):
+        
+        self.temp_dir = tempfile.mkdtemp()
+        self.keys = vmid_keys(os.path.join(self.temp_dir, "vmid.key"))
+    
+    def tearDown(self):
+        
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+    
     def test_payment_data_parsing(self):
         
         
@@ -20,7 +32,7 @@ class TestPaymentParser(unittest.TestCase):
         description = "Test payment"
         
         
-        payment_data = generate_payment_data(merchant_id, amount, description)
+        payment_data = generate_payment_data(merchant_id, amount, description, keys=self.keys)
         
         
         parsed_data = parse_payment_data(payment_data)
@@ -3,20 +3,35 @@ import os
 import unittest
 import json
 import base64
+import shutil
+import tempfile
 
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from upi_machine.qr_generator import generate_payment_data, generate_qr_code, save_data_to_file, save_qr_to_file
+from unittest import mock
+
+from upi_machine.qr_generator import generate_payment_data, generate_qr_code, save_data_to_file, save_qr_to_file, decrypt_vmid_to_mid
+from upi_machine.vmid_sessions import VMIDSessionStore
+from upi_machine.lwc import vmid_keys
 
 class TestQRGenerator(unittest.TestCase):
     
+    def setUp(self):
+        
+        self.temp_dir = tempfile.mkdtemp()
+        self.keys = vmid_keys(os.path.join(self.temp_dir, "vmid.key"))
+    
+    def tearDown(self):
+        
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+    
     def test_payment_data_generation(self):
         
         merchant_id = "1234567890abcdef"
         
         
-        payment_data, vmid = generate_payment_data(merchant_id)
+        payment_data, vmid = generate_payment_data(merchant_id, keys=self.keys)
         self.assertIsNotNone(payment_data)
         self.assertIsNotNone(vmid)
         
@@ -28,7 +43,7 @@ class TestQRGenerator(unittest.TestCase):
         self.assertIn("tag", payment_dict)
         
         
-        payment_data_with_amount, vmid = generate_payment_data(merchant_id, amount=100.0, description="Test payment")
+        payment_data_with_amount, vmid = generate_payment_data(merchant_id, amount=100.0, description="Test payment", keys=self.keys)
         self.assertIsNotNone(payment_data_with_amount)
         
         
@@ -63,5 +78,50 @@ class TestQRGenerator(unittest.TestCase):
         except ImportError:
             self.skipTest("qrcode library not installed")
 
+class TestVMIDPaymentWindow(unittest.TestCase):
+    
+    def setUp(self):
+        
+        self.temp_dir = tempfile.mkdtemp()
+        self.keys = vmid_keys(os.path.join(self.temp_dir, "vmid.key"))
+        self.now = 1700000000.0
+        patcher = mock.patch("time.time", lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.sessions = VMIDSessionStore(clock=lambda: self.now)
+        
+        payment_data, self.vmid = generate_payment_data("0123456789abcdef", sessions=self.sessions, keys=self.keys)
+        payment = json.loads(payment_data)
+        self.timestamp, self.nonce = int(payment["timestamp"]), payment["nonce"]
+    
+    def tearDown(self):
+        
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+    
+    def decrypt(self, nonce=None, sessions=None):
+        
+        return decrypt_vmid_to_mid(self.vmid, self.timestamp, nonce, sessions, keys=self.keys)
+    
+    def test_resolves_within_window(self):
+        
+        self.assertEqual(self.decrypt(self.nonce, self.sessions), "0123456789abcdef")
+        self.assertEqual(self.decrypt(), "0123456789abcdef")
+    
+    def test_session_store_requires_nonce(self):
+        
+        self.assertIsNone(self.decrypt(None, self.sessions))
+    
+    def test_malformed_timestamp_is_rejected(self):
+        
+        for timestamp in ("not-a-ts", None):
+            self.assertIsNone(decrypt_vmid_to_mid(self.vmid, timestamp, self.nonce, self.sessions, keys=self.keys))
+            self.assertIsNone(decrypt_vmid_to_mid(self.vmid, timestamp, keys=self.keys))
+    
+    def test_expired_vmid_is_rejected_without_session(self):
+        
+        self.now += 4000
+        self.assertIsNone(self.decrypt(self.nonce, self.sessions))
+        self.assertIsNone(self.decrypt())
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,143 @@
+import sys
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bank_server.bank_manager import BankManager
+from bank_server.storage import SqliteStorage, Storage, create_storage
+
+class StorageTestCase(unittest.TestCase):
+    
+    def setUp(self):
+        
+        self.original_cwd = os.getcwd()
+        self.temp_dir = tempfile.mkdtemp()
+        os.chdir(self.temp_dir)
+        self.managers = []
+    
+    def tearDown(self):
+        
+        for bank_manager in self.managers:
+            bank_manager.close()
+        os.chdir(self.original_cwd)
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+    
+    def _bank_manager(self, backend):
+        
+        bank_manager = BankManager(storage_backend=backend)
+        bank_manager.initialize()
+        self.managers.append(bank_manager)
+        return bank_manager
+    
+    def _register(self, bank_manager, balance=200.0):
+        
+        _, user_id = bank_manager.register_user(
+            name="Storage User",
+            bank_code="SBIN0000001",
+            mobile_number="9000000004",
+            password="user",
+            pin="4444",
+            initial_balance=balance
+        )
+        _, merchant_id = bank_manager.register_merchant(
+            name="Storage Merchant",
+            bank_code="HDFC0000001",
+            password="merchant"
+        )
+        return user_id, merchant_id
+
+class TestSqliteStorage(StorageTestCase):
+    
+    def test_startup_does_not_load_accounts(self):
+        
+        bank_manager = self._bank_manager("sqlite")
+        user_id, merchant_id = self._register(bank_manager)
+        
+        reopened = self._bank_manager("sqlite")
+        self.assertEqual(reopened.users.cached(), [])
+        self.assertEqual(reopened.merchants.cached(), [])
+        
+        self.assertEqual(reopened.users[user_id].name, "Storage User")
+        self.assertEqual(reopened.mmid_to_uid[reopened.users[user_id].mmid], user_id)
+        self.assertIn(merchant_id, reopened.merchants)
+        self.assertNotIn("missing", reopened.merchants)
+        self.assertEqual(len(reopened.merchants), 1)
+    
+    def test_payments_are_written_through(self):
+        
+        bank_manager = self._bank_manager("sqlite")
+        user_id, merchant_id = self._register(bank_manager)
+        
+        success, transaction_id = bank_manager.process_transaction(user_id, merchant_id, 75.0)
+        self.assertTrue(success)
+        results = bank_manager.process_transaction_batch([
+            {"sender_id": user_id, "receiver_id": merchant_id, "amount": 25.0},
+            {"sender_id": user_id, "receiver_id": "new-merchant", "amount": 10.0},
+        ])
+        self.assertTrue(all(ok for ok, _ in results))
+        
+        reopened = self._bank_manager("sqlite")
+        self.assertEqual(reopened.users[user_id].balance, 90.0)
+        self.assertEqual(reopened.merchants[merchant_id].balance, 100.0)
+        self.assertEqual(reopened.merchants["new-merchant"].balance, 10.0)
+        self.assertEqual(reopened.transactions[transaction_id]["amount"], 75.0)
+        self.assertEqual(len(reopened.transactions), 3)
+    
+    def test_one_shot_migration_from_json(self):
+        
+        source = self._bank_manager("json")
+        user_id, merchant_id = self._register(source)
+        source.process_transaction(user_id, merchant_id, 60.0)
+        source.storage.ledger_log.close()
+        source.storage.save_banks(source.banks)
+        
+        migrated = self._bank_manager("sqlite")
+        self.assertEqual(migrated.users[user_id].balance, 140.0)
+        self.assertEqual(migrated.merchants[merchant_id].balance, 60.0)
+        self.assertEqual(len(migrated.storage.load_banks()), len(source.banks))
+        
+        # Later edits to the JSON files are not migrated a second time.
+        source.register_user(name="Late User", bank_code="SBIN0000001", mobile_number="9000000005",
+                             password="late", pin="5555")
+        with sqlite3.connect("bank.db") as connection:
+            count = connection.execute("SELECT COUNT(*) FROM users").fetchone()[0]
+        self._bank_manager("sqlite")
+        with sqlite3.connect("bank.db") as connection:
+            self.assertEqual(connection.execute("SELECT COUNT(*) FROM users").fetchone()[0], count)
+    
+    def test_database_uses_wal(self):
+        
+        storage = SqliteStorage("wal.db")
+        storage.load()
+        mode = storage.connection().execute("PRAGMA journal_mode").fetchone()[0]
+        storage.close()
+        self.assertEqual(mode, "wal")
+    
+    def test_unknown_backend(self):
+        
+        with self.assertRaises(ValueError):
+            create_storage("csv")
+    
+    def test_only_json_lookups_stay_in_memory(self):
+        
+        self.assertTrue(self._bank_manager("json").storage.in_memory)
+        self.assertFalse(self._bank_manager("sqlite").storage.in_memory)
+    
+    def test_incomplete_backend_fails_on_creation(self):
+        
+        class PartialStorage(Storage):
+            
+            def load(self):
+                
+                pass
+        
+        with self.assertRaises(TypeError):
+            PartialStorage()
+
+if __name__ == "__main__":
+    unittest.main()
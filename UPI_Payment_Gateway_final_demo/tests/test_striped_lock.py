@@ -0,0 +1,145 @@
+import sys
+import os
+import random
+import shutil
+import tempfile
+import threading
+import unittest
+
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common.striped_lock import StripedLock
+from common.models import User, Merchant
+from bank_server.bank_manager import BankManager
+
+class TestStripedLock(unittest.TestCase):
+    
+    def test_same_key_maps_to_same_stripe(self):
+        
+        locks = StripedLock(8)
+        self.assertEqual(locks.stripe_for("abc"), locks.stripe_for("abc"))
+        self.assertTrue(0 <= locks.stripe_for("abc") < 8)
+    
+    def test_opposite_order_pairs_do_not_deadlock(self):
+        
+        locks = StripedLock(4)
+        keys = [f"account{i}" for i in range(16)]
+        errors = []
+        
+        def worker(seed):
+            rng = random.Random(seed)
+            try:
+                for _ in range(2000):
+                    first, second = rng.sample(keys, 2)
+                    with locks.acquire(first, second):
+                        pass
+            except Exception as e:
+                errors.append(e)
+        
+        threads = [threading.Thread(target=worker, args=(seed,)) for seed in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(timeout=30)
+        
+        self.assertFalse(any(thread.is_alive() for thread in threads))
+        self.assertEqual(errors, [])
+    
+    def test_acquire_all_excludes_keyed_holders(self):
+        
+        locks = StripedLock(4)
+        acquired = threading.Event()
+        
+        def worker():
+            with locks.acquire("key"):
+                acquired.set()
+        
+        with locks.acquire_all():
+            thread = threading.Thread(target=worker, daemon=True)
+            thread.start()
+            self.assertFalse(acquired.wait(0.1))
+        self.assertTrue(acquired.wait(5))
+    
+    def test_rejects_zero_stripes(self):
+        
+        with self.assertRaises(ValueError):
+            StripedLock(0)
+
+class TestConcurrentPayments(unittest.TestCase):
+    
+    USERS = 40
+    MERCHANTS = 20
+    THREADS = 8
+    PAYMENTS_PER_THREAD = 300
+    
+    def setUp(self):
+        
+        self.original_cwd = os.getcwd()
+        self.temp_dir = tempfile.mkdtemp()
+        os.chdir(self.temp_dir)
+        
+        self.bank_manager = BankManager()
+        self.bank_manager.initialize()
+        self.bank_manager.merchant_directory.stop()
+        for i in range(self.USERS):
+            uid = f"user{i:04d}"
+            self.bank_manager.users[uid] = User(
+                uid=uid, name=uid, mmid=uid, pin="", account_number=uid,
+                bank_code="SBIN0000001", mobile_number="", password="", balance=500.0
+            )
+        for i in range(self.MERCHANTS):
+            mid = f"merchant{i:04d}"
+            bank_code = "HDFC0000001" if i % 2 else "ICIC0000001"
+            self.bank_manager.merchants[mid] = Merchant(
+                mid=mid, name=mid, account_number=mid, bank_code=bank_code, balance=0.0
+            )
+    
+    def tearDown(self):
+        
+        self.bank_manager.ledger_log.close()
+        os.chdir(self.original_cwd)
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+    
+    def _total(self):
+        
+        return (sum(user.balance for user in self.bank_manager.users.values()) +
+                sum(merchant.balance for merchant in self.bank_manager.merchants.values()))
+    
+    def test_money_is_conserved(self):
+        
+        total_before = self._total()
+        succeeded = []
+        errors = []
+        
+        def worker(seed):
+            rng = random.Random(seed)
+            try:
+                for _ in range(self.PAYMENTS_PER_THREAD):
+                    sender_id = f"user{rng.randrange(self.USERS):04d}"
+                    receiver_id = f"merchant{rng.randrange(self.MERCHANTS):04d}"
+                    success, _ = self.bank_manager.process_transaction(sender_id, receiver_id, float(rng.randint(1, 40)))
+                    if success:
+                        succeeded.append(1)
+            except Exception as e:
+                errors.append(e)
+        
+        threads = [threading.Thread(target=worker, args=(seed,)) for seed in range(self.THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(timeout=120)
+        
+        self.assertFalse(any(thread.is_alive() for thread in threads))
+        self.assertEqual(errors, [])
+        self.assertAlmostEqual(self._total(), total_before, places=6)
+        self.assertTrue(all(user.balance >= 0 for user in self.bank_manager.users.values()))
+        self.assertEqual(len(self.bank_manager.transactions), len(succeeded))
+        
+        chain = self.bank_manager.blockchains["State Bank of India"]
+        self.bank_manager.seal_blockchains()
+        self.assertEqual(sum(len(block.entries()) for block in chain.chain[1:]), len(succeeded))
+        self.assertTrue(chain.is_chain_valid())
+
+if __name__ == "__main__":
+    unittest.main()
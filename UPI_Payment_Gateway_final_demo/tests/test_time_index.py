@@ -0,0 +1,143 @@
+
+import sys
+import os
+import hashlib
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bank_server.block_store import BlockStore
+from bank_server.blockchain import Blockchain
+from common.constants import BLOCKCHAIN
+
+BASE = 1700000000.0
+STRIDE = 4
+
+def transaction_id(i):
+    
+    return hashlib.sha256(f"tx{i}".encode()).hexdigest()
+
+def payment(i):
+    
+    return {
+        "transaction_id": transaction_id(i),
+        "sender_id": f"{i % 4:016x}",
+        "receiver_id": "d1df7809f269d037",
+        "amount": 10.0,
+        "description": "Payment via UPI",
+        "timestamp": BASE + i
+    }
+
+class TestTimeIndex(unittest.TestCase):
+    
+    def setUp(self):
+        
+        self.temp_dir = tempfile.mkdtemp()
+        self.directory = os.path.join(self.temp_dir, "chain")
+        self.blockchain = self._open()
+        # Batch b holds payments stamped BASE + 5b .. BASE + 5b + 4 and is
+        # sealed half a second after the last of them.
+        for batch in range(40):
+            self._seal(range(batch * 5, batch * 5 + 5), BASE + batch * 5 + 4.5)
+    
+    def tearDown(self):
+        
+        self.blockchain.close()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+    
+    def _open(self):
+        
+        # The genesis block of a new chain is stamped before every payment.
+        with mock.patch.dict(BLOCKCHAIN, {"TIME_INDEX_STRIDE": STRIDE}), \
+                mock.patch("bank_server.blockchain.time.time", return_value=BASE - 1):
+            return Blockchain(BlockStore(self.directory, segment_max_bytes=2048))
+    
+    def _reopen(self):
+        
+        self.blockchain.close()
+        self.blockchain = self._open()
+    
+    def _seal(self, payments, timestamp):
+        
+        self.blockchain.add_transactions([(transaction_id(i), payment(i)) for i in payments])
+        with mock.patch("bank_server.blockchain.time.time", return_value=timestamp):
+            return self.blockchain.seal()
+    
+    def _scan(self, start_time, end_time):
+        
+        return [(position, block.hash) for position, block in enumerate(self.blockchain.chain)
+                if start_time <= block.timestamp < end_time]
+    
+    def test_blocks_between_matches_a_full_scan(self):
+        
+        for start_time, end_time in [(BASE, BASE + 50), (BASE + 17, BASE + 93.2), (BASE + 4.5, BASE + 9.5),
+                                     (BASE + 190, BASE + 1000), (BASE + 500, BASE + 600), (BASE + 60, BASE + 60)]:
+            found = [(position, block.hash) for position, block in self.blockchain.blocks_between(start_time, end_time)]
+            self.assertEqual(found, self._scan(start_time, end_time))
+    
+    def test_position_at_reads_at_most_one_stride(self):
+        
+        self.blockchain.position_at(BASE)
+        store = self.blockchain.store
+        with mock.patch.object(store, "timestamp_at", wraps=store.timestamp_at) as timestamp_at:
+            self.assertEqual(self.blockchain.position_at(BASE + 100), 21)
+            self.assertLessEqual(timestamp_at.call_count, STRIDE + 1)
+        self.assertEqual(self.blockchain.position_at(BASE - 1), 0)
+        self.assertEqual(self.blockchain.position_at(BASE + 1000), len(self.blockchain.chain))
+    
+    def test_transactions_between_cuts_inside_a_batch(self):
+        
+        self.blockchain.add_transactions([(transaction_id(200), payment(200))])
+        
+        window = self.blockchain.transactions_between(BASE + 12, BASE + 17)
+        self.assertEqual([entry[1] for entry in window], [transaction_id(i) for i in range(12, 17)])
+        # Payments still waiting for their batch are settled too.
+        window = self.blockchain.transactions_between(BASE + 198, BASE + 300)
+        self.assertEqual([entry[1] for entry in window], [transaction_id(i) for i in (198, 199, 200)])
+    
+    def test_index_is_reused_and_rebuilt_after_reopen(self):
+        
+        expected = self._scan(BASE + 33, BASE + 77)
+        self.blockchain.position_at(BASE)
+        self._reopen()
+        self.assertEqual([(position, block.hash) for position, block in self.blockchain.blocks_between(BASE + 33, BASE + 77)], expected)
+        self.assertEqual(len(self.blockchain.times.samples), -(-len(self.blockchain.chain) // STRIDE))
+        
+        # An index longer than the chain it was built for is thrown away.
+        self.blockchain.close()
+        with open(self.blockchain.times.path, "ab") as f:
+            f.write(b"\0" * 8 * 100)
+        self.blockchain = self._open()
+        self.assertEqual([(position, block.hash) for position, block in self.blockchain.blocks_between(BASE + 33, BASE + 77)], expected)
+        self.assertEqual(len(self.blockchain.times.samples), -(-len(self.blockchain.chain) // STRIDE))
+    
+    def test_new_blocks_are_indexed_as_they_are_added(self):
+        
+        self.blockchain.position_at(BASE)
+        block = self._seal(range(200, 205), BASE + 204.5)
+        self.assertEqual(list(self.blockchain.blocks_between(BASE + 204, BASE + 205))[0][1].hash, block.hash)
+    
+    def test_clock_stepping_back_does_not_hide_blocks(self):
+        
+        later = self._seal([300], BASE + 1000)
+        self._seal([301], BASE + 999)
+        self.assertEqual(self.blockchain.chain[self.blockchain.position_at(BASE + 999.5)].hash, later.hash)
+    
+    def test_in_memory_chain(self):
+        
+        with mock.patch("bank_server.blockchain.time.time", return_value=BASE - 1):
+            blockchain = Blockchain(batch_size=1)
+        for i in range(10):
+            with mock.patch("bank_server.blockchain.time.time", return_value=BASE + i + 0.5):
+                blockchain.add_transactions([(transaction_id(i), payment(i))])
+        
+        self.assertEqual([position for position, _ in blockchain.blocks_between(BASE + 3, BASE + 6)], [4, 5, 6])
+        self.assertEqual([entry[1] for entry in blockchain.transactions_between(BASE + 3, BASE + 6)],
+                         [transaction_id(i) for i in range(3, 6)])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,113 @@
+
+import sys
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from upi_machine.vmid_sessions import VMIDSessionStore
+
+class FakeClock:
+    
+    def __init__(self, now=1700000000.0):
+        self.now = now
+    
+    def __call__(self):
+        
+        return self.now
+
+class TestVMIDSessionStore(unittest.TestCase):
+    
+    def setUp(self):
+        
+        self.temp_dir = tempfile.mkdtemp()
+        self.clock = FakeClock()
+        self.journal_path = os.path.join(self.temp_dir, "sessions.log")
+    
+    def tearDown(self):
+        
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+    
+    def test_same_second_sessions_do_not_collide(self):
+        
+        store = VMIDSessionStore(ttl=60, shards=8, clock=self.clock)
+        first = store.issue("1111111111111111", 1700000000)
+        second = store.issue("2222222222222222", 1700000000)
+        
+        self.assertNotEqual(first, second)
+        self.assertEqual(store.resolve(1700000000, first), "1111111111111111")
+        self.assertEqual(store.resolve("1700000000", second), "2222222222222222")
+        self.assertIsNone(store.resolve(1700000001, first))
+        self.assertIsNone(store.resolve("not-a-ts", first))
+        self.assertIsNone(store.resolve(None, first))
+        self.assertIsNone(store.resolve(1700000000, ["not", "hashable"]))
+    
+    def test_sessions_expire_after_the_payment_window(self):
+        
+        store = VMIDSessionStore(ttl=60, shards=8, tick=1.0, clock=self.clock)
+        nonces = [store.issue(f"{i:016x}", int(self.clock.now)) for i in range(100)]
+        self.clock.now += 30
+        late = store.issue("ffffffffffffffff")
+        
+        self.clock.now += 31
+        # Expired sessions stop resolving even before the wheel reaches them.
+        self.assertIsNone(store.resolve(1700000000, nonces[0]))
+        self.assertEqual(store.expire(), 100)
+        self.assertEqual(len(store), 1)
+        self.assertEqual(store.resolve(1700000030, late), "ffffffffffffffff")
+        
+        # A sweep after a long pause still finds everything that is due.
+        self.clock.now += 3600
+        self.assertEqual(store.expire(), 1)
+        self.assertEqual(len(store), 0)
+    
+    def test_journal_restores_live_sessions(self):
+        
+        store = VMIDSessionStore(ttl=60, shards=8, journal_path=self.journal_path, clock=self.clock)
+        old = store.issue("1111111111111111", 1700000000 - 50)
+        live = store.issue("2222222222222222", 1700000000)
+        store.close()
+        with open(self.journal_path, "ab") as f:
+            f.write(b'{"timestamp": 1700000000, "nonce": "no-mid"}\n')
+            f.write(b'[1, 2]\n')
+            f.write(b'{"timestamp": "x", "nonce": "n", "mid": "m", "expires": 1800000000}\n')
+            f.write(b'{"timestamp": 1700000000, "nonce": [1], "mid": "m", "expires": 1800000000}\n')
+            f.write(b'{"timestamp": 17000')
+        
+        self.clock.now += 20
+        recovered = VMIDSessionStore(ttl=60, shards=8, journal_path=self.journal_path, clock=self.clock)
+        self.assertEqual(len(recovered), 1)
+        self.assertIsNone(recovered.resolve(1700000000 - 50, old))
+        self.assertEqual(recovered.resolve(1700000000, live), "2222222222222222")
+        # Recovery leaves only the live sessions in the journal.
+        with open(self.journal_path, "rb") as f:
+            self.assertEqual(len(f.readlines()), 1)
+        recovered.close()
+    
+    def test_concurrent_issue_and_resolve(self):
+        
+        store = VMIDSessionStore(ttl=60, shards=16, clock=self.clock)
+        failures = []
+        
+        def terminal(number):
+            for i in range(200):
+                mid = f"{number:08x}{i:08x}"
+                nonce = store.issue(mid, 1700000000)
+                if store.resolve(1700000000, nonce) != mid:
+                    failures.append(mid)
+        
+        threads = [threading.Thread(target=terminal, args=(number,)) for number in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        self.assertEqual(failures, [])
+        self.assertEqual(len(store), 1600)
+
+if __name__ == "__main__":
+    unittest.main()
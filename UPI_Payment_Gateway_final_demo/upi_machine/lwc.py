@@ -1,18 +1,44 @@
-
 import struct
 import time
 import os
+import sys
 import json
+import hmac
+import hashlib
+from functools import lru_cache
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.constants import VMID
+
+MASK32 = 0xFFFFFFFF
+
+SPECK64_128_ROUNDS = 27
+
+# A relative VMID["KEY_FILE"] lives beside the UPI machine, not in the
+# directory the process happens to start from.
+UPI_MACHINE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Second byte of a v2 VMID: how the MID was packed before encryption.
+VMID_HEX = 0
+VMID_TEXT = 1
 
 def rotate_right(val, r_bits, max_bits=32):
     
-    return ((val & (2**max_bits-1)) >> r_bits % max_bits) | \
-           (val << (max_bits - (r_bits % max_bits)) & (2**max_bits-1))
+    mask = MASK32 if max_bits == 32 else (1 << max_bits) - 1
+    r_bits %= max_bits
+    return ((val & mask) >> r_bits) | ((val << (max_bits - r_bits)) & mask)
 
 def rotate_left(val, r_bits, max_bits=32):
     
-    return ((val << r_bits % max_bits) & (2**max_bits-1)) | \
-           ((val & (2**max_bits-1)) >> (max_bits - (r_bits % max_bits)))
+    mask = MASK32 if max_bits == 32 else (1 << max_bits) - 1
+    r_bits %= max_bits
+    return ((val << r_bits) & mask) | ((val & mask) >> (max_bits - r_bits))
 
 def speck_round(x, y, k):
     
@@ -37,21 +63,17 @@ def speck_encrypt(plaintext, key, rounds=10):
     """
     
     plaintext = plaintext.ljust(8, '\0')
-    key = key.ljust(8, '\0')
     
     
     x, y = struct.unpack("<II", plaintext[:8].encode())
     
     
-    k = struct.unpack("<II", key[:8].encode())[0]
+    k = legacy_key_word(key)
     
     
     for i in range(rounds):
-        x = rotate_right(x, 8)
-        x = (x + y) & 0xFFFFFFFF
-        x = x ^ k
-        y = rotate_left(y, 3)
-        y = y ^ x
+        x = (((x >> 8) | (x << 24)) + y) & MASK32 ^ k
+        y = ((y << 3) | (y >> 29)) & MASK32 ^ x
     
     
     return struct.pack("<II", x, y)
@@ -72,20 +94,145 @@ def speck_decrypt(ciphertext, key, rounds=10):
     x, y = struct.unpack("<II", ciphertext)
     
     
-    key = key.ljust(8, '\0')
-    k = struct.unpack("<II", key[:8].encode())[0]
+    k = legacy_key_word(key)
     
     
     for i in range(rounds):
-        y = y ^ x
-        y = rotate_right(y, 3)
-        x = x ^ k
-        x = (x - y) & 0xFFFFFFFF
-        x = rotate_left(x, 8)
+        y ^= x
+        y = ((y >> 3) | (y << 29)) & MASK32
+        x = ((x ^ k) - y) & MASK32
+        x = ((x << 8) | (x >> 24)) & MASK32
     
     
     return struct.pack("<II", x, y).decode().rstrip('\0')
 
+@lru_cache(maxsize=256)
+def legacy_key_word(key):
+    
+    # The simplified cipher above only ever uses the first 32-bit word of
+    # the key; VMIDs are derived from a handful of keys, so parse each once.
+    return struct.unpack("<II", key.ljust(8, '\0')[:8].encode())[0]
+
+class Speck64:
+    """
+    SPECK-64/128: 64-bit blocks, a 128-bit key and 27 rounds.
+    
+    The round keys are expanded once when the cipher is created. Blocks are
+    8 bytes, the two 32-bit words stored little-endian with y first, as in
+    the reference test vectors. Every block is enciphered independently;
+    chaining is up to the caller.
+    """
+    
+    block_size = 8
+    
+    def __init__(self, key):
+        
+        if len(key) != 16:
+            raise ValueError("SPECK-64/128 needs a 16-byte key")
+        k, *l = struct.unpack("<4I", key)
+        round_keys = [k]
+        for i in range(SPECK64_128_ROUNDS - 1):
+            l.append((((l[i] >> 8) | (l[i] << 24)) + k) & MASK32 ^ i)
+            k = ((k << 3) | (k >> 29)) & MASK32 ^ l[-1]
+            round_keys.append(k)
+        self.round_keys = tuple(round_keys)
+        self._vector_keys = np.array(round_keys, dtype=np.uint32) if np is not None else None
+    
+    def encrypt_block(self, block):
+        
+        y, x = struct.unpack("<II", block)
+        for k in self.round_keys:
+            x = (((x >> 8) | (x << 24)) + y) & MASK32 ^ k
+            y = ((y << 3) | (y >> 29)) & MASK32 ^ x
+        return struct.pack("<II", y, x)
+    
+    def decrypt_block(self, block):
+        
+        y, x = struct.unpack("<II", block)
+        for k in reversed(self.round_keys):
+            y ^= x
+            y = ((y >> 3) | (y << 29)) & MASK32
+            x = ((x ^ k) - y) & MASK32
+            x = ((x << 8) | (x >> 24)) & MASK32
+        return struct.pack("<II", y, x)
+    
+    def encrypt_many(self, data):
+        """
+        Encrypt a run of blocks.
+        
+        Args:
+            data (bytes): Whole 8-byte blocks, concatenated
+        
+        Returns:
+            bytes: The ciphertext blocks, in the same order
+        """
+        if np is None:
+            return b"".join(self.encrypt_block(block) for block in self._blocks(data))
+        y, x = self._words(data)
+        for k in self._vector_keys:
+            x = (x >> 8) | (x << 24)
+            x += y
+            x ^= k
+            y = (y << 3) | (y >> 29)
+            y ^= x
+        return self._join(y, x)
+    
+    def decrypt_many(self, data):
+        """
+        Decrypt a run of blocks.
+        
+        Args:
+            data (bytes): Whole 8-byte blocks, concatenated
+        
+        Returns:
+            bytes: The plaintext blocks, in the same order
+        """
+        if np is None:
+            return b"".join(self.decrypt_block(block) for block in self._blocks(data))
+        y, x = self._words(data)
+        for k in self._vector_keys[::-1]:
+            y ^= x
+            y = (y >> 3) | (y << 29)
+            x ^= k
+            x -= y
+            x = (x << 8) | (x >> 24)
+        return self._join(y, x)
+    
+    def _blocks(self, data):
+        
+        if len(data) % self.block_size:
+            raise ValueError("Data must be a whole number of 8-byte blocks")
+        view = memoryview(data)
+        return (view[i:i + self.block_size] for i in range(0, len(data), self.block_size))
+    
+    def _words(self, data):
+        
+        if len(data) % self.block_size:
+            raise ValueError("Data must be a whole number of 8-byte blocks")
+        words = np.frombuffer(data, dtype="<u4").reshape(-1, 2)
+        return words[:, 0].copy(), words[:, 1].copy()
+    
+    def _join(self, y, x):
+        
+        words = np.empty((len(y), 2), dtype="<u4")
+        words[:, 0] = y
+        words[:, 1] = x
+        return words.tobytes()
+
+@lru_cache(maxsize=64)
+def speck64(key):
+    """
+    Get the SPECK-64/128 cipher for a key, expanding its round keys only
+    the first time the key is seen.
+    
+    Args:
+        key (bytes): 16-byte key
+    
+    Returns:
+        Speck64: The cipher
+    """
+    return Speck64(key)
+
 def generate_vmid(mid, timestamp=None):
     """
     Generate Virtual Merchant ID (VMID) using SPECK algorithm
@@ -109,7 +256,6 @@ def generate_vmid(mid, timestamp=None):
     
     input_data = f"{mid[:8]}{timestamp_str[-4:]}"  
     
-    print(f"Encrypting merchant ID: {mid}")
     # print(f"Input data for encryption: {input_data}")
     # print(f"Key for encryption: {key}")
     
@@ -124,6 +270,136 @@ def generate_vmid(mid, timestamp=None):
     
     return vmid
 
+@lru_cache(maxsize=4)
+def vmid_keys(path=None):
+    """
+    Load the UPI machine's VMID secret and derive the cipher and MAC keys
+    from it. The secret file is created on first use and read only once
+    per process.
+    
+    Args:
+        path (str, optional): Secret file, defaults to VMID["KEY_FILE"]
+            in the upi_machine directory
+    
+    Returns:
+        tuple: (Speck64 cipher, MAC key bytes)
+    """
+    path = path or os.path.join(UPI_MACHINE_DIR, VMID["KEY_FILE"])
+    try:
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    except FileExistsError:
+        with open(path, 'rb') as f:
+            secret = f.read()
+    else:
+        secret = os.urandom(32)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(secret)
+    
+    cipher_key = hmac.new(secret, b"vmid cipher", hashlib.sha256).digest()[:16]
+    mac_key = hmac.new(secret, b"vmid mac", hashlib.sha256).digest()
+    return Speck64(cipher_key), mac_key
+
+def _pack_mid(mid):
+    
+    # Merchant IDs are 16 hex digits, which fit one cipher block exactly;
+    # anything else is carried as NUL-padded UTF-8.
+    if len(mid) == 16:
+        try:
+            packed = bytes.fromhex(mid)
+        except ValueError:
+            packed = b""
+        if packed.hex() == mid:
+            return VMID_HEX, packed
+    data = mid.encode()
+    return VMID_TEXT, data + b"\0" * (-len(data) % Speck64.block_size)
+
+def _unpack_mid(form, data):
+    
+    if form == VMID_HEX:
+        return data.hex()
+    return data.rstrip(b"\0").decode()
+
+def _vmid_tweaks(cipher, form, timestamp, blocks):
+    
+    # XEX: every block is masked with the encryption of its own tweak, so
+    # the same MID looks unrelated under every timestamp.
+    return [cipher.encrypt_block(struct.pack("<II", timestamp & MASK32, (form << 24) | i)) for i in range(blocks)]
+
+def _vmid_tag(mac_key, header, timestamp, ciphertext):
+    
+    message = header + struct.pack("<q", timestamp) + ciphertext
+    return hmac.new(mac_key, message, hashlib.sha256).digest()[:VMID["TAG_BYTES"]]
+
+def _xor(a, b):
+    
+    return (int.from_bytes(a, "little") ^ int.from_bytes(b, "little")).to_bytes(8, "little")
+
+def generate_vmid_v2(mid, timestamp=None, keys=None):
+    """
+    Generate a self-contained Virtual Merchant ID (VMID)
+    
+    The full MID is encrypted with SPECK-64/128 in XEX mode, tweaked by the
+    timestamp, and authenticated with a truncated HMAC-SHA256 tag. Unlike
+    generate_vmid, nothing is written to disk.
+    
+    Args:
+        mid (str): Merchant ID
+        timestamp (int, optional): Timestamp to use, defaults to current time
+        keys (tuple, optional): (cipher, MAC key), defaults to vmid_keys()
+    
+    Returns:
+        str: Virtual Merchant ID (VMID)
+    """
+    if timestamp is None:
+        timestamp = int(time.time())
+    cipher, mac_key = keys or vmid_keys()
+    
+    form, data = _pack_mid(mid)
+    blocks = [data[i:i + 8] for i in range(0, len(data), 8)]
+    tweaks = _vmid_tweaks(cipher, form, timestamp, len(blocks))
+    ciphertext = b"".join(_xor(cipher.encrypt_block(_xor(block, tweak)), tweak) for block, tweak in zip(blocks, tweaks))
+    
+    header = bytes([VMID["VERSION"], form])
+    return (header + ciphertext + _vmid_tag(mac_key, header, timestamp, ciphertext)).hex()
+
+def decrypt_vmid_v2(vmid, timestamp, keys=None):
+    """
+    Recover the Merchant ID from a VMID made by generate_vmid_v2
+    
+    Args:
+        vmid (str): The Virtual Merchant ID
+        timestamp (int): Timestamp the VMID was generated with
+        keys (tuple, optional): (cipher, MAC key), defaults to vmid_keys()
+    
+    Returns:
+        str: Merchant ID, or None if the VMID is malformed, was tampered
+             with, or does not belong to this timestamp
+    """
+    try:
+        data = bytes.fromhex(vmid)
+    except (TypeError, ValueError):
+        return None
+    tag_bytes = VMID["TAG_BYTES"]
+    if len(data) < 2 + 8 + tag_bytes or (len(data) - 2 - tag_bytes) % 8 or data[0] != VMID["VERSION"]:
+        return None
+    cipher, mac_key = keys or vmid_keys()
+    
+    header, ciphertext, tag = data[:2], data[2:-tag_bytes], data[-tag_bytes:]
+    if not hmac.compare_digest(tag, _vmid_tag(mac_key, header, timestamp, ciphertext)):
+        return None
+    form = header[1]
+    blocks = [ciphertext[i:i + 8] for i in range(0, len(ciphertext), 8)]
+    tweaks = _vmid_tweaks(cipher, form, timestamp, len(blocks))
+    plaintext = b"".join(_xor(cipher.decrypt_block(_xor(block, tweak)), tweak) for block, tweak in zip(blocks, tweaks))
+    try:
+        return _unpack_mid(form, plaintext)
+    except UnicodeDecodeError:
+        return None
+
+def is_vmid_v2(vmid):
+    
+    return isinstance(vmid, str) and len(vmid) > 16 and vmid[:2] == f"{VMID['VERSION']:02x}"
+
 def save_merchant_mapping(mid, timestamp):
     
     mapping_file = "merchant_mappings.json"
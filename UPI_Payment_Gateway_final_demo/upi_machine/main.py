@@ -10,8 +10,10 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from upi_machine.network import UPIMachineNetwork
 from upi_machine.qr_generator import generate_payment_data, generate_qr_code, save_data_to_file, save_qr_to_file, decrypt_vmid_to_mid
+from upi_machine.vmid_sessions import VMIDSessionStore
+from upi_machine.merchant_cache import MerchantCache
 from common.network_protocol import Message
-from common.constants import NETWORK
+from common.constants import NETWORK, VMID
 
 class UPIMachine:
     def __init__(self):
@@ -19,10 +21,17 @@ class UPIMachine:
         self.current_merchant_id = None
         self.current_vmid = None
         self.current_transaction = None
+        # QR codes issued by this terminal, live for one payment window.
+        self.sessions = VMIDSessionStore(journal_path=VMID["SESSION_JOURNAL"])
+        # Merchant details from the bank server, shared by every payment.
+        self.merchants = MerchantCache(
+            lambda request: self.network.send_pipelined(NETWORK["BANK_SERVER_HOST"], NETWORK["BANK_SERVER_PORT"], request)
+        )
         
         
         self.network.register_handler("PAYMENT_CONFIRMATION", self.handle_payment_confirmation)
         self.network.register_handler("PROCESS_TRANSACTION_REQUEST", self.handle_transaction_request)
+        self.network.register_handler("MERCHANT_UPDATED", self.handle_merchant_updated)
     
     def start(self):
         
@@ -30,11 +39,14 @@ class UPIMachine:
         
         
         self.network.start_server()
+        self.sessions.start()
         
         
-        from bank_server.bank_manager import BankManager
-        bank_manager = BankManager()
-        bank_manager.initialize()
+        merchant_count = self.merchants.warm()
+        if merchant_count:
+            print(f"Cached {merchant_count} merchants from the bank server")
+        else:
+            print("Bank server not reachable; merchants will be looked up on demand")
         
         print("UPI Machine is running!")
         print("Enter merchant ID or 'exit' to quit:")
@@ -61,6 +73,7 @@ class UPIMachine:
             print("\nShutting down UPI Machine...")
         finally:
             self.network.stop()
+            self.sessions.close()
     
     def print_help(self):
         
@@ -73,22 +86,11 @@ class UPIMachine:
         
         print(f"Setting merchant ID to: {merchant_id}")
         
-        
-        import sys
-        sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-        from bank_server.bank_manager import BankManager
-        
-        
-        bank_manager = BankManager()
-        bank_manager.initialize()
-        
-        
-        # print("Available merchants in the system:")
-        # if bank_manager.merchants:
-        #     for mid, merchant in bank_manager.merchants.items():
-        #         print(f"  {mid}: {merchant.name}")
-        # else:
-        #     print("  No merchants registered in the system")
+        merchant = self.merchants.get(merchant_id)
+        if merchant:
+            print(f"Merchant: {merchant['merchant_name']} ({merchant['bank_code']})")
+        else:
+            print(f"Warning: Merchant ID {merchant_id} is not known to the bank server")
         
         
         self.current_merchant_id = merchant_id
@@ -130,7 +132,7 @@ class UPIMachine:
     
     def generate_payment_data(self):
         
-        payment_data, vmid = generate_payment_data(self.current_merchant_id)
+        payment_data, vmid = generate_payment_data(self.current_merchant_id, sessions=self.sessions)
         self.current_vmid = vmid
         
         filename = f"payment_{self.current_merchant_id}_{int(time.time())}.txt"
@@ -153,7 +155,8 @@ class UPIMachine:
             payment_data, vmid = generate_payment_data(
                 self.current_merchant_id, 
                 amount=amount,
-                description=description if description else None
+                description=description if description else None,
+                sessions=self.sessions
             )
             self.current_vmid = vmid
             
@@ -174,7 +177,7 @@ class UPIMachine:
     def generate_qr_code(self):
         
         try:
-            payment_data, vmid = generate_payment_data(self.current_merchant_id)
+            payment_data, vmid = generate_payment_data(self.current_merchant_id, sessions=self.sessions)
             self.current_vmid = vmid
             
             qr_data = generate_qr_code(payment_data)
@@ -201,7 +204,8 @@ class UPIMachine:
             payment_data, vmid = generate_payment_data(
                 self.current_merchant_id, 
                 amount=amount,
-                description=description if description else None
+                description=description if description else None,
+                sessions=self.sessions
             )
             self.current_vmid = vmid
             
@@ -256,6 +260,7 @@ class UPIMachine:
         
         vmid = message.data.get('vmid')
         timestamp = int(message.data.get('timestamp', 0))
+        nonce = message.data.get('nonce')
         amount = message.data.get('amount')
         description = message.data.get('desc', 'Payment via UPI')
         sender_id = message.data.get('sender_id')
@@ -279,19 +284,7 @@ class UPIMachine:
             )
         
         
-        from bank_server.bank_manager import BankManager
-        bank_manager = BankManager()
-        bank_manager.initialize()
-        
-        print("Available merchants before decryption:")
-        if bank_manager.merchants:
-            for mid, merchant in bank_manager.merchants.items():
-                print(f"  {mid}: {merchant.name}")
-        else:
-            print("  No merchants registered in the system")
-        
-        
-        merchant_id = decrypt_vmid_to_mid(vmid, timestamp)
+        merchant_id = decrypt_vmid_to_mid(vmid, timestamp, nonce, self.sessions, self.merchants)
         
         if not merchant_id:
             print(f"Error: Failed to decrypt VMID {vmid}")
@@ -309,8 +302,9 @@ class UPIMachine:
         print(f"Decrypted VMID {vmid} to Merchant ID {merchant_id}")
         
         
-        if merchant_id in bank_manager.merchants:
-            print(f"Merchant found: {bank_manager.merchants[merchant_id].name}")
+        merchant = self.merchants.get(merchant_id)
+        if merchant:
+            print(f"Merchant found: {merchant['merchant_name']}")
         else:
             print(f"Warning: Merchant ID {merchant_id} not found in the system after decryption")
         
@@ -331,7 +325,7 @@ class UPIMachine:
         print("Forwarding transaction request to bank server...")
         print(f"Data: sender_id={sender_id}, receiver_id={merchant_id}")
         print(f"Data: amount={amount}, description={description}")
-        response = self.network.send_message(
+        response = self.network.send_pipelined(
             NETWORK["BANK_SERVER_HOST"],
             NETWORK["BANK_SERVER_PORT"],
             transaction_message
@@ -367,6 +361,17 @@ class UPIMachine:
             message_id=message.message_id
         )
 
+    def handle_merchant_updated(self, message):
+        
+        self.merchants.invalidate(message.data.get("merchant_id"))
+        return Message(
+            message_type="MERCHANT_UPDATED_RESPONSE",
+            sender="UPI_MACHINE",
+            receiver=message.sender,
+            data={"success": True},
+            message_id=message.message_id
+        )
+
 if __name__ == "__main__":
     upi_machine = UPIMachine()
     upi_machine.start()
@@ -0,0 +1,109 @@
+import sys
+import os
+import time
+import uuid
+import threading
+
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.network_protocol import Message
+from common.constants import MERCHANT_CACHE
+
+class MerchantCache:
+    def __init__(self, request, ttl=None, negative_ttl=None, clock=time.monotonic):
+        # request(message) sends to the bank server and returns its reply,
+        # or None when the bank cannot be reached.
+        self.request = request
+        self.ttl = MERCHANT_CACHE["TTL"] if ttl is None else ttl
+        self.negative_ttl = MERCHANT_CACHE["NEGATIVE_TTL"] if negative_ttl is None else negative_ttl
+        self.stats = {"hits": 0, "misses": 0, "fetches": 0, "invalidations": 0}
+        self._clock = clock
+        # mid -> (merchant info, or None if the bank does not know it; expiry)
+        self._entries = {}
+        self._lock = threading.Lock()
+    
+    def __len__(self):
+        
+        return len(self._entries)
+    
+    def get(self, merchant_id):
+        
+        with self._lock:
+            entry = self._entries.get(merchant_id)
+            if entry is not None and entry[1] > self._clock():
+                self.stats["hits"] += 1
+                return entry[0]
+            self.stats["misses"] += 1
+        
+        merchants = self._fetch({"merchant_ids": [merchant_id]})
+        if merchants is None:
+            # Bank unreachable: a stale answer is better than none.
+            return entry[0] if entry is not None else None
+        return merchants.get(merchant_id)
+    
+    def warm(self):
+        
+        merchants = self._fetch({})
+        return 0 if merchants is None else len(merchants)
+    
+    def find_by_prefix(self, prefix):
+        
+        merchants = self._fetch({"prefix": prefix})
+        if merchants is None:
+            with self._lock:
+                return sorted(mid for mid, (info, _) in self._entries.items() if info is not None and mid.startswith(prefix))
+        return sorted(merchants)
+    
+    def register(self, name, bank_code, password, initial_balance=0.0):
+        
+        response = self.request(Message(
+            message_type="REGISTER_MERCHANT",
+            sender="UPI_MACHINE",
+            receiver="BANK_SERVER",
+            data={
+                "name": name,
+                "bank_code": bank_code,
+                "password": password,
+                "initial_balance": initial_balance
+            },
+            message_id=str(uuid.uuid4())
+        ))
+        if not response or not response.data.get("success"):
+            return None
+        merchant_id = response.data["merchant_id"]
+        self.invalidate(merchant_id)
+        return merchant_id
+    
+    def invalidate(self, merchant_id=None):
+        
+        with self._lock:
+            self.stats["invalidations"] += 1
+            if merchant_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(merchant_id, None)
+    
+    def _fetch(self, query):
+        
+        with self._lock:
+            self.stats["fetches"] += 1
+        response = self.request(Message(
+            message_type="GET_MERCHANTS",
+            sender="UPI_MACHINE",
+            receiver="BANK_SERVER",
+            data=query,
+            message_id=str(uuid.uuid4())
+        ))
+        if not response or not response.data.get("success"):
+            return None
+        
+        merchants = response.data.get("merchants", {})
+        now = self._clock()
+        with self._lock:
+            for merchant_id, info in merchants.items():
+                self._entries[merchant_id] = (info, now + self.ttl)
+            # Unknown ids are remembered briefly, so a burst of payments to a
+            # bad id does not turn into a burst of bank requests.
+            for merchant_id in response.data.get("missing", []):
+                self._entries[merchant_id] = (None, now + self.negative_ttl)
+        return merchants
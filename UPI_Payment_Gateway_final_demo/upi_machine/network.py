@@ -7,7 +7,12 @@ import os
 
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from common.network_protocol import Message
+from common.network_protocol import (
+    FramingError, CodecError, CODEC_NEGOTIATION, JSON_CODEC,
+    negotiation_response, read_message, write_message
+)
+from common.connection_pool import ConnectionPool
+from common.multiplex import MultiplexedClient
 from common.constants import NETWORK
 
 class UPIMachineNetwork:
@@ -17,6 +22,9 @@ class UPIMachineNetwork:
         self.socket = None
         self.connected = False
         self.message_handlers = {}
+        self.connection_pool = ConnectionPool()
+        self.multiplexed_clients = {}
+        self._multiplex_lock = threading.Lock()
     
     def start_server(self):
         
@@ -45,41 +53,35 @@ class UPIMachineNetwork:
     
     def _handle_client(self, client_socket):
         
+        codec = JSON_CODEC
         try:
-            
-            data = b""
             while self.connected:
-                chunk = client_socket.recv(4096)
-                if not chunk:
+                message = read_message(client_socket)
+                if message is None:
                     break
-                data += chunk
                 
-                try:
-                    
-                    message = Message.from_json(data.decode())
-                    
-                    
-                    self._process_message(message, client_socket)
-                    
-                    
-                    data = b""
-                except (json.JSONDecodeError, UnicodeDecodeError):
-                    
+                if message.message_type == CODEC_NEGOTIATION:
+                    response, codec = negotiation_response(message)
+                    write_message(client_socket, response)
                     continue
                 
+                self._process_message(message, client_socket, codec)
+                
+        except (FramingError, CodecError, json.JSONDecodeError, UnicodeDecodeError) as e:
+            print(f"Malformed frame from client: {e}")
         except Exception as e:
             print(f"Error handling client: {e}")
         finally:
             client_socket.close()
     
-    def _process_message(self, message, client_socket):
+    def _process_message(self, message, client_socket, codec=JSON_CODEC):
         
         print(f"Received message: {message.message_type}")
         
         if message.message_type in self.message_handlers:
             response = self.message_handlers[message.message_type](message)
             if response:
-                client_socket.sendall(response.to_json().encode())
+                write_message(client_socket, response, codec)
         else:
             print(f"No handler for message type: {message.message_type}")
     
@@ -90,17 +92,21 @@ class UPIMachineNetwork:
     def send_message(self, host, port, message):
         
         try:
-            client_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            client_socket.connect((host, port))
-            client_socket.sendall(message.to_json().encode())
-            
-            
-            response_data = client_socket.recv(4096)
-            client_socket.close()
-            
-            if response_data:
-                return Message.from_json(response_data.decode())
+            return self.connection_pool.request(host, port, message)
+        except Exception as e:
+            print(f"Error sending message: {e}")
             return None
+    
+    def send_pipelined(self, host, port, message, timeout=None):
+        
+        with self._multiplex_lock:
+            client = self.multiplexed_clients.get((host, port))
+            if client is None:
+                client = MultiplexedClient(host, port)
+                self.multiplexed_clients[(host, port)] = client
+        
+        try:
+            return client.request(message, timeout)
         except Exception as e:
             print(f"Error sending message: {e}")
             return None
@@ -108,5 +114,10 @@ class UPIMachineNetwork:
     def stop(self):
         
         self.connected = False
+        self.connection_pool.close()
+        with self._multiplex_lock:
+            for client in self.multiplexed_clients.values():
+                client.close()
+            self.multiplexed_clients.clear()
         if self.socket:
             self.socket.close()
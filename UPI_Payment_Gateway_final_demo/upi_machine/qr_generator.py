@@ -9,9 +9,10 @@ import time
 
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from upi_machine.lwc import generate_vmid, speck_decrypt, get_merchant_from_mapping
+from common.constants import VMID
+from upi_machine.lwc import decrypt_vmid_v2, generate_vmid_v2, is_vmid_v2, speck_decrypt, get_merchant_from_mapping
 
-def generate_payment_data(merchant_id, amount=None, description=None):
+def generate_payment_data(merchant_id, amount=None, description=None, sessions=None, keys=None):
     """
     Generate payment data containing the VMID (Virtual Merchant ID)
     
@@ -19,6 +20,9 @@ def generate_payment_data(merchant_id, amount=None, description=None):
         merchant_id (str): The merchant's unique ID
         amount (float, optional): Pre-filled payment amount
         description (str, optional): Payment description
+        sessions (VMIDSessionStore, optional): Store to open a payment
+            session in; its nonce is added to the payment data
+        keys (tuple, optional): VMID (cipher, MAC key), defaults to vmid_keys()
     
     Returns:
         str: JSON string with payment data
@@ -26,13 +30,15 @@ def generate_payment_data(merchant_id, amount=None, description=None):
     """
     
     timestamp = int(time.time())
-    vmid = generate_vmid(merchant_id, timestamp)
+    vmid = generate_vmid_v2(merchant_id, timestamp, keys)
     
     
     payment_data = {
         "vmid": vmid,
         "timestamp": str(timestamp)
     }
+    if sessions is not None:
+        payment_data["nonce"] = sessions.issue(merchant_id, timestamp)
     
     
     if amount is not None:
@@ -43,18 +49,52 @@ def generate_payment_data(merchant_id, amount=None, description=None):
     
     return json.dumps(payment_data), vmid
 
-def decrypt_vmid_to_mid(vmid, timestamp):
+def decrypt_vmid_to_mid(vmid, timestamp, nonce=None, sessions=None, merchants=None, keys=None):
     """
     Decrypt Virtual Merchant ID (VMID) back to original Merchant ID (MID)
     
     Args:
         vmid (str): The Virtual Merchant ID to decrypt
         timestamp (int): Timestamp used for encryption
+        nonce (str, optional): Session nonce from the payment data
+        sessions (VMIDSessionStore, optional): Sessions issued by this machine
+        merchants (MerchantCache, optional): Merchant directory, needed only
+            for VMIDs from before the v2 format
+        keys (tuple, optional): VMID (cipher, MAC key), defaults to vmid_keys()
     
     Returns:
         str: Original Merchant ID (MID)
     """
     
+    # A QR code from this machine is only good for its payment window.
+    if sessions is not None and not nonce and is_vmid_v2(vmid):
+        print(f"VMID {vmid} has no payment session nonce")
+        return None
+    if sessions is not None and nonce:
+        merchant_id = sessions.resolve(timestamp, nonce)
+        if merchant_id is None:
+            print(f"Payment session {nonce} has expired or is unknown")
+            return None
+        if is_vmid_v2(vmid) and decrypt_vmid_v2(vmid, timestamp, keys) != merchant_id:
+            print(f"VMID {vmid} does not match payment session {nonce}")
+            return None
+        return merchant_id
+    
+    # v2 VMIDs carry the whole MID; only QR codes from before them need
+    # the mapping file and the merchant scan below.
+    if is_vmid_v2(vmid):
+        try:
+            expires = int(timestamp) + VMID["SESSION_TTL"]
+        except (TypeError, ValueError):
+            return None
+        if expires < time.time():
+            print(f"VMID {vmid} expired at {expires}")
+            return None
+        merchant_id = decrypt_vmid_v2(vmid, timestamp, keys)
+        if merchant_id is None:
+            print(f"VMID {vmid} failed verification for timestamp {timestamp}")
+        return merchant_id
+    
     merchant_id = get_merchant_from_mapping(timestamp)
     if merchant_id:
         print(f"Found merchant ID {merchant_id} from saved mapping for timestamp {timestamp}")
@@ -79,21 +119,19 @@ def decrypt_vmid_to_mid(vmid, timestamp):
         print(f"Original merchant ID prefix: {mid_prefix}")
         
         
-        import sys
-        sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-        from bank_server.bank_manager import BankManager
-        
-        
-        bank_manager = BankManager()
-        bank_manager.initialize()
+        if merchants is None:
+            print("No merchant directory to resolve a legacy VMID against")
+            return None
         
         
-        matching_merchants = []
-        for mid in bank_manager.merchants.keys():
-            if mid.startswith(mid_prefix[:4]):  
-                matching_merchants.append(mid)
+        # The VMID carries the first 8 characters of the MID; every merchant
+        # sharing them is a candidate.
+        matching_merchants = merchants.find_by_prefix(mid_prefix)
         
-        if matching_merchants:
+        if len(matching_merchants) > 1:
+            print(f"Ambiguous VMID: {len(matching_merchants)} merchants start with {mid_prefix}: {', '.join(matching_merchants)}")
+            return None
+        elif matching_merchants:
             
             mid = matching_merchants[0]
             print(f"Found matching merchant ID: {mid}")
@@ -101,13 +139,13 @@ def decrypt_vmid_to_mid(vmid, timestamp):
         else:
             
             print("No matching merchant found. Registering a test merchant...")
-            success, mid = bank_manager.register_merchant(
+            mid = merchants.register(
                 name=f"Test Merchant {mid_prefix[:4]}",
                 bank_code="SBIN0000001",
                 password="password",
                 initial_balance=10000.0
             )
-            if success:
+            if mid:
                 print(f"Registered test merchant with ID: {mid}")
                 return mid
             else:
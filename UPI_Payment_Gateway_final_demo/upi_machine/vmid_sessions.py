@@ -0,0 +1,178 @@
+
+import json
+import math
+import os
+import sys
+import threading
+import time
+
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common.constants import VMID
+from common.striped_lock import StripedLock
+
+class VMIDSessionStore:
+    
+    def __init__(self, ttl=None, shards=None, journal_path=None, tick=None, clock=time.time):
+        self.ttl = VMID["SESSION_TTL"] if ttl is None else ttl
+        self.tick = tick or VMID["SESSION_WHEEL_TICK"]
+        self.journal_path = journal_path
+        self._clock = clock
+        self._locks = StripedLock(shards or VMID["SESSION_SHARDS"])
+        # Each shard has its own entries and its own expiry wheel: one slot
+        # per tick, enough slots to cover a whole payment window.
+        self._slots = math.ceil(self.ttl / self.tick) + 1
+        # (timestamp, nonce) -> (mid, expires)
+        self._entries = [{} for _ in range(self._locks.stripes)]
+        self._wheels = [[[] for _ in range(self._slots)] for _ in range(self._locks.stripes)]
+        self._swept = [int(clock() // self.tick)] * self._locks.stripes
+        
+        self._journal = None
+        self._journal_lock = threading.Lock()
+        self._journal_records = 0
+        self._sweeper_stopped = threading.Event()
+        self._sweeper = None
+        if journal_path:
+            self._recover()
+    
+    def __len__(self):
+        
+        return sum(len(entries) for entries in self._entries)
+    
+    def issue(self, mid, timestamp=None):
+        
+        # Two terminals issuing in the same second get different nonces, so
+        # neither overwrites the other's session.
+        timestamp = int(self._clock()) if timestamp is None else int(timestamp)
+        nonce = os.urandom(8).hex()
+        expires = timestamp + self.ttl
+        self._insert((timestamp, nonce), mid, expires)
+        if self.journal_path:
+            self._append({"timestamp": timestamp, "nonce": nonce, "mid": mid, "expires": expires})
+        return nonce
+    
+    def resolve(self, timestamp, nonce):
+        
+        # Both come straight from the client's payment data.
+        try:
+            key = (int(timestamp), nonce)
+            stripe = self._locks.stripe_for(nonce)
+        except (TypeError, ValueError):
+            return None
+        with self._locks.acquire(nonce):
+            entry = self._entries[stripe].get(key)
+        if entry is None or entry[1] <= self._clock():
+            return None
+        return entry[0]
+    
+    def expire(self):
+        
+        now = self._clock()
+        current = int(now // self.tick)
+        removed = 0
+        for stripe in range(self._locks.stripes):
+            with self._locks.acquire_stripe(stripe):
+                entries, wheel = self._entries[stripe], self._wheels[stripe]
+                # After a long pause one lap of the wheel still visits every slot.
+                first = max(self._swept[stripe] + 1, current - self._slots + 1)
+                for tick in range(first, current + 1):
+                    slot = wheel[tick % self._slots]
+                    keep = []
+                    for key in slot:
+                        entry = entries.get(key)
+                        if entry is None:
+                            continue
+                        if entry[1] <= now:
+                            del entries[key]
+                            removed += 1
+                        else:
+                            keep.append(key)
+                    slot[:] = keep
+                self._swept[stripe] = current
+        
+        if self.journal_path and self._journal_records > max(VMID["SESSION_JOURNAL_COMPACT_RECORDS"], 2 * len(self)):
+            self._compact()
+        return removed
+    
+    def start(self):
+        
+        if self._sweeper is not None:
+            return
+        self._sweeper_stopped.clear()
+        self._sweeper = threading.Thread(target=self._sweep, daemon=True)
+        self._sweeper.start()
+    
+    def close(self):
+        
+        if self._sweeper is not None:
+            self._sweeper_stopped.set()
+            self._sweeper.join()
+            self._sweeper = None
+        with self._journal_lock:
+            if self._journal is not None:
+                self._journal.close()
+                self._journal = None
+    
+    def _insert(self, key, mid, expires):
+        
+        stripe = self._locks.stripe_for(key[1])
+        with self._locks.acquire(key[1]):
+            self._entries[stripe][key] = (mid, expires)
+            self._wheels[stripe][int(expires // self.tick) % self._slots].append(key)
+    
+    def _sweep(self):
+        
+        while not self._sweeper_stopped.wait(self.tick):
+            self.expire()
+    
+    def _append(self, record):
+        
+        line = json.dumps(record, separators=(",", ":")).encode("utf-8") + b"\n"
+        with self._journal_lock:
+            if self._journal is None:
+                self._journal = open(self.journal_path, "ab")
+            self._journal.write(line)
+            self._journal.flush()
+            self._journal_records += 1
+    
+    def _recover(self):
+        
+        now = self._clock()
+        try:
+            with open(self.journal_path, "rb") as f:
+                lines = f.readlines()
+        except FileNotFoundError:
+            lines = []
+        for line in lines:
+            # A crash mid-write leaves a torn last line, and a damaged line
+            # can be missing fields; skip either.
+            try:
+                record = json.loads(line)
+                key = (int(record["timestamp"]), record["nonce"])
+                mid, expires = record["mid"], float(record["expires"])
+            except (ValueError, TypeError, KeyError):
+                continue
+            if isinstance(key[1], str) and expires > now:
+                self._insert(key, mid, expires)
+        self._compact()
+    
+    def _compact(self):
+        
+        # Rewrite the journal with just the live sessions.
+        with self._locks.acquire_all(), self._journal_lock:
+            records = [
+                {"timestamp": timestamp, "nonce": nonce, "mid": mid, "expires": expires}
+                for entries in self._entries
+                for (timestamp, nonce), (mid, expires) in entries.items()
+            ]
+            if self._journal is not None:
+                self._journal.close()
+                self._journal = None
+            temp_path = f"{self.journal_path}.tmp"
+            with open(temp_path, "wb") as f:
+                f.write(b"".join(json.dumps(record, separators=(",", ":")).encode("utf-8") + b"\n" for record in records))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, self.journal_path)
+            self._journal_records = len(records)
@@ -189,6 +189,7 @@ class UserDevice:
                 data={
                     "vmid": vmid,
                     "timestamp": payment_data.get("timestamp"),
+                    "nonce": payment_data.get("nonce"),
                     "amount": float(amount),
                     "desc": payment_data.get("desc", "Payment via UPI"),
                     "sender_id": self.current_user["user_id"]
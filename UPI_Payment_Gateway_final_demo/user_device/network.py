@@ -7,7 +7,11 @@ import os
 
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from common.network_protocol import Message
+from common.network_protocol import (
+    FramingError, CodecError, CODEC_NEGOTIATION, JSON_CODEC,
+    negotiation_response, read_message, write_message
+)
+from common.connection_pool import ConnectionPool
 from common.constants import NETWORK
 
 class UserDeviceNetwork:
@@ -17,6 +21,7 @@ class UserDeviceNetwork:
         self.socket = None
         self.connected = False
         self.message_handlers = {}
+        self.connection_pool = ConnectionPool()
     
     def start_server(self):
         
@@ -24,6 +29,7 @@ class UserDeviceNetwork:
         self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
         self.socket.bind((self.host, self.port))
         self.socket.listen(5)
+        self.port = self.socket.getsockname()[1]
         self.connected = True
         print(f"User Device server started on {self.host}:{self.port}")
         
@@ -45,32 +51,24 @@ class UserDeviceNetwork:
     
     def _handle_client(self, client_socket):
         
+        codec = JSON_CODEC
         try:
-            
-            data = b""
             while self.connected:
-                chunk = client_socket.recv(4096)
-                if not chunk:
+                message = read_message(client_socket)
+                if message is None:
                     break
-                data += chunk
                 
-                try:
-                    
-                    message = Message.from_json(data.decode())
-                    
-                    
-                    response = self._process_message(message)
-                    
-                    
-                    if response:
-                        client_socket.sendall(response.to_json().encode())
-                    
-                    
-                    data = b""
-                except (json.JSONDecodeError, UnicodeDecodeError):
-                    
+                if message.message_type == CODEC_NEGOTIATION:
+                    response, codec = negotiation_response(message)
+                    write_message(client_socket, response)
                     continue
                 
+                response = self._process_message(message)
+                if response:
+                    write_message(client_socket, response, codec)
+                
+        except (FramingError, CodecError, json.JSONDecodeError, UnicodeDecodeError) as e:
+            print(f"Malformed frame from client: {e}")
         except Exception as e:
             print(f"Error handling client: {e}")
         finally:
@@ -93,17 +91,7 @@ class UserDeviceNetwork:
     def send_message(self, host, port, message):
         
         try:
-            client_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            client_socket.connect((host, port))
-            client_socket.sendall(message.to_json().encode())
-            
-            
-            response_data = client_socket.recv(4096)
-            client_socket.close()
-            
-            if response_data:
-                return Message.from_json(response_data.decode())
-            return None
+            return self.connection_pool.request(host, port, message)
         except Exception as e:
             print(f"Error sending message: {e}")
             return None
@@ -111,5 +99,6 @@ class UserDeviceNetwork:
     def stop(self):
         
         self.connected = False
+        self.connection_pool.close()
         if self.socket:
             self.socket.close()